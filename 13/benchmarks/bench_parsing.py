@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+from queryrewrite.utils.super_json import SuperJSON
+from queryrewrite.utils.super_list import SuperList
+
+ITEMS = [{"query": f"改写后的查询{i}：如何评估大模型的效果？", "reference": "参考答案"} for i in range(50)]
+
+RESPONSES = {
+    "clean": json.dumps(ITEMS, ensure_ascii=False),
+    "fenced": "好的，下面是改写结果：\n```json\n" + json.dumps({"response": ITEMS}, ensure_ascii=False, indent=2) + "\n```\n以上。",
+    "think": "<think>" + "先分析一下用户的需求。" * 200 + "</think>\n" + json.dumps({"response": ITEMS}, ensure_ascii=False),
+    # One object per line, with braces inside the string values
+    "jsonl": "\n".join(json.dumps({"query": item["query"] + "{x}", "reference": "[r]"}, ensure_ascii=False) for item in ITEMS * 10),
+}
+
+LISTS = {
+    "clean": '["评估", "评测", "测评", "检验", "考核"]',
+    "prose": "这个词的同义词有：" + "说明文字。" * 200 + '["评估", "评测", "测评"]',
+    "python": "['评估', '评测', '测评']",
+}
+
+# Inputs that made the old regex strategies backtrack exponentially or recurse too deep;
+# only prose-brackets contains a list
+PATHOLOGICAL_LISTS = {
+    "unclosed": "同义词如下：[" + "评估 " * 5000,
+    "deep": "[" * 5000,
+    "unbalanced": "[[评估]" * 2000,
+    "nested-invalid": "[1, " * 8000 + "x" + "]" * 8000,
+    "nested-invalid-bare": "[" * 8000 + "x" + "]" * 8000,
+    "prose-brackets": "这个词[注]的同义词[参见附录]有：" * 1000 + '["评估", "评测", "测评"]',
+    "citations": "文献[2023年]指出，" * 24000 + '["评估", "评测", "测评"]',
+    "nested-prose": "[[[x]]] " * 20000 + '["评估", "评测", "测评"]',
+}
+
+@pytest.mark.benchmark(group="superjson-loads")
+@pytest.mark.parametrize("kind", sorted(RESPONSES))
+def test_superjson_loads(benchmark, kind):
+    assert benchmark(SuperJSON.loads, RESPONSES[kind])
+
+@pytest.mark.benchmark(group="superlist")
+@pytest.mark.parametrize("kind", sorted(LISTS))
+def test_superlist(benchmark, kind):
+    assert benchmark(SuperList, LISTS[kind])
+
+@pytest.mark.benchmark(group="superlist-pathological")
+@pytest.mark.parametrize("kind", sorted(PATHOLOGICAL_LISTS))
+def test_superlist_pathological(benchmark, kind):
+    def extract():
+        try:
+            return SuperList(PATHOLOGICAL_LISTS[kind])
+        except ValueError:
+            return None
+    benchmark(extract)
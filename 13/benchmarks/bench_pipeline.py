@@ -0,0 +1,16 @@
+import pytest
+
+from corpus import GLOSSARY, make_queries
+from queryrewrite.pipeline import rewrite_and_validate
+from queryrewrite.rewriting.base import RewriteMethod
+from queryrewrite.validation.base import ValidationMethod
+
+@pytest.mark.benchmark(group="pipeline")
+@pytest.mark.parametrize("method", [ValidationMethod.PARETO_OPTIMAL, ValidationMethod.FILTER_BY_ROUGE_L_BLEU_THRESHOLDS])
+def test_rewrite_and_validate(benchmark, method):
+    queries = make_queries(100)
+
+    def run():
+        return [rewrite_and_validate(q, RewriteMethod.GLOSSARY, method, glossary=GLOSSARY) for q in queries]
+
+    assert len(benchmark(run)) == 100
@@ -0,0 +1,38 @@
+import pytest
+
+from conftest import corpus_sizes
+from corpus import GLOSSARY, make_queries
+from queryrewrite.rewriting.glossary_matcher import GlossaryMatcher
+from queryrewrite.rewriting.glossary_rewriter import GlossaryRewriter
+from queryrewrite.rewriting.llm_rewriter import LLMRewriter
+from queryrewrite.rewriting.synonym_cache import SynonymCache
+from queryrewrite.rewriting.synonym_rewriter import SynonymRewriter
+
+@pytest.mark.benchmark(group="glossary-rewrite")
+@pytest.mark.parametrize("size", corpus_sizes())
+def test_glossary_rewrite(benchmark, size):
+    rewriter = GlossaryRewriter(GlossaryMatcher(GLOSSARY))
+    queries = make_queries(size)
+    results = benchmark(lambda: [rewriter.rewrite(q) for q in queries])
+    assert len(results) == size
+
+@pytest.mark.benchmark(group="glossary-matcher")
+def test_glossary_matcher_build(benchmark):
+    glossary = [[f"术语{i}", f"同义{i}", f"别名{i}"] for i in range(10_000)]
+    matcher = benchmark(GlossaryMatcher, glossary)
+    assert len(matcher) == 30_000
+
+@pytest.mark.benchmark(group="synonym-rewrite")
+@pytest.mark.parametrize("size", corpus_sizes())
+def test_synonym_rewrite_warm_cache(benchmark, fake_llm, size):
+    rewriter = SynonymRewriter(fake_llm, synonym_cache=SynonymCache(maxsize=100_000))
+    queries = make_queries(size)
+    rewriter.prefetch_synonyms(queries)
+    results = benchmark(lambda: [rewriter.rewrite(q) for q in queries])
+    assert len(results) == size
+
+@pytest.mark.benchmark(group="llm-rewrite")
+def test_llm_rewrite_parse(benchmark, fake_llm):
+    rewriter = LLMRewriter(fake_llm)
+    query = make_queries(1)[0]
+    assert len(benchmark(rewriter.rewrite, query)) == 10
@@ -0,0 +1,68 @@
+import pytest
+
+from conftest import corpus_sizes
+from corpus import make_candidates, make_queries
+from queryrewrite.validation.metrics import calculate_bleu, calculate_rouge_l
+from queryrewrite.validation.scoring import score_candidates
+from queryrewrite.validation.tokenization import token_cache
+from queryrewrite.validation.validators import (
+    filter_by_rouge_l_bleu_thresholds,
+    llm_semantic_similarity,
+    pareto_optimal,
+    rouge_l_bleu_normalized,
+)
+
+ORIGINAL = make_queries(1, seed=42)[0]["query"]
+
+@pytest.fixture(scope="module")
+def candidates_by_size():
+    cache = {}
+
+    def get(size):
+        if size not in cache:
+            cache[size] = make_candidates(ORIGINAL, size, seed=size)
+        return cache[size]
+
+    return get
+
+@pytest.mark.benchmark(group="metrics-pair")
+def test_calculate_rouge_l(benchmark):
+    candidate = make_candidates(ORIGINAL, 1)[0]["query"]
+    benchmark(calculate_rouge_l, candidate, ORIGINAL)
+
+@pytest.mark.benchmark(group="metrics-pair")
+def test_calculate_bleu(benchmark):
+    candidate = make_candidates(ORIGINAL, 1)[0]["query"]
+    benchmark(calculate_bleu, candidate, ORIGINAL)
+
+@pytest.mark.benchmark(group="score-candidates")
+@pytest.mark.parametrize("size", corpus_sizes())
+def test_score_candidates(benchmark, candidates_by_size, size):
+    texts = [c["query"] for c in candidates_by_size(size)]
+    assert benchmark(score_candidates, ORIGINAL, texts).shape == (size, 2)
+
+@pytest.mark.benchmark(group="score-candidates-cold")
+def test_score_candidates_cold_token_cache(benchmark, candidates_by_size):
+    texts = [c["query"] for c in candidates_by_size(1_000)]
+    benchmark.pedantic(score_candidates, args=(ORIGINAL, texts), setup=token_cache.clear, rounds=10)
+
+@pytest.mark.benchmark(group="pareto-optimal")
+@pytest.mark.parametrize("size", corpus_sizes())
+def test_pareto_optimal(benchmark, candidates_by_size, size):
+    assert benchmark(pareto_optimal, candidates_by_size(size), ORIGINAL)
+
+@pytest.mark.benchmark(group="rouge-l-bleu-normalized")
+@pytest.mark.parametrize("size", corpus_sizes())
+def test_rouge_l_bleu_normalized(benchmark, candidates_by_size, size):
+    assert len(benchmark(rouge_l_bleu_normalized, candidates_by_size(size), ORIGINAL)) == 1
+
+@pytest.mark.benchmark(group="threshold-filter")
+@pytest.mark.parametrize("size", corpus_sizes())
+def test_filter_by_thresholds(benchmark, candidates_by_size, size):
+    benchmark(filter_by_rouge_l_bleu_thresholds, candidates_by_size(size), ORIGINAL)
+
+@pytest.mark.benchmark(group="llm-similarity")
+@pytest.mark.parametrize("batch_size", [1, 20])
+def test_llm_semantic_similarity(benchmark, fake_llm, candidates_by_size, batch_size):
+    result = benchmark(llm_semantic_similarity, candidates_by_size(1_000), ORIGINAL, fake_llm, batch_size=batch_size)
+    assert len(result) == 1
@@ -0,0 +1,73 @@
+"""
+Compares a benchmark run against a baseline run recorded on the same machine.
+
+Usage (from the 13/ directory)::
+
+    git stash && python -m pytest benchmarks --benchmark-json=baseline.json && git stash pop
+    python -m pytest benchmarks --benchmark-json=current.json
+    python benchmarks/compare.py baseline.json current.json --threshold 0.2
+
+Prints the time of every benchmark in both runs and exits with status 1 if any
+benchmark got slower than the baseline by more than the threshold. The minimum
+is compared by default: it is the statistic least affected by other load on
+the machine.
+"""
+
+import argparse
+import json
+import sys
+from typing import Dict, List, Optional
+
+STATS = ("min", "median", "mean")
+
+def load_times(path: str, stat: str = "min") -> Dict[str, float]:
+    """Returns benchmark full name -> seconds (the given statistic) from a pytest-benchmark JSON file."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return {bench["fullname"]: bench["stats"][stat] for bench in data["benchmarks"]}
+
+def _format_time(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f}{unit}"
+    return f"{seconds / 1e-9:.0f}ns"
+
+def compare(baseline: Dict[str, float], current: Dict[str, float], threshold: float) -> List[str]:
+    """Prints the comparison table and returns the names of the regressed benchmarks."""
+    regressions = []
+    width = max((len(name) for name in baseline.keys() | current.keys()), default=10)
+    print(f"{'benchmark':<{width}}  {'baseline':>10}  {'current':>10}  {'change':>8}")
+    for name in sorted(baseline.keys() | current.keys()):
+        before, after = baseline.get(name), current.get(name)
+        if before is None or after is None:
+            status = "new" if before is None else "missing"
+            print(f"{name:<{width}}  {'-' if before is None else _format_time(before):>10}  "
+                  f"{'-' if after is None else _format_time(after):>10}  {status:>8}")
+            continue
+        change = after / before - 1
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:<{width}}  {_format_time(before):>10}  {_format_time(after):>10}  {change:>+8.1%}{flag}")
+    return regressions
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare pytest-benchmark results against a baseline.")
+    parser.add_argument("baseline", help="Baseline JSON written with --benchmark-json.")
+    parser.add_argument("current", help="Current JSON written with --benchmark-json.")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Allowed slowdown before failing (default: 0.2 = 20%%).")
+    parser.add_argument("--stat", choices=STATS, default="min",
+                        help="Statistic compared between the runs (default: min).")
+    args = parser.parse_args(argv)
+
+    regressions = compare(load_times(args.baseline, args.stat), load_times(args.current, args.stat), args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}.")
+        return 1
+    print("\nNo regressions.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
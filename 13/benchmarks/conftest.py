@@ -0,0 +1,65 @@
+"""
+Shared fixtures for the benchmark suite.
+
+Run from the 13/ directory (see the README section on benchmarks)::
+
+    python -m pytest benchmarks
+    QR_BENCH_LARGE=1 python -m pytest benchmarks   # include the 100k-candidate corpora
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import pytest_benchmark  # noqa: F401
+except ImportError:
+    # The suite needs the benchmark fixture; skip it instead of erroring
+    collect_ignore_glob = ["bench_*.py"]
+
+from queryrewrite.llm.base import LLMBase
+
+LARGE = os.environ.get("QR_BENCH_LARGE") == "1"
+
+SMALL, MEDIUM, LARGE_SIZE = 10, 1_000, 100_000
+
+def corpus_sizes():
+    """Parametrization of the corpus sizes; the 100k size is opt-in via QR_BENCH_LARGE=1."""
+    return [
+        SMALL,
+        MEDIUM,
+        pytest.param(LARGE_SIZE, marks=pytest.mark.skipif(not LARGE, reason="set QR_BENCH_LARGE=1 to run")),
+    ]
+
+class FakeLLM(LLMBase):
+    """Deterministic, zero-latency LLM answering the prompts used by queryrewrite."""
+
+    model = "fake"
+
+    def __init__(self):
+        self.calls = 0
+
+    def invoke(self, prompt: str) -> str:
+        self.calls += 1
+        if "同义词" in prompt and "json object" in prompt:
+            words = json.loads(prompt[prompt.rindex("["):])
+            return json.dumps({word: [f"{word}甲", f"{word}乙"] for word in words}, ensure_ascii=False)
+        if "同义词" in prompt:
+            return '["近义词一", "近义词二", "近义词三"]'
+        if "json list" in prompt and "相似度" in prompt:
+            count = prompt.count("\n") - 3
+            return json.dumps([0.8] * max(count, 1))
+        if "相似度" in prompt:
+            return "semantic_similarity=0.8"
+        return json.dumps(
+            {"response": [{"query": f"改写{i}：如何评估大模型的效果", "reference": "参考答案"} for i in range(10)]},
+            ensure_ascii=False,
+        )
+
+@pytest.fixture
+def fake_llm():
+    return FakeLLM()
@@ -0,0 +1,64 @@
+"""Deterministic synthetic Chinese query corpora for the benchmarks."""
+
+import random
+from typing import List
+
+from queryrewrite.utils.data_models import Glossary, Query, RewrittenQuery
+
+GLOSSARY: Glossary = [
+    ["测试", "评估", "评测", "检验"],
+    ["大模型", "大语言模型", "LLM"],
+    ["效果", "表现", "性能"],
+    ["方法", "方式", "手段"],
+    ["问答", "对话", "交互"],
+    ["准确率", "精确度", "正确率"],
+    ["应用", "系统", "产品"],
+    ["数据", "语料", "样本"],
+]
+
+_QUESTIONS = ["如何", "怎样", "怎么", "为什么要", "有哪些"]
+_VERBS = ["测试", "评估", "提升", "监控", "分析"]
+_SUBJECTS = ["大模型", "问答", "应用", "检索系统", "推荐模型"]
+_ATTRIBUTES = ["效果", "准确率", "性能", "稳定性", "数据质量"]
+_TAILS = ["？", "的方法", "的最佳实践", "，需要注意什么？", ""]
+
+def make_queries(n: int, seed: int = 0) -> List[Query]:
+    """Builds n template queries such as "如何评估大模型的准确率？"."""
+    rng = random.Random(seed)
+    return [
+        {
+            "query": f"{rng.choice(_QUESTIONS)}{rng.choice(_VERBS)}{rng.choice(_SUBJECTS)}的{rng.choice(_ATTRIBUTES)}{rng.choice(_TAILS)}",
+            "reference": "参考答案",
+        }
+        for _ in range(n)
+    ]
+
+def make_candidates(original_query: str, n: int, seed: int = 0) -> List[RewrittenQuery]:
+    """Builds n rewrite candidates by swapping glossary synonyms and dropping or repeating words."""
+    rng = random.Random(seed)
+    synonyms = {word: group for group in GLOSSARY for word in group}
+    words = []
+    for word in _split(original_query):
+        words.append(synonyms.get(word, [word]))
+    candidates = []
+    for _ in range(n):
+        chosen = [rng.choice(group) for group in words]
+        if len(chosen) > 2 and rng.random() < 0.3:
+            del chosen[rng.randrange(len(chosen))]
+        if rng.random() < 0.2:
+            chosen.insert(rng.randrange(len(chosen) + 1), rng.choice(_ATTRIBUTES))
+        candidates.append({"query": "".join(chosen), "reference": "参考答案"})
+    return candidates
+
+def _split(text: str) -> List[str]:
+    """Greedy longest-match split on the corpus vocabulary (keeps the corpus independent of jieba)."""
+    vocabulary = {w for group in GLOSSARY for w in group} | set(_QUESTIONS + _VERBS + _SUBJECTS + _ATTRIBUTES)
+    longest = max(len(w) for w in vocabulary)
+    words, i = [], 0
+    while i < len(text):
+        for size in range(min(longest, len(text) - i), 0, -1):
+            if size == 1 or text[i:i + size] in vocabulary:
+                words.append(text[i:i + size])
+                i += size
+                break
+    return words
@@ -5,4 +5,8 @@
 
 __version__ = "0.1.0"
 __author__ = "CrissChan"
-__email__ = "can101208@gmail.com"
\ No newline at end of file
+__email__ = "can101208@gmail.com"
+
+from .tokenizer_state import warmup
+
+__all__ = ["warmup"]
\ No newline at end of file
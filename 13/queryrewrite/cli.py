@@ -0,0 +1,186 @@
+"""
+Batch command line interface: ``python -m queryrewrite``.
+
+Streams a JSONL file of ``{"query": ..., "reference": ...}`` records through a
+rewriting method and a validation method, appending one result per record to
+an output JSONL file as soon as it finishes. Finished input lines are recorded
+in a checkpoint file, so an interrupted job resumes where it left off.
+"""
+
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from typing import Iterator, List, Optional, Set, Tuple
+
+from queryrewrite.instrumentation import instrument
+from queryrewrite.rewriting.base import RewriteMethod, create_rewriter
+from queryrewrite.tokenizer_state import warmup
+from queryrewrite.utils.data_models import Glossary, Query
+from queryrewrite.validation.base import ValidationMethod, validate
+
+def read_queries(path: str) -> Iterator[Tuple[int, Optional[Query], Optional[str]]]:
+    """
+    Yields (line number, query, error) for every non-empty line of a JSONL file.
+
+    A line that is not a JSON object with a "query" key yields a None query and
+    the parse error instead of aborting the whole file.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for index, line in enumerate(f):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+                query = {"query": record["query"], "reference": record.get("reference", "")}
+            except (json.JSONDecodeError, KeyError, TypeError, AttributeError) as e:
+                yield index, None, f"{type(e).__name__}: {e}"
+                continue
+            yield index, query, None
+
+def load_checkpoint(path: str) -> Set[int]:
+    """Returns the input line numbers already recorded as finished."""
+    if not os.path.exists(path):
+        return set()
+    with open(path, "r", encoding="utf-8") as f:
+        return {int(line) for line in f if line.strip().isdigit()}
+
+# Bytes read per step while looking for the last complete line
+_REPAIR_BLOCK_SIZE = 64 * 1024
+
+def repair_output(path: str):
+    """Drops a partially written last line left behind by a crash."""
+    if not os.path.exists(path):
+        return
+    with open(path, "rb+") as f:
+        # Only the tail is read: scan backwards block by block for the last newline
+        end = f.seek(0, os.SEEK_END)
+        position = end
+        while position > 0:
+            start = max(0, position - _REPAIR_BLOCK_SIZE)
+            f.seek(start)
+            block = f.read(position - start)
+            newline = block.rfind(b"\n")
+            if newline != -1:
+                position = start + newline + 1
+                break
+            position = start
+        if position != end:
+            f.truncate(position)
+
+def load_glossary(path: str):
+    """Loads a JSON glossary, or a compiled glossary index (.idx)."""
+    if path.endswith(".idx"):
+        from queryrewrite.rewriting.glossary_index import load_compiled_glossary
+        return load_compiled_glossary(path)
+    with open(path, "r", encoding="utf-8") as f:
+        glossary: Glossary = json.load(f)
+    return glossary
+
+def build_llm(args: argparse.Namespace):
+    """Creates the Ollama LLM, wrapped in a response cache if requested."""
+    from queryrewrite.llm.ollama import OllamaLLM
+    llm = OllamaLLM(model=args.model, base_url=args.base_url)
+    if args.cache:
+        from queryrewrite.llm.cached import CachedLLM
+        llm = CachedLLM(llm, path=args.cache)
+    return llm
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m queryrewrite",
+        description="Rewrite and validate a JSONL file of queries.",
+    )
+    parser.add_argument("input", help="Input JSONL file, one {\"query\", \"reference\"} object per line.")
+    parser.add_argument("output", help="Output JSONL file; results are appended as they finish.")
+    parser.add_argument("--rewrite", required=True, choices=[m.value for m in RewriteMethod],
+                        help="Rewriting method.")
+    parser.add_argument("--validate", default=ValidationMethod.NONE.value, choices=[m.value for m in ValidationMethod],
+                        help="Validation method (default: none).")
+    parser.add_argument("--glossary", help="Glossary JSON file or compiled glossary index (.idx) for the glossary method.")
+    parser.add_argument("--model", default="qwen3:8b", help="Ollama model name (default: qwen3:8b).")
+    parser.add_argument("--base-url", default="http://localhost:11434", help="Ollama server URL.")
+    parser.add_argument("--thinking", default="", help="Prefix added to LLM prompts, e.g. /no_think.")
+    parser.add_argument("--cache", help="SQLite file used to cache LLM responses.")
+    parser.add_argument("--concurrency", type=int, default=4, help="Number of queries processed at the same time (default: 4).")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <output>.ckpt).")
+    parser.add_argument("--tokenizer-state", help="Saved jieba state loaded at startup, or created if missing or outdated.")
+    parser.add_argument("--trace", help="JSONL file receiving per-stage timings and counters of this run.")
+    args = parser.parse_args(argv)
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+    if args.rewrite == RewriteMethod.GLOSSARY.value and not args.glossary:
+        parser.error("--glossary is required for the glossary method")
+    return args
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    rewrite_method = RewriteMethod(args.rewrite)
+    validation_method = ValidationMethod(args.validate)
+    checkpoint_path = args.checkpoint or f"{args.output}.ckpt"
+
+    glossary = load_glossary(args.glossary) if args.glossary else None
+    if args.tokenizer_state:
+        # A compiled glossary index is matched directly and has no word list to add
+        warmup(glossary if isinstance(glossary, list) else None, state_path=args.tokenizer_state,
+               pos_tagging=rewrite_method == RewriteMethod.SYNONYM)
+    needs_llm = rewrite_method != RewriteMethod.GLOSSARY or validation_method == ValidationMethod.LLM_SEMANTIC_SIMILARITY
+    llm = build_llm(args) if needs_llm else None
+    rewriter = create_rewriter(rewrite_method, glossary, llm, args.thinking)
+
+    def process(index: int, query: Query) -> dict:
+        try:
+            rewritten = rewriter.rewrite(query)
+            validated = validate(validation_method, rewritten, query["query"], llm, args.thinking)
+            return {"index": index, "query": query, "rewritten_queries": validated, "error": None}
+        except Exception as e:
+            return {"index": index, "query": query, "rewritten_queries": [], "error": f"{type(e).__name__}: {e}"}
+
+    # A crash can leave a torn last line in either file, e.g. "1" of "12" in the checkpoint
+    repair_output(checkpoint_path)
+    done = load_checkpoint(checkpoint_path)
+    repair_output(args.output)
+    processed = failed = 0
+    # Bound the number of submitted records so the input is streamed, not loaded
+    max_pending = args.concurrency * 2
+
+    with instrument(trace_path=args.trace) if args.trace else nullcontext(), \
+            open(args.output, "a", encoding="utf-8") as output, \
+            open(checkpoint_path, "a", encoding="utf-8") as checkpoint, \
+            ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+
+        def write_result(result: dict):
+            nonlocal processed, failed
+            # The result is flushed before its checkpoint entry: a crash in between
+            # repeats the record on resume (dedupe on "index") but never loses it.
+            output.write(json.dumps(result, ensure_ascii=False) + "\n")
+            output.flush()
+            checkpoint.write(f"{result['index']}\n")
+            checkpoint.flush()
+            processed += 1
+            failed += result["error"] is not None
+
+        def write_finished(futures):
+            for future in futures:
+                write_result(future.result())
+
+        pending = set()
+        for index, query, error in read_queries(args.input):
+            if index in done:
+                continue
+            if error is not None:
+                write_result({"index": index, "query": None, "rewritten_queries": [], "error": error})
+                continue
+            pending.add(executor.submit(process, index, query))
+            if len(pending) >= max_pending:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                write_finished(finished)
+        while pending:
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            write_finished(finished)
+
+    print(f"Processed {processed} queries ({failed} failed), skipped {len(done)} already finished.", file=sys.stderr)
+    return 0
@@ -0,0 +1,250 @@
+"""
+Optional per-stage instrumentation of rewriting and validation.
+
+Library code reports what it does through the module-level ``stage``,
+``count``, ``invoke_llm`` and ``stream_llm`` helpers. Nothing is recorded unless a Recorder is
+active, and while none is, each helper is a single global lookup::
+
+    from queryrewrite.instrumentation import instrument
+
+    with instrument(trace_path="trace.jsonl") as recorder:
+        results = rewrite_and_validate(query, RewriteMethod.SYNONYM, ValidationMethod.PARETO_OPTIMAL, llm=llm)
+    print(recorder.to_dict())
+
+Stages nest (e.g. ``llm`` and ``tokenize`` run inside ``rewrite.synonym``, also
+when the rewriter is consumed through ``rewriting.iter_rewrite``), so their
+times are inclusive. The active recorder is process-wide, so work done
+on thread pools is recorded too; work done in scoring worker processes is not.
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Iterator, Optional
+
+class Recorder:
+    """
+    Collects per-stage wall time and named counters.
+
+    Counters used by the library:
+        ``llm.calls``, ``llm.prompt_chars``, ``llm.response_chars``: LLM calls and their sizes.
+        ``token_cache.hits`` / ``token_cache.misses``: jieba tokenization cache.
+        ``llm_cache.hits`` / ``llm_cache.misses``: CachedLLM lookups.
+        ``synonym_cache.hits`` / ``synonym_cache.misses``: synonym cache lookups.
+        ``candidates.generated``: rewritten queries produced by the rewriters.
+        ``candidates.validated`` / ``candidates.accepted``: candidates seen / kept by validation.
+    """
+
+    def __init__(self, trace_path: Optional[str] = None):
+        """
+        Initializes the Recorder.
+
+        Args:
+            trace_path: If given, every finished stage and LLM call is appended
+                to this JSONL file as it happens.
+        """
+        self.trace_path = trace_path
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.counters: Dict[str, float] = {}
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+        self._trace = open(trace_path, "a", encoding="utf-8") if trace_path else None
+
+    def _write_event(self, event: Dict[str, Any]):
+        # Called with the lock held
+        self._trace.write(json.dumps(event, ensure_ascii=False) + "\n")
+
+    def add_time(self, name: str, seconds: float, started: Optional[float] = None):
+        """Adds one occurrence of a stage that took ``seconds``."""
+        with self._lock:
+            stats = self.stages.get(name)
+            if stats is None:
+                stats = self.stages[name] = {"count": 0, "total": 0.0, "max": 0.0}
+            stats["count"] += 1
+            stats["total"] += seconds
+            if seconds > stats["max"]:
+                stats["max"] = seconds
+            if self._trace is not None:
+                self._write_event({
+                    "type": "stage",
+                    "name": name,
+                    "start": round((started if started is not None else time.perf_counter() - seconds) - self._started, 6),
+                    "duration": round(seconds, 6),
+                    "thread": threading.current_thread().name,
+                })
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Times the enclosed block as one occurrence of a stage."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - started, started)
+
+    def count(self, name: str, value: float = 1):
+        """Adds ``value`` to a counter."""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def record_llm_call(self, prompt: str, response: str, seconds: float):
+        """Records one LLM call: its latency (stage ``llm``) and prompt/response sizes."""
+        self.add_time("llm", seconds)
+        with self._lock:
+            for name, value in (("llm.calls", 1), ("llm.prompt_chars", len(prompt)), ("llm.response_chars", len(response))):
+                self.counters[name] = self.counters.get(name, 0) + value
+            if self._trace is not None:
+                self._write_event({
+                    "type": "llm",
+                    "prompt_chars": len(prompt),
+                    "response_chars": len(response),
+                    "duration": round(seconds, 6),
+                })
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Returns a snapshot of the recorded data.
+
+        Returns:
+            A dict with ``elapsed`` (seconds since the recorder was created),
+            ``stages`` (name -> count, total, mean and max seconds) and ``counters``.
+        """
+        with self._lock:
+            return {
+                "elapsed": time.perf_counter() - self._started,
+                "stages": {
+                    name: {**stats, "mean": stats["total"] / stats["count"]}
+                    for name, stats in self.stages.items()
+                },
+                "counters": dict(self.counters),
+            }
+
+    def write_jsonl(self, path: str):
+        """Appends the snapshot as one ``{"type": "summary", ...}`` line to a JSONL file."""
+        line = json.dumps({"type": "summary", **self.to_dict()}, ensure_ascii=False)
+        with self._lock:
+            if self._trace is not None and path == self.trace_path:
+                self._trace.write(line + "\n")
+                self._trace.flush()
+                return
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+    def close(self):
+        """Closes the trace file."""
+        with self._lock:
+            if self._trace is not None:
+                self._trace.close()
+                self._trace = None
+
+# The recorder the library reports to, or None when instrumentation is off
+_active: Optional[Recorder] = None
+_DISABLED = nullcontext()
+
+def get_recorder() -> Optional[Recorder]:
+    """Returns the active recorder, or None."""
+    return _active
+
+@contextmanager
+def instrument(recorder: Optional[Recorder] = None, trace_path: Optional[str] = None) -> Iterator[Recorder]:
+    """
+    Activates a recorder for the enclosed block.
+
+    Args:
+        recorder: The recorder to activate. A new one is created if omitted.
+        trace_path: JSONL trace file for a newly created recorder. A summary line
+            is appended to it and it is closed when the block exits.
+
+    Returns:
+        A context manager yielding the active recorder.
+    """
+    global _active
+    owned = recorder is None
+    if owned:
+        recorder = Recorder(trace_path)
+    previous, _active = _active, recorder
+    try:
+        yield recorder
+    finally:
+        _active = previous
+        if owned and recorder.trace_path:
+            recorder.write_jsonl(recorder.trace_path)
+            recorder.close()
+
+def stage(name: str):
+    """Times the enclosed block as stage ``name`` if a recorder is active."""
+    recorder = _active
+    if recorder is None:
+        return _DISABLED
+    return recorder.stage(name)
+
+def iter_stage(name: str, iterator: Iterator[Any]) -> Iterator[Any]:
+    """
+    Yields from ``iterator``, recording the time spent producing its items as one stage.
+
+    Only the time inside the iterator counts, not the time the consumer spends
+    between items. The iterator is closed when this generator is closed.
+    """
+    recorder = _active
+    if recorder is None:
+        yield from iterator
+        return
+    started = time.perf_counter()
+    elapsed = 0.0
+    try:
+        while True:
+            resumed = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                elapsed += time.perf_counter() - resumed
+            yield item
+    finally:
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            close()
+        recorder.add_time(name, elapsed, started)
+
+def count(name: str, value: float = 1):
+    """Adds ``value`` to counter ``name`` if a recorder is active."""
+    recorder = _active
+    if recorder is not None:
+        recorder.count(name, value)
+
+def invoke_llm(llm, prompt: str) -> str:
+    """Calls ``llm.invoke(prompt)``, recording the call if a recorder is active."""
+    recorder = _active
+    if recorder is None:
+        return llm.invoke(prompt)
+    started = time.perf_counter()
+    response = llm.invoke(prompt)
+    recorder.record_llm_call(prompt, str(response), time.perf_counter() - started)
+    return response
+
+def stream_llm(llm, prompt: str) -> Iterator[str]:
+    """Yields from ``llm.stream(prompt)``, recording the call once the stream ends or is closed."""
+    recorder = _active
+    if recorder is None:
+        yield from llm.stream(prompt)
+        return
+    chunks = []
+    started = time.perf_counter()
+    try:
+        for chunk in llm.stream(prompt):
+            chunks.append(chunk)
+            yield chunk
+    finally:
+        recorder.record_llm_call(prompt, "".join(chunks), time.perf_counter() - started)
+
+async def ainvoke_llm(llm, prompt: str) -> str:
+    """Asynchronous variant of invoke_llm."""
+    recorder = _active
+    if recorder is None:
+        return await llm.ainvoke(prompt)
+    started = time.perf_counter()
+    response = await llm.ainvoke(prompt)
+    recorder.record_llm_call(prompt, str(response), time.perf_counter() - started)
+    return response
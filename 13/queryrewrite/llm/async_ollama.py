@@ -0,0 +1,154 @@
+import asyncio
+import json
+import threading
+import weakref
+from typing import Any, AsyncGenerator, Dict, Iterator, Optional, Tuple
+
+import httpx
+
+from queryrewrite.llm.base import LLMBase
+
+async def _close_with_loop(client: httpx.AsyncClient) -> AsyncGenerator[None, None]:
+    """
+    Closes the client when its event loop shuts down.
+
+    The loop finalizes live async generators in shutdown_asyncgens (asyncio.run
+    does this before closing the loop), which runs the finally block inside the
+    loop that owns the client's connections.
+    """
+    try:
+        yield
+    finally:
+        await client.aclose()
+
+class AsyncOllamaLLM(LLMBase):
+    """
+    LLM implementation for Ollama models talking to the HTTP API directly.
+
+    Requests go through pooled keep-alive HTTP clients, so many concurrent calls
+    share a fixed set of connections instead of opening a socket per call. The
+    number of requests in flight is capped by ``max_in_flight`` for both the
+    sync and the async interface.
+
+    Each event loop that awaits the instance gets its own async client and
+    limit, so one instance can be shared by several loops (e.g. one per
+    thread). A loop's client is closed when that loop shuts down.
+    """
+
+    def __init__(
+        self,
+        model: str = "llama3.1:8b",
+        base_url: str = "http://localhost:11434",
+        max_in_flight: int = 16,
+        timeout: float = 120.0,
+        options: Optional[Dict[str, Any]] = None,
+    ):
+        """
+        Initializes the AsyncOllamaLLM.
+
+        Args:
+            model: The name of the Ollama model to use.
+            base_url: The base URL of the Ollama server.
+            max_in_flight: Maximum number of concurrent requests (and pooled connections).
+            timeout: Request timeout in seconds.
+            options: Optional Ollama generation options (e.g. temperature, seed).
+        """
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1.")
+        self.model = model
+        self.base_url = base_url
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.options = options or {}
+        self._limits = httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight)
+        self._client = httpx.Client(base_url=self.base_url, limits=self._limits, timeout=self.timeout)
+        self._sync_semaphore = threading.BoundedSemaphore(max_in_flight)
+        # Async clients and semaphores are bound to an event loop, so they are
+        # created lazily on first use inside each running loop: loop -> (client, semaphore, closer)
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._async_lock = threading.Lock()
+
+    def _payload(self, prompt: str, stream: bool = False) -> Dict[str, Any]:
+        payload = {"model": self.model, "prompt": prompt, "stream": stream}
+        if self.options:
+            payload["options"] = self.options
+        return payload
+
+    def _new_async_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(base_url=self.base_url, limits=self._limits, timeout=self.timeout)
+
+    async def _get_async_client(self) -> Tuple[httpx.AsyncClient, asyncio.Semaphore]:
+        loop = asyncio.get_running_loop()
+        with self._async_lock:
+            entry = self._async_clients.get(loop)
+            if entry is None:
+                # Loops that already shut down have closed their clients
+                for stale in [other for other in self._async_clients if other.is_closed()]:
+                    del self._async_clients[stale]
+                client = self._new_async_client()
+                entry = (client, asyncio.Semaphore(self.max_in_flight), _close_with_loop(client))
+                self._async_clients[loop] = entry
+                started = False
+            else:
+                started = True
+        client, semaphore, closer = entry
+        if not started:
+            # Runs to the first yield here, which registers it with the running loop
+            await closer.__anext__()
+        return client, semaphore
+
+    def invoke(self, prompt: str) -> str:
+        """Invoke the Ollama model with a given prompt."""
+        with self._sync_semaphore:
+            response = self._client.post("/api/generate", json=self._payload(prompt))
+        response.raise_for_status()
+        return response.json()["response"]
+
+    async def ainvoke(self, prompt: str) -> str:
+        """Asynchronously invoke the Ollama model with a given prompt."""
+        client, semaphore = await self._get_async_client()
+        async with semaphore:
+            response = await client.post("/api/generate", json=self._payload(prompt))
+        response.raise_for_status()
+        return response.json()["response"]
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        """
+        Invoke the Ollama model and yield the response tokens as they arrive.
+
+        The request holds one of the ``max_in_flight`` slots until the stream
+        is exhausted or closed.
+        """
+        with self._sync_semaphore:
+            with self._client.stream("POST", "/api/generate", json=self._payload(prompt, stream=True)) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    data = json.loads(line)
+                    if data.get("response"):
+                        yield data["response"]
+                    if data.get("done"):
+                        break
+
+    def close(self):
+        """Closes the sync connection pool."""
+        self._client.close()
+
+    async def aclose(self):
+        """
+        Closes the sync connection pool and the async pool of the running loop.
+
+        Async pools of other event loops are closed when those loops shut down.
+        """
+        self._client.close()
+        with self._async_lock:
+            entry = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if entry is not None:
+            await entry[2].aclose()
+
+    async def __aenter__(self) -> "AsyncOllamaLLM":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
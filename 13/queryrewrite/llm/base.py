@@ -1,4 +1,6 @@
+import asyncio
 from abc import ABC, abstractmethod
+from typing import Iterator
 
 class LLMBase(ABC):
     """Abstract base class for all LLM implementations."""
@@ -7,3 +9,27 @@ class LLMBase(ABC):
     def invoke(self, prompt: str) -> str:
         """Invoke the LLM with a given prompt and return the response."""
         pass
+
+    async def ainvoke(self, prompt: str) -> str:
+        """
+        Asynchronously invoke the LLM with a given prompt and return the response.
+
+        The default implementation runs ``invoke`` in a worker thread so that every
+        LLM can be awaited; implementations with a native async client should
+        override it.
+        """
+        return await asyncio.to_thread(self.invoke, prompt)
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        """
+        Invoke the LLM and yield the response in chunks as it is generated.
+
+        The default implementation yields the whole ``invoke`` response as a
+        single chunk; implementations backed by a streaming API should override it.
+        """
+        yield self.invoke(prompt)
+
+
+def get_model_name(llm) -> str:
+    """Returns a stable name identifying the model behind an LLM instance."""
+    return str(getattr(llm, "model", type(llm).__name__))
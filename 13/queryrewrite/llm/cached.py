@@ -0,0 +1,158 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from queryrewrite import instrumentation
+from queryrewrite.llm.base import LLMBase, get_model_name
+
+class CachedLLM(LLMBase):
+    """
+    LLM wrapper that memoizes responses in a local SQLite file.
+
+    Entries are content-addressed by a hash of the model name, the generation
+    options and the prompt, so the same prompt sent to the same model is only
+    paid for once, across runs. The cache is bounded by ``max_entries``
+    (least recently used entries are evicted first) and, optionally, by a
+    time-to-live.
+    """
+
+    def __init__(
+        self,
+        llm: LLMBase,
+        path: str = "llm_cache.sqlite3",
+        model: Optional[str] = None,
+        options: Optional[Dict[str, Any]] = None,
+        max_entries: Optional[int] = 100_000,
+        ttl: Optional[float] = None,
+    ):
+        """
+        Initializes the CachedLLM.
+
+        Args:
+            llm: The LLM instance whose responses are cached.
+            path: Path of the SQLite cache file (":memory:" for a non-persistent cache).
+            model: Model name used in the cache key. Defaults to ``llm.model``.
+            options: Generation options used in the cache key. Defaults to ``llm.options``.
+            max_entries: Maximum number of cached responses, or None for no limit.
+            ttl: Maximum age of a cached response in seconds, or None to never expire.
+        """
+        if max_entries is not None and max_entries < 1:
+            raise ValueError("max_entries must be at least 1.")
+        self.llm = llm
+        self.path = path
+        self.model = model if model is not None else get_model_name(llm)
+        self.options = options if options is not None else getattr(llm, "options", {})
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, created REAL NOT NULL, last_used INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_last_used ON llm_cache (last_used)")
+        self._conn.commit()
+        self._size, last_used = self._conn.execute("SELECT COUNT(*), MAX(last_used) FROM llm_cache").fetchone()
+        # Monotonic use counter ordering entries for LRU eviction
+        self._clock = last_used or 0
+
+    def cache_key(self, prompt: str) -> str:
+        """Returns the content address of a prompt for this model and options."""
+        material = json.dumps(
+            {"model": self.model, "options": self.options, "prompt": prompt},
+            ensure_ascii=False,
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _lookup(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT response, created FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl is not None and now - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                self._size -= 1
+                row = None
+            if row is None:
+                self.misses += 1
+                instrumentation.count("llm_cache.misses")
+                return None
+            self._clock += 1
+            self._conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (self._clock, key))
+            self._conn.commit()
+            self.hits += 1
+            instrumentation.count("llm_cache.hits")
+            return row[0]
+
+    def _store(self, key: str, response: str):
+        now = time.time()
+        with self._lock:
+            self._clock += 1
+            existed = self._conn.execute("SELECT 1 FROM llm_cache WHERE key = ?", (key,)).fetchone() is not None
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, response, created, last_used) VALUES (?, ?, ?, ?)",
+                (key, response, now, self._clock),
+            )
+            if not existed:
+                self._size += 1
+            if self.max_entries is not None and self._size > self.max_entries:
+                overflow = self._size - self.max_entries
+                self._conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY last_used LIMIT ?)",
+                    (overflow,),
+                )
+                self._size -= overflow
+            self._conn.commit()
+
+    def invoke(self, prompt: str) -> str:
+        """Returns the cached response for the prompt, invoking the wrapped LLM on a miss."""
+        key = self.cache_key(prompt)
+        response = self._lookup(key)
+        if response is None:
+            response = self.llm.invoke(prompt)
+            self._store(key, response)
+        return response
+
+    async def ainvoke(self, prompt: str) -> str:
+        """Asynchronous variant of invoke, awaiting the wrapped LLM on a miss."""
+        key = self.cache_key(prompt)
+        response = self._lookup(key)
+        if response is None:
+            response = await self.llm.ainvoke(prompt)
+            self._store(key, response)
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit/miss counters and the current number of cached entries."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": self._size,
+            }
+
+    def clear(self):
+        """Removes all cached responses and resets the counters."""
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+            self._size = 0
+            self.hits = 0
+            self.misses = 0
+
+    def close(self):
+        """Closes the underlying SQLite connection."""
+        with self._lock:
+            self._conn.close()
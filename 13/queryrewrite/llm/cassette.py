@@ -0,0 +1,274 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from queryrewrite.llm.base import LLMBase, get_model_name
+
+RECORD = "record"
+REPLAY = "replay"
+AUTO = "auto"
+
+class CassetteMissError(KeyError):
+    """Raised in replay mode when a prompt was never recorded."""
+
+class Cassette:
+    """
+    Record/replay store of prompt→response pairs with their latency.
+
+    Interactions are appended to a JSONL file (gzip-compressed if the path ends
+    in ``.gz``), one line per call, keyed by a hash of the model name and the
+    prompt. When the same prompt was recorded several times its responses are
+    replayed in recording order, so runs with repeated prompts replay exactly.
+
+    The file is written through one handle that stays open until close() (the
+    cassette is also a context manager); a ``.gz`` cassette is only complete
+    once closed. Plain files are flushed after every interaction.
+
+    Modes:
+        ``record``: start a new cassette, always call the LLM and record the interaction.
+        ``replay``: never call the LLM; unknown prompts raise CassetteMissError.
+        ``auto``: replay recorded prompts and record the others.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        mode: str = AUTO,
+        simulate_latency: bool = False,
+        latency_scale: float = 1.0,
+        store_prompts: bool = False,
+    ):
+        """
+        Initializes the Cassette.
+
+        Args:
+            path: Path of the cassette file.
+            mode: One of "record", "replay" or "auto".
+            simulate_latency: Sleep for the recorded latency when replaying.
+            latency_scale: Factor applied to the recorded latency when simulating it.
+            store_prompts: Also store the prompt text (larger files, easier to inspect).
+        """
+        if mode not in (RECORD, REPLAY, AUTO):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.simulate_latency = simulate_latency
+        self.latency_scale = latency_scale
+        self.store_prompts = store_prompts
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[str, List[Dict[str, Any]]] = {}
+        # Responses not yet replayed in this run, per key
+        self._queues: Dict[str, Deque[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self._file = None
+        if mode != RECORD:
+            self._load()
+
+    def _open(self, mode: str):
+        if self.path.endswith(".gz"):
+            return gzip.open(self.path, mode + "t", encoding="utf-8")
+        return open(self.path, mode, encoding="utf-8")
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with self._open("r") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._entries.setdefault(entry["key"], []).append(entry)
+        self._queues = {key: deque(entries) for key, entries in self._entries.items()}
+
+    @staticmethod
+    def key(model: str, prompt: str) -> str:
+        """Returns the cassette key of a prompt sent to a model."""
+        material = json.dumps({"model": model, "prompt": prompt}, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def __len__(self) -> int:
+        """Number of recorded interactions."""
+        return sum(len(entries) for entries in self._entries.values())
+
+    def _next(self, key: str) -> Optional[Dict[str, Any]]:
+        """Returns the next recorded entry for a key (the last one once all were replayed)."""
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                self.misses += 1
+                return None
+            self.hits += 1
+            queue = self._queues[key]
+            return queue.popleft() if queue else entries[-1]
+
+    def _record(self, key: str, prompt: str, response: str, latency: float, kind: str):
+        entry = {"key": key, "response": response, "latency": round(latency, 6), "kind": kind}
+        if self.store_prompts:
+            entry["prompt"] = prompt
+        with self._lock:
+            self._entries.setdefault(key, []).append(entry)
+            self._queues.setdefault(key, deque())
+            if self._file is None:
+                # Recording replaces an existing cassette, auto mode extends it
+                self._file = self._open("w" if self.mode == RECORD else "a")
+            self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            if not self.path.endswith(".gz"):
+                # Flushing a gzip stream per line would cost most of its compression
+                self._file.flush()
+
+    def close(self):
+        """Closes the cassette file; a gzip cassette is only complete once closed."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self) -> "Cassette":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _miss(self, key: str):
+        if self.mode == REPLAY:
+            raise CassetteMissError(f"No recorded response for prompt key {key} in {self.path}")
+
+    def play(self, model: str, prompt: str, call: Callable[[], Tuple[str, str]]) -> Tuple[str, str]:
+        """
+        Returns (response, kind) for a prompt, replaying it or recording a live call.
+
+        Args:
+            model: Model name used in the key.
+            prompt: The prompt text.
+            call: Performs the live LLM call and returns (response text, kind).
+        """
+        key = self.key(model, prompt)
+        if self.mode != RECORD:
+            entry = self._next(key)
+            if entry is not None:
+                if self.simulate_latency:
+                    time.sleep(entry["latency"] * self.latency_scale)
+                return entry["response"], entry["kind"]
+            self._miss(key)
+        started = time.perf_counter()
+        response, kind = call()
+        self._record(key, prompt, response, time.perf_counter() - started, kind)
+        return response, kind
+
+    async def aplay(self, model: str, prompt: str, call: Callable[[], Awaitable[Tuple[str, str]]]) -> Tuple[str, str]:
+        """Asynchronous variant of play; latency is simulated with asyncio.sleep."""
+        key = self.key(model, prompt)
+        if self.mode != RECORD:
+            entry = self._next(key)
+            if entry is not None:
+                if self.simulate_latency:
+                    await asyncio.sleep(entry["latency"] * self.latency_scale)
+                return entry["response"], entry["kind"]
+            self._miss(key)
+        started = time.perf_counter()
+        response, kind = await call()
+        self._record(key, prompt, response, time.perf_counter() - started, kind)
+        return response, kind
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns replay hit/miss counters and the number of recorded interactions."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": sum(len(entries) for entries in self._entries.values()),
+            }
+
+class CassetteLLM(LLMBase):
+    """LLM wrapper that records responses to, or replays them from, a Cassette."""
+
+    def __init__(self, llm: Optional[LLMBase], cassette: Cassette, model: Optional[str] = None):
+        """
+        Initializes the CassetteLLM.
+
+        Args:
+            llm: The LLM to record from (may be None in replay mode).
+            cassette: The cassette to record to / replay from.
+            model: Model name used in the cassette key. Defaults to ``llm.model``.
+        """
+        self.llm = llm
+        self.cassette = cassette
+        self.model = model if model is not None else (get_model_name(llm) if llm is not None else "")
+
+    def invoke(self, prompt: str) -> str:
+        """Returns the recorded response for the prompt, or records a live call."""
+        response, _ = self.cassette.play(self.model, prompt, lambda: (self.llm.invoke(prompt), "text"))
+        return response
+
+    async def ainvoke(self, prompt: str) -> str:
+        """Asynchronous variant of invoke."""
+        async def call():
+            return await self.llm.ainvoke(prompt), "text"
+        response, _ = await self.cassette.aplay(self.model, prompt, call)
+        return response
+
+def _prompt_text(value: Any) -> str:
+    """Serializes a LangChain model input (str, PromptValue or messages) for the cassette key."""
+    from langchain_core.messages import BaseMessage
+    from langchain_core.prompt_values import PromptValue
+
+    if isinstance(value, str):
+        return value
+    if isinstance(value, PromptValue):
+        value = value.to_messages()
+    if isinstance(value, list) and all(isinstance(m, BaseMessage) for m in value):
+        return json.dumps([{"type": m.type, "content": m.content} for m in value], ensure_ascii=False)
+    return json.dumps(value, ensure_ascii=False, sort_keys=True, default=str)
+
+def cassette_runnable(llm: Any, cassette: Cassette, model: Optional[str] = None, chat: Optional[bool] = None):
+    """
+    Wraps a LangChain model (e.g. ChatOllama or langchain_ollama.OllamaLLM) for record/replay.
+
+    The returned runnable can replace the model anywhere in an LCEL chain
+    (``prompt | cassette_runnable(llm, cassette) | parser``). Chat models replay
+    as AIMessage, completion models as str.
+
+    Args:
+        llm: The LangChain model to record from (may be None in replay mode).
+        cassette: The cassette to record to / replay from.
+        model: Model name used in the cassette key. Defaults to ``llm.model``.
+        chat: Whether to return AIMessage (chat model) or str. Defaults to
+            whether ``llm`` is a chat model, or to the recorded type without ``llm``.
+
+    Returns:
+        A RunnableLambda with sync and async support.
+    """
+    from langchain_core.language_models import BaseChatModel
+    from langchain_core.messages import AIMessage, BaseMessage
+    from langchain_core.runnables import RunnableLambda
+
+    model_name = model if model is not None else (get_model_name(llm) if llm is not None else "")
+    if chat is None and llm is not None:
+        chat = isinstance(llm, BaseChatModel)
+
+    def to_record(result: Any) -> Tuple[str, str]:
+        if isinstance(result, BaseMessage):
+            return result.content, "message"
+        return result, "text"
+
+    def to_output(response: str, kind: str) -> Any:
+        as_message = chat if chat is not None else kind == "message"
+        return AIMessage(content=response) if as_message else response
+
+    def invoke(value: Any) -> Any:
+        return to_output(*cassette.play(model_name, _prompt_text(value), lambda: to_record(llm.invoke(value))))
+
+    async def ainvoke(value: Any) -> Any:
+        async def call():
+            return to_record(await llm.ainvoke(value))
+        return to_output(*await cassette.aplay(model_name, _prompt_text(value), call))
+
+    return RunnableLambda(invoke, afunc=ainvoke, name="cassette")
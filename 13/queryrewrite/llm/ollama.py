@@ -1,3 +1,5 @@
+from typing import Iterator
+
 from langchain_ollama import OllamaLLM as Ollama
 from queryrewrite.llm.base import LLMBase
 
@@ -19,3 +21,11 @@ class OllamaLLM(LLMBase):
     def invoke(self, prompt: str) -> str:
         """Invoke the Ollama model with a given prompt."""
         return self.llm.invoke(prompt)
+
+    async def ainvoke(self, prompt: str) -> str:
+        """Asynchronously invoke the Ollama model with a given prompt."""
+        return await self.llm.ainvoke(prompt)
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        """Invoke the Ollama model and yield the response tokens as they arrive."""
+        yield from self.llm.stream(prompt)
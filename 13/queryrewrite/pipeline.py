@@ -0,0 +1,78 @@
+from itertools import chain
+from typing import Iterator, List, Optional, Sequence, Union
+
+from queryrewrite.llm.base import LLMBase
+from queryrewrite.rewriting.base import RewriteMethod, iter_rewrite
+from queryrewrite.utils.data_models import Glossary, Query, RewrittenQuery
+from queryrewrite.validation.base import ValidationMethod, iter_validate
+
+def iter_rewrite_candidates(
+    rewrite_methods: Union[RewriteMethod, Sequence[RewriteMethod]],
+    query: Query,
+    glossary: Glossary = None,
+    llm: LLMBase = None,
+    thinking: str = '',
+    stream: bool = False,
+) -> Iterator[RewrittenQuery]:
+    """
+    Yields the candidates of one or more rewriting methods, one method after another.
+
+    Each rewriter is only created and run once the previous one is exhausted, so
+    a consumer that stops early never triggers the LLM calls of later methods.
+
+    Args:
+        rewrite_methods: A rewriting method or a sequence of methods to chain.
+        query: The input query to rewrite.
+        glossary: The glossary to use for the GLOSSARY method.
+        llm: The LLM instance to use for LLM-based methods.
+        thinking: Optional thinking/guidance prefix for LLM prompts.
+        stream: Stream LLM rewrites so candidates arrive while the LLM is generating.
+
+    Returns:
+        An iterator over the rewritten queries.
+    """
+    if isinstance(rewrite_methods, RewriteMethod):
+        rewrite_methods = [rewrite_methods]
+    return chain.from_iterable(
+        iter_rewrite(method, query, glossary, llm, thinking, stream) for method in rewrite_methods
+    )
+
+def rewrite_and_validate(
+    query: Query,
+    rewrite_methods: Union[RewriteMethod, Sequence[RewriteMethod]],
+    validation_method: ValidationMethod,
+    glossary: Glossary = None,
+    llm: LLMBase = None,
+    thinking: str = '',
+    stop_after: Optional[int] = None,
+    stream: bool = False,
+) -> List[RewrittenQuery]:
+    """
+    Rewrites a query and validates the candidates as a stream.
+
+    Candidates flow from the rewriters straight into the validator without
+    materializing the full candidate list. With ``stop_after``, threshold-style
+    validation (NONE, FILTER_BY_ROUGE_L_BLEU_THRESHOLDS) halts generation, and
+    any not yet started rewriter, as soon as enough queries qualified.
+
+    Args:
+        query: The input query to rewrite.
+        rewrite_methods: A rewriting method or a sequence of methods to chain.
+        validation_method: The validation method to use.
+        glossary: The glossary to use for the GLOSSARY method.
+        llm: The LLM instance to use for LLM-based rewriting and validation.
+        thinking: Optional thinking/guidance prefix for LLM prompts.
+        stop_after: Maximum number of accepted queries for threshold-style validation.
+        stream: Stream LLM rewrites, so validation overlaps with generation and
+            ``stop_after`` can end the LLM call early.
+
+    Returns:
+        The validated rewritten queries.
+    """
+    candidates = iter_rewrite_candidates(rewrite_methods, query, glossary, llm, thinking, stream)
+    validated = iter_validate(validation_method, candidates, query["query"], llm, thinking, stop_after)
+    try:
+        return list(validated)
+    finally:
+        # Release the suspended rewriter (and its pending work) when stopping early
+        validated.close()
@@ -1,7 +1,9 @@
 from enum import Enum
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Dict, Any
 
-from queryrewrite.utils.data_models import Query, RewrittenQuery, Glossary
+from queryrewrite import instrumentation
+from queryrewrite.utils.data_models import Query, RewrittenQuery, RewriteResult, Glossary
 from .llm_rewriter import LLMRewriter
 from .glossary_rewriter import GlossaryRewriter
 from .synonym_rewriter import SynonymRewriter
@@ -11,39 +13,132 @@ class RewriteMethod(Enum):
     GLOSSARY = "glossary"
     SYNONYM = "synonym"
 
-def rewrite(
+def create_rewriter(
     method: RewriteMethod,
-    query: Query,
     glossary: Glossary = None,
     llm = None,
-    thinking: str = ''
-) -> List[RewrittenQuery]:
+    thinking: str = '',
+    stream: bool = False
+):
     """
-    Unified entry point for query rewriting.
+    Builds the rewriter for a rewriting method.
+
+    The returned rewriter can be reused for many queries, which avoids paying
+    its construction cost (e.g. loading a glossary) once per query.
 
     Args:
         method: The rewriting method to use.
-        query: The input query to rewrite.
         glossary: The glossary to use for the GLOSSARY method.
         llm: The LLM instance to use for LLM-based methods.
+        thinking: Optional thinking/guidance prefix for LLM prompts.
+        stream: For the LLM method, stream the response so iter_rewrite yields
+            rewritten queries while the LLM is still generating.
 
     Returns:
-        A list of rewritten queries.
+        A rewriter instance exposing ``rewrite(query)`` and ``iter_rewrite(query)`` methods.
     """
     if method == RewriteMethod.LLM:
         if not llm:
             raise ValueError("LLM instance is required for the LLM method.")
-        rewriter = LLMRewriter(llm,thinking)
-        return rewriter.rewrite(query)
+        return LLMRewriter(llm,thinking,stream)
     elif method == RewriteMethod.GLOSSARY:
         if not glossary:
             raise ValueError("Glossary is required for the GLOSSARY method.")
-        rewriter = GlossaryRewriter(glossary)
-        return rewriter.rewrite(query)
+        return GlossaryRewriter(glossary)
     elif method == RewriteMethod.SYNONYM:
         if not llm:
             raise ValueError("LLM instance is required for the SYNONYM method.")
-        rewriter = SynonymRewriter(llm,thinking)
-        return rewriter.rewrite(query)
+        return SynonymRewriter(llm,thinking)
     else:
         raise ValueError(f"Unknown rewrite method: {method}")
+
+def rewrite(
+    method: RewriteMethod,
+    query: Query,
+    glossary: Glossary = None,
+    llm = None,
+    thinking: str = ''
+) -> List[RewrittenQuery]:
+    """
+    Unified entry point for query rewriting.
+
+    Args:
+        method: The rewriting method to use.
+        query: The input query to rewrite.
+        glossary: The glossary to use for the GLOSSARY method.
+        llm: The LLM instance to use for LLM-based methods.
+
+    Returns:
+        A list of rewritten queries.
+    """
+    rewriter = create_rewriter(method, glossary, llm, thinking)
+    return rewriter.rewrite(query)
+
+def iter_rewrite(
+    method: RewriteMethod,
+    query: Query,
+    glossary: Glossary = None,
+    llm = None,
+    thinking: str = '',
+    stream: bool = False
+) -> Iterator[RewrittenQuery]:
+    """
+    Streaming variant of rewrite that yields rewritten queries as they are produced.
+
+    Closing the iterator early stops the rewriter from producing the remaining
+    candidates.
+
+    Args:
+        method: The rewriting method to use.
+        query: The input query to rewrite.
+        glossary: The glossary to use for the GLOSSARY method.
+        llm: The LLM instance to use for LLM-based methods.
+        thinking: Optional thinking/guidance prefix for LLM prompts.
+        stream: For the LLM method, yield rewritten queries from the LLM's token stream.
+
+    Returns:
+        An iterator over the rewritten queries.
+    """
+    rewriter = create_rewriter(method, glossary, llm, thinking, stream)
+    return instrumentation.iter_stage(f"rewrite.{method.value}", rewriter.iter_rewrite(query))
+
+def rewrite_many(
+    method: RewriteMethod,
+    queries: List[Query],
+    glossary: Glossary = None,
+    llm = None,
+    thinking: str = '',
+    max_concurrency: int = 4
+) -> List[RewriteResult]:
+    """
+    Rewrites a batch of queries concurrently.
+
+    A single rewriter is shared by all queries and the per-query work runs on
+    a thread pool, so blocking LLM calls overlap instead of running serially.
+    A failing query does not abort the batch: its error is reported in the
+    corresponding result instead.
+
+    Args:
+        method: The rewriting method to use.
+        queries: The input queries to rewrite.
+        glossary: The glossary to use for the GLOSSARY method.
+        llm: The LLM instance to use for LLM-based methods.
+        thinking: Optional thinking/guidance prefix for LLM prompts.
+        max_concurrency: Maximum number of queries rewritten at the same time.
+
+    Returns:
+        One result per input query, in input order.
+    """
+    if max_concurrency < 1:
+        raise ValueError("max_concurrency must be at least 1.")
+
+    rewriter = create_rewriter(method, glossary, llm, thinking)
+
+    def _rewrite_one(query: Query) -> RewriteResult:
+        try:
+            return {"query": query, "rewritten_queries": rewriter.rewrite(query), "error": None}
+        except Exception as e:
+            return {"query": query, "rewritten_queries": [], "error": f"{type(e).__name__}: {e}"}
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        return list(executor.map(_rewrite_one, queries))
@@ -0,0 +1,51 @@
+import itertools
+import math
+import random
+from typing import Iterator, Sequence, Tuple
+
+def count_combinations(word_lists: Sequence[Sequence[str]]) -> int:
+    """返回笛卡尔积中的组合总数（不生成组合）。"""
+    return math.prod(len(words) for words in word_lists)
+
+def _decode(index: int, word_lists: Sequence[Sequence[str]]) -> Tuple[str, ...]:
+    """把混合进制下标解码为一个组合，最后一个位置变化最快，与 itertools.product 的顺序一致。"""
+    combination = []
+    for words in reversed(word_lists):
+        index, digit = divmod(index, len(words))
+        combination.append(words[digit])
+    return tuple(reversed(combination))
+
+def sample_combinations(word_lists: Sequence[Sequence[str]], max_combos: int) -> Iterator[Tuple[str, ...]]:
+    """
+    惰性地从 word_lists 的笛卡尔积中取组合。
+
+    组合总数不超过 max_combos 时按顺序返回全部组合；否则直接在下标空间 [0, 总数) 中
+    无放回地随机抽取 max_combos 个下标再解码，内存和时间都只与 max_combos 有关，
+    与笛卡尔积的大小无关。
+
+    参数:
+        word_lists: 每个位置的候选词列表。
+        max_combos: 最多返回的组合数。
+
+    返回:
+        组合（词的元组）的迭代器。
+    """
+    total = count_combinations(word_lists)
+    if total <= max_combos:
+        yield from itertools.product(*word_lists)
+        return
+
+    if total <= 4 * max_combos:
+        # 下标空间较小：直接无放回抽样
+        for index in random.sample(range(total), max_combos):
+            yield _decode(index, word_lists)
+        return
+
+    # 下标空间远大于样本量：拒绝采样，重复的概率很低
+    seen = set()
+    while len(seen) < max_combos:
+        index = random.randrange(total)
+        if index in seen:
+            continue
+        seen.add(index)
+        yield _decode(index, word_lists)
@@ -0,0 +1,263 @@
+import json
+import mmap
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from collections import deque
+from typing import Dict, List
+
+from queryrewrite.utils.data_models import Glossary
+from .glossary_matcher import GlossarySpan, is_on_word_boundary, select_longest_spans
+
+MAGIC = b"QRGLOSS2"
+# magic, 字节序, 字符串数, 同义词组数, 组成员数, 术语数, trie节点数, trie边数, 字符串池字节数
+_HEADER = struct.Struct("<8s8s7I")
+
+def compile_glossary(glossary: Glossary, path: str) -> str:
+    """
+    把词汇表编译为可内存映射的索引文件。
+
+    文件由字符串池、同义词组偏移表和扁平化的 Aho-Corasick 自动机（按字符排序的边数组、
+    失败链接和输出链接）组成，加载时无需反序列化，多个进程可以共享同一份只读映射。
+
+    参数:
+        glossary: 同义词组列表，格式为 List[List[str]]。
+        path: 输出文件路径。
+
+    返回:
+        输出文件路径。
+    """
+    # 字符串池（去重）
+    string_ids: Dict[str, int] = {}
+    pool = bytearray()
+    string_offsets = array("I", [0])
+    group_offsets = array("I", [0])
+    members = array("I")
+    for word_list in glossary:
+        for word in word_list:
+            if word not in string_ids:
+                string_ids[word] = len(string_ids)
+                pool += word.encode("utf-8")
+                string_offsets.append(len(pool))
+            members.append(string_ids[word])
+        group_offsets.append(len(members))
+
+    # 先用字典构建 trie，再按广度优先顺序扁平化
+    children: List[Dict[str, int]] = [{}]
+    node_group: List[int] = [-1]
+    depth: List[int] = [0]
+    for group_id, word_list in enumerate(glossary):
+        for word in word_list:
+            if not word:
+                continue
+            node = 0
+            for char in word:
+                next_node = children[node].get(char)
+                if next_node is None:
+                    next_node = len(children)
+                    children[node][char] = next_node
+                    children.append({})
+                    node_group.append(-1)
+                    depth.append(depth[node] + 1)
+                node = next_node
+            # 与 GlossaryMatcher 一致：同一个词出现在多个组时，以后出现的组为准
+            node_group[node] = group_id
+
+    # 广度优先遍历的同时计算失败链接和输出链接（与 GlossaryMatcher 相同）
+    order = []
+    fail = [0] * len(children)
+    output_link = [0] * len(children)
+    queue = deque([0])
+    while queue:
+        node = queue.popleft()
+        order.append(node)
+        for char in sorted(children[node]):
+            child = children[node][char]
+            if node:
+                link = fail[node]
+                while link and char not in children[link]:
+                    link = fail[link]
+                link = children[link].get(char, 0)
+                fail[child] = link
+                output_link[child] = link if node_group[link] >= 0 else output_link[link]
+            queue.append(child)
+    flat_id = {node: i for i, node in enumerate(order)}
+
+    edge_offsets = array("I", [0])
+    edge_chars = array("I")
+    edge_targets = array("I")
+    flat_groups = array("i")
+    flat_fail = array("I")
+    flat_output = array("I")
+    flat_depth = array("I")
+    for node in order:
+        for char in sorted(children[node]):
+            edge_chars.append(ord(char))
+            edge_targets.append(flat_id[children[node][char]])
+        edge_offsets.append(len(edge_chars))
+        flat_groups.append(node_group[node])
+        flat_fail.append(flat_id[fail[node]])
+        flat_output.append(flat_id[output_link[node]])
+        flat_depth.append(depth[node])
+
+    num_terms = sum(1 for group in node_group if group >= 0)
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(
+            MAGIC, sys.byteorder.encode("ascii").ljust(8), len(string_ids), len(glossary), len(members),
+            num_terms, len(order), len(edge_chars), len(pool),
+        ))
+        for section in (string_offsets, group_offsets, members, edge_offsets, edge_chars, edge_targets, flat_groups,
+                        flat_fail, flat_output, flat_depth):
+            section.tofile(f)
+        f.write(pool)
+    return path
+
+class CompiledGlossary:
+    """
+    内存映射的已编译词汇表，接口与 GlossaryMatcher 相同，可直接传给 GlossaryRewriter。
+
+    常驻内存只包含实际用到的同义词组的解码结果；其余数据都留在操作系统页缓存中，
+    由共享同一文件的所有进程共用。
+    """
+
+    def __init__(self, path: str):
+        """
+        参数:
+            path: compile_glossary 生成的索引文件路径。
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            if len(f.read(_HEADER.size)) < _HEADER.size:
+                raise ValueError(f"Not a compiled glossary file: {path}")
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, byteorder, num_strings, num_groups, num_members, num_terms, num_nodes, num_edges, pool_size = \
+            _HEADER.unpack_from(self._mmap)
+        expected_size = _HEADER.size + 4 * (
+            num_strings + 1 + num_groups + 1 + num_members + num_nodes + 1 + 2 * num_edges + 4 * num_nodes
+        ) + pool_size
+        error = None
+        if magic != MAGIC:
+            error = f"Not a compiled glossary file: {path}"
+        elif byteorder.strip().decode("ascii", "replace") != sys.byteorder:
+            error = f"Compiled glossary {path} was written on a {byteorder.strip().decode('ascii', 'replace')}-endian machine."
+        elif len(self._mmap) != expected_size:
+            error = f"Compiled glossary {path} is truncated or corrupt."
+        if error is not None:
+            self._mmap.close()
+            raise ValueError(error)
+        self._num_terms = num_terms
+        self._num_groups = num_groups
+
+        view = self._view = memoryview(self._mmap)
+        offset = _HEADER.size
+
+        def section(fmt: str, count: int) -> memoryview:
+            nonlocal offset
+            size = count * 4
+            data = view[offset:offset + size].cast(fmt)
+            offset += size
+            return data
+
+        self._string_offsets = section("I", num_strings + 1)
+        self._group_offsets = section("I", num_groups + 1)
+        self._members = section("I", num_members)
+        self._edge_offsets = section("I", num_nodes + 1)
+        self._edge_chars = section("I", num_edges)
+        self._edge_targets = section("I", num_edges)
+        self._node_group = section("i", num_nodes)
+        self._fail = section("I", num_nodes)
+        self._output_link = section("I", num_nodes)
+        self._depth = section("I", num_nodes)
+        self._pool = view[offset:offset + pool_size]
+        self._group_cache: Dict[int, List[str]] = {}
+
+    def __len__(self) -> int:
+        """词汇表中的术语数。"""
+        return self._num_terms
+
+    def _string(self, string_id: int) -> str:
+        return bytes(self._pool[self._string_offsets[string_id]:self._string_offsets[string_id + 1]]).decode("utf-8")
+
+    def group(self, group_id: int) -> List[str]:
+        """返回一个同义词组（按需解码并缓存）。"""
+        words = self._group_cache.get(group_id)
+        if words is None:
+            members = self._members[self._group_offsets[group_id]:self._group_offsets[group_id + 1]]
+            words = [self._string(string_id) for string_id in members]
+            self._group_cache[group_id] = words
+        return words
+
+    def _child(self, node: int, char: str) -> int:
+        """沿字符 char 的边走一步，没有这条边时返回 -1。"""
+        lo, hi = self._edge_offsets[node], self._edge_offsets[node + 1]
+        code = ord(char)
+        i = bisect_left(self._edge_chars, code, lo, hi)
+        if i < hi and self._edge_chars[i] == code:
+            return self._edge_targets[i]
+        return -1
+
+    def find_spans(self, text: str) -> List[GlossarySpan]:
+        """
+        找出文本中互不重叠的词汇表术语（自左向右，优先最长匹配）。
+
+        参数:
+            text: 要匹配的文本。
+
+        返回:
+            (start, end, 同义词组) 列表，按位置排序。
+        """
+        longest_at = [0] * len(text)
+        group_at = [-1] * len(text)
+        node_group, fail, output_link, depth = self._node_group, self._fail, self._output_link, self._depth
+        node = 0
+        for end, char in enumerate(text, 1):
+            next_node = self._child(node, char)
+            while next_node < 0 and node:
+                node = fail[node]
+                next_node = self._child(node, char)
+            node = max(next_node, 0)
+            match = node if node_group[node] >= 0 else output_link[node]
+            while match:
+                length = depth[match]
+                start = end - length
+                if length > longest_at[start] and is_on_word_boundary(text, start, end):
+                    longest_at[start] = length
+                    group_at[start] = node_group[match]
+                match = output_link[match]
+        return [(start, end, self.group(group_at[start])) for start, end in select_longest_spans(text, longest_at)]
+
+    def close(self):
+        """释放内存映射。"""
+        for name in ("_string_offsets", "_group_offsets", "_members", "_edge_offsets",
+                     "_edge_chars", "_edge_targets", "_node_group", "_fail", "_output_link", "_depth",
+                     "_pool", "_view"):
+            getattr(self, name).release()
+        self._mmap.close()
+
+    def __enter__(self) -> "CompiledGlossary":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def load_compiled_glossary(path: str) -> CompiledGlossary:
+    """
+    内存映射加载 compile_glossary 生成的索引文件。
+
+    参数:
+        path: 索引文件路径。
+
+    返回:
+        CompiledGlossary 实例。
+    """
+    return CompiledGlossary(path)
+
+if __name__ == "__main__":
+    # 用法: python -m queryrewrite.rewriting.glossary_index glossary.json glossary.idx
+    if len(sys.argv) != 3:
+        print("Usage: python -m queryrewrite.rewriting.glossary_index <glossary.json> <output.idx>")
+        sys.exit(1)
+    with open(sys.argv[1], "r", encoding="utf-8") as f:
+        compile_glossary(json.load(f), sys.argv[2])
+    print(f"Compiled glossary written to {sys.argv[2]}")
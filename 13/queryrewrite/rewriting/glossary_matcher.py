@@ -0,0 +1,130 @@
+from collections import deque
+from typing import Dict, List, Tuple
+
+from queryrewrite.utils.data_models import Glossary
+
+# (起始位置, 结束位置, 同义词组)
+GlossarySpan = Tuple[int, int, List[str]]
+
+def _is_word_char(char: str) -> bool:
+    return char.isascii() and char.isalnum()
+
+def select_longest_spans(text: str, longest_at: List[int]) -> List[Tuple[int, int]]:
+    """
+    从每个起始位置的最长匹配长度中，自左向右贪心选出互不重叠的最长匹配。
+
+    参数:
+        text: 被匹配的文本。
+        longest_at: longest_at[i] 为从位置 i 开始的最长匹配长度（0 表示没有匹配）。
+
+    返回:
+        (start, end) 列表。
+    """
+    spans = []
+    i = 0
+    n = len(text)
+    while i < n:
+        length = longest_at[i]
+        if length:
+            spans.append((i, i + length))
+            i += length
+        else:
+            i += 1
+    return spans
+
+def is_on_word_boundary(text: str, start: int, end: int) -> bool:
+    """英文/数字术语必须落在单词边界上，避免 "LLM" 匹配到 "LLMs" 的一部分；中文不受影响。"""
+    if _is_word_char(text[start]) and start > 0 and _is_word_char(text[start - 1]):
+        return False
+    if _is_word_char(text[end - 1]) and end < len(text) and _is_word_char(text[end]):
+        return False
+    return True
+
+class GlossaryMatcher:
+    """
+    基于 Aho-Corasick 自动机的词汇表多模式匹配器。
+
+    构建一次即可在多个 GlossaryRewriter 之间复用；线性时间内找出文本中的词汇表术语，
+    且不会修改进程全局的 jieba 词典。
+    """
+
+    def __init__(self, glossary: Glossary):
+        """
+        参数:
+            glossary: 同义词组列表，格式为 List[List[str]]。
+        """
+        self.groups: List[List[str]] = [list(word_list) for word_list in glossary]
+        # 自动机状态：0 为根节点
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._term_length: List[int] = [0]   # 以该状态结尾的术语长度（0 表示不是术语）
+        self._term_group: List[int] = [-1]   # 该术语所属的同义词组
+        self._output_link: List[int] = [0]   # 沿失败链最近的术语状态（0 表示没有）
+
+        for group_id, word_list in enumerate(self.groups):
+            for word in word_list:
+                if word:
+                    self._insert(word, group_id)
+        self._build_links()
+
+    def _insert(self, word: str, group_id: int):
+        state = 0
+        for char in word:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._term_length.append(0)
+                self._term_group.append(-1)
+                self._output_link.append(0)
+            state = next_state
+        self._term_length[state] = len(word)
+        # 与原同义词映射一致：同一个词出现在多个组时，以后出现的组为准
+        self._term_group[state] = group_id
+
+    def _build_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(char, 0)
+                self._fail[next_state] = fail
+                self._output_link[next_state] = fail if self._term_length[fail] else self._output_link[fail]
+                queue.append(next_state)
+
+    def __len__(self) -> int:
+        """词汇表中的术语数。"""
+        return sum(1 for length in self._term_length if length)
+
+    def find_spans(self, text: str) -> List[GlossarySpan]:
+        """
+        找出文本中互不重叠的词汇表术语（自左向右，优先最长匹配）。
+
+        参数:
+            text: 要匹配的文本。
+
+        返回:
+            (start, end, 同义词组) 列表，按位置排序。
+        """
+        longest_at = [0] * len(text)
+        group_at = [-1] * len(text)
+        goto, fail, term_length, output_link = self._goto, self._fail, self._term_length, self._output_link
+        state = 0
+        for end, char in enumerate(text, 1):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            match = state if term_length[state] else output_link[state]
+            while match:
+                length = term_length[match]
+                start = end - length
+                if length > longest_at[start] and is_on_word_boundary(text, start, end):
+                    longest_at[start] = length
+                    group_at[start] = self._term_group[match]
+                match = output_link[match]
+        return [(start, end, self.groups[group_at[start]]) for start, end in select_longest_spans(text, longest_at)]
@@ -1,85 +1,94 @@
-import itertools
-from typing import List
-import random
+from typing import Iterator, List, Tuple, Union
+from importlib.util import find_spec
 import re
 
-try:
-    import jieba
-    HAS_JIEBA = True
-except ImportError:
-    HAS_JIEBA = False
+# jieba在第一次分词时才导入，只检查是否已安装
+HAS_JIEBA = find_spec("jieba") is not None
+if not HAS_JIEBA:
     print("Warning: jieba not installed, falling back to simple split. Install jieba for Chinese support.")
 
+from queryrewrite import instrumentation
 from queryrewrite.utils.data_models import Query, RewrittenQuery, Glossary
+from .combinations import count_combinations, sample_combinations
+from .glossary_matcher import GlossaryMatcher
 
 class GlossaryRewriter:
     """使用同义词词汇表重写查询。"""
 
-    def __init__(self, glossary: Glossary, max_combos: int = 100):
+    def __init__(self, glossary: Union[Glossary, GlossaryMatcher], max_combos: int = 100):
         """
         参数:
-            glossary: 同义词组列表，格式为 List[List[str]]。
+            glossary: 同义词组列表，格式为 List[List[str]]；也可以传入预先构建好的匹配器
+                （如 GlossaryMatcher），以便在多个重写器之间复用。
             max_combos: 生成重写查询的最大数量（防止组合爆炸）。
         """
         self.glossary = glossary
         self.max_combos = max_combos
-        self.synonym_map = self._create_synonym_map()
-        if HAS_JIEBA:
-            self._add_glossary_to_jieba()
-
-    def _create_synonym_map(self) -> dict:
-        """创建映射：单词 -> 完整的同义词列表。"""
-        synonym_map = {}
-        for word_list in self.glossary:
-            for word in word_list:
-                synonym_map[word] = word_list
-        return synonym_map
-
-    def _add_glossary_to_jieba(self):
-        """将词汇表中的词（去重后）添加到jieba词典。"""
-        unique_words = set(word for word_list in self.glossary for word in word_list)
-        for word in unique_words:
-            jieba.add_word(word)
+        self.matcher = glossary if hasattr(glossary, "find_spans") else GlossaryMatcher(glossary)
 
     def _tokenize(self, text: str) -> List[str]:
         """查询分词：如果jieba可用则使用jieba，否则使用简单拆分。"""
         if HAS_JIEBA:
-            return list(jieba.cut(text))
+            # 第一次分词时会加载jieba词典，也计入 tokenize
+            with instrumentation.stage("tokenize"):
+                import jieba
+                return list(jieba.cut(text))
         else:
             # 后备方案：按空格/标点符号拆分，比较粗糙但适用于混合语言
             return re.findall(r'\w+|[^\w\s]', text, re.UNICODE)
 
-    def rewrite(self, query: Query) -> List[RewrittenQuery]:
+    def _tokenize_with_glossary(self, text: str) -> List[Tuple[str, List[str]]]:
         """
-        使用词汇表重写查询。
+        分词并标出词汇表术语：术语由匹配器整体切出，其余片段再用 _tokenize 分词。
+
+        返回:
+            (词, 候选词列表) 列表；非术语的候选词列表只包含它自己。
+        """
+        tokens = []
+        position = 0
+        for start, end, synonyms in self.matcher.find_spans(text):
+            tokens.extend((word, [word]) for word in self._tokenize(text[position:start]))
+            tokens.append((text[start:end], synonyms))
+            position = end
+        tokens.extend((word, [word]) for word in self._tokenize(text[position:]))
+        return tokens
+
+    def iter_rewrite(self, query: Query) -> Iterator[RewrittenQuery]:
+        """
+        逐个生成重写后的查询；调用方停止迭代后不再生成剩余的组合。
 
         参数:
             query: 要重写的查询对象（使用 .query 和 .reference 属性）。
 
         返回:
-            一个重写后的查询列表（List[RewrittenQuery]，数量上限为 max_combos）。
+            重写后查询的迭代器（数量上限为 max_combos）。
         """
         if not query["query"].strip():
-            return []  # 边缘情况：处理空查询
+            return  # 边缘情况：处理空查询
 
-        words = self._tokenize(query["query"])
-        rewritten_word_lists = [self.synonym_map.get(word, [word]) for word in words]
+        rewritten_word_lists = [synonyms for _, synonyms in self._tokenize_with_glossary(query["query"])]
 
-        # 生成所有组合，如果数量过多则进行采样
-        all_combos = list(itertools.product(*rewritten_word_lists))
-        num_combos = len(all_combos)
+        # 惰性生成组合，如果数量过多则直接在下标空间中随机采样
+        num_combos = count_combinations(rewritten_word_lists)
         if num_combos > self.max_combos:
             print(f"警告: 组合数 {num_combos} 超出最大值 {self.max_combos}；将进行随机采样。")
-            all_combos = random.sample(all_combos, self.max_combos)
 
-        rewritten_queries = []
-        for combination in all_combos:
+        for combination in sample_combinations(rewritten_word_lists, self.max_combos):
             # 拼接：对纯中文不使用空格，对英文/混合使用空格（启发式）
             is_chinese_like = all(re.match(r'[\u4e00-\u9fff]', w) for w in combination if w.strip())
             joined_query = "".join(combination) if is_chinese_like else " ".join(combination)
-            
-            rewritten_queries.append(
-                {"query": joined_query, "reference": query["reference"]}
-            )
+            instrumentation.count("candidates.generated")
+            yield {"query": joined_query, "reference": query["reference"]}
 
-        return rewritten_queries
+    def rewrite(self, query: Query) -> List[RewrittenQuery]:
+        """
+        使用词汇表重写查询。
+
+        参数:
+            query: 要重写的查询对象（使用 .query 和 .reference 属性）。
+
+        返回:
+            一个重写后的查询列表（List[RewrittenQuery]，数量上限为 max_combos）。
+        """
+        with instrumentation.stage("rewrite.glossary"):
+            return list(self.iter_rewrite(query))
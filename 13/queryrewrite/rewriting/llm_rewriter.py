@@ -1,17 +1,29 @@
 import json
-from typing import List
+from typing import Iterator, List, Optional
 import os
 
+from queryrewrite import instrumentation
 from queryrewrite.llm.base import LLMBase
 from queryrewrite.utils.data_models import Query, RewrittenQuery
+from queryrewrite.utils.json_stream import JSONArrayStreamParser
 from queryrewrite.utils.super_json import SuperJSON
 
 class LLMRewriter:
     """Rewrites a query using a large language model."""
 
-    def __init__(self, llm: LLMBase, thinking: str = ''):
+    def __init__(self, llm: LLMBase, thinking: str = '', stream: bool = False):
+        """
+        Initializes the LLMRewriter.
+
+        Args:
+            llm: The LLM used for rewriting.
+            thinking: Prefix added to the prompt.
+            stream: Make iter_rewrite consume the LLM's token stream and yield each
+                rewritten query as soon as its JSON element is complete.
+        """
         self.llm = llm
         self.thinking = thinking
+        self.stream = stream
         self.response_parser = SuperJSON()
         
         # Load system prompt from external file
@@ -23,6 +35,12 @@ class LLMRewriter:
             print(f"Error: Prompt file not found at {prompt_path}")
             self.system_prompt = "" # Fallback to empty prompt
 
+    def _build_prompt(self, query: Query) -> str:
+        # Safely serialize the input data to prevent prompt injection
+        user_input_json = json.dumps({"query": query["query"], "reference": query["reference"]}, ensure_ascii=False)
+        
+        return f'{self.thinking}\n\n{self.system_prompt}\n\n{user_input_json}'
+
     def rewrite(self, query: Query) -> List[RewrittenQuery]:
         """ 
         Rewrites the query using the LLM.
@@ -33,31 +51,116 @@ class LLMRewriter:
         Returns:
             A list of rewritten queries.
         """
-        # Safely serialize the input data to prevent prompt injection
-        user_input_json = json.dumps({"query": query["query"], "reference": query["reference"]}, ensure_ascii=False)
-        
-        prompt = f'{self.thinking}\n\n{self.system_prompt}\n\n{user_input_json}'
-        
-        response = self.llm.invoke(prompt)
-        
+        with instrumentation.stage("rewrite.llm"):
+            response = instrumentation.invoke_llm(self.llm, self._build_prompt(query))
+            rewritten = self._parse_response(response, query)
+        instrumentation.count("candidates.generated", len(rewritten))
+        return rewritten
+
+    def iter_rewrite(self, query: Query) -> Iterator[RewrittenQuery]:
+        """
+        Yields the rewritten queries one at a time.
+
+        In streaming mode the response array is parsed incrementally, so the first
+        rewritten query is available while the LLM is still generating the rest.
+        If no array element can be parsed, the full response goes through the same
+        fallback parsing as rewrite.
+
+        Args:
+            query: The query to rewrite.
+
+        Returns:
+            An iterator over the rewritten queries.
+        """
+        if not self.stream:
+            yield from self.rewrite(query)
+            return
+
+        # Bracketed prose such as a citation "[1]" is skipped until an array of rewrites starts
+        parser = JSONArrayStreamParser(accept=lambda item: self._as_rewritten_queries([item], query) is not None)
+        chunks = []
+        produced = False
+        stream = instrumentation.stream_llm(self.llm, self._build_prompt(query))
         try:
-            parsed_response = self.response_parser.loads(response)
-            
-            if isinstance(parsed_response, list) and all("query" in item and "reference" in item for item in parsed_response):
-                return parsed_response
-            
-            elif isinstance(parsed_response, dict) and "response" in parsed_response:
-                resp_content = parsed_response["response"]
-                if isinstance(resp_content, list):
-                    # Check sub-list format
-                    if all("query" in item and "reference" in item for item in resp_content):
-                         return resp_content
-                # Fallback for single raw string in "response"
-                return [{"query": str(resp_content).strip(), "reference": query["reference"]}]
-            
+            for chunk in stream:
+                chunks.append(chunk)
+                for item in parser.feed(chunk):
+                    rewritten = self._as_rewritten_queries([item], query)
+                    if rewritten:
+                        produced = True
+                        instrumentation.count("candidates.generated")
+                        yield rewritten[0]
+                if parser.done and produced:
+                    break
+        finally:
+            # Stops the generation when the consumer or the parser is done early
+            stream.close()
+        if not produced:
+            rewritten = self._parse_response("".join(chunks), query)
+            instrumentation.count("candidates.generated", len(rewritten))
+            yield from rewritten
+
+    async def arewrite(self, query: Query) -> List[RewrittenQuery]:
+        """
+        Asynchronously rewrites the query, awaiting the LLM instead of blocking.
+
+        Args:
+            query: The query to rewrite.
+
+        Returns:
+            A list of rewritten queries.
+        """
+        with instrumentation.stage("rewrite.llm"):
+            response = await instrumentation.ainvoke_llm(self.llm, self._build_prompt(query))
+            rewritten = self._parse_response(response, query)
+        instrumentation.count("candidates.generated", len(rewritten))
+        return rewritten
+
+    @staticmethod
+    def _as_rewritten_queries(items: list, query: Query) -> Optional[List[RewrittenQuery]]:
+        """Normalizes a parsed list of rewritten queries or plain query strings; None if it is neither."""
+        rewritten = []
+        for item in items:
+            if isinstance(item, str):
+                rewritten.append({"query": item.strip(), "reference": query["reference"]})
+            elif isinstance(item, dict) and "query" in item and "reference" in item:
+                rewritten.append(item)
             else:
-                # If format is completely unexpected, fallback to raw response
-                raise ValueError(f"Unexpected parsed format: {type(parsed_response)}")
+                return None
+        return rewritten
+
+    def _from_parsed(self, value, query: Query) -> Optional[List[RewrittenQuery]]:
+        """Converts one parsed JSON value into rewritten queries; None if it has an unexpected shape."""
+        if isinstance(value, list):
+            return self._as_rewritten_queries(value, query)
+        if isinstance(value, dict) and "response" in value:
+            resp_content = value["response"]
+            if isinstance(resp_content, list):
+                # Check sub-list format
+                rewritten = self._as_rewritten_queries(resp_content, query)
+                if rewritten is not None:
+                    return rewritten
+            # Fallback for single raw string in "response"
+            return [{"query": str(resp_content).strip(), "reference": query["reference"]}]
+        return None
+
+    def _parse_response(self, response: str, query: Query) -> List[RewrittenQuery]:
+        """Parses the LLM response into rewritten queries, falling back to the raw response."""
+        try:
+            parsed_response = self.response_parser.loads(response)
+
+            # SuperJSON returns a list when the response holds several JSON values (e.g. a
+            # citation "[1]" before the answer): use the first value of an expected shape
+            values = [parsed_response]
+            if isinstance(parsed_response, list):
+                values.extend(parsed_response)
+            for value in values:
+                rewritten = self._from_parsed(value, query)
+                if rewritten is not None:
+                    return rewritten
+
+            # If format is completely unexpected, fallback to raw response
+            raise ValueError(f"Unexpected parsed format: {type(parsed_response)}")
 
         except (json.JSONDecodeError, ValueError, KeyError) as e:
             print(f"Parse failed ({type(e).__name__}): {e}. Falling back to raw response.")
@@ -0,0 +1,111 @@
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from queryrewrite import instrumentation
+
+# (词, 词性, 模型名, 每个词的同义词上限)
+SynonymKey = Tuple[str, str, str, int]
+
+class SynonymCache:
+    """
+    同义词缓存：进程内LRU，外加可选的SQLite磁盘存储。
+
+    键为 (word, flag, model, max_synonyms_per_word)，同一个词在一批查询中只需向LLM请求一次；
+    指定 path 后，结果会持久化，后续任务和其他进程也可以复用。
+    """
+
+    def __init__(self, maxsize: int = 10_000, path: Optional[str] = None):
+        """
+        参数:
+            maxsize: 进程内LRU缓存的最大条目数。
+            path: 可选的SQLite文件路径；为None时只使用内存缓存。
+        """
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1.")
+        self.maxsize = maxsize
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[SynonymKey, List[str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        if path is not None:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS synonyms ("
+                "word TEXT NOT NULL, flag TEXT NOT NULL, model TEXT NOT NULL, max_synonyms INTEGER NOT NULL, "
+                "synonyms TEXT NOT NULL, PRIMARY KEY (word, flag, model, max_synonyms))"
+            )
+            self._conn.commit()
+
+    def _remember(self, key: SynonymKey, synonyms: List[str]):
+        self._memory[key] = synonyms
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
+
+    def __contains__(self, key: SynonymKey) -> bool:
+        """判断是否已缓存（不计入命中统计）。"""
+        with self._lock:
+            if key in self._memory:
+                return True
+            if self._conn is None:
+                return False
+            return self._conn.execute(
+                "SELECT 1 FROM synonyms WHERE word = ? AND flag = ? AND model = ? AND max_synonyms = ?",
+                key,
+            ).fetchone() is not None
+
+    def get(self, key: SynonymKey) -> Optional[List[str]]:
+        """返回缓存的同义词列表，未命中时返回None。"""
+        with self._lock:
+            synonyms = self._memory.get(key)
+            if synonyms is not None:
+                self._memory.move_to_end(key)
+            elif self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT synonyms FROM synonyms WHERE word = ? AND flag = ? AND model = ? AND max_synonyms = ?",
+                    key,
+                ).fetchone()
+                if row is not None:
+                    synonyms = json.loads(row[0])
+                    self._remember(key, synonyms)
+            if synonyms is None:
+                self.misses += 1
+                instrumentation.count("synonym_cache.misses")
+                return None
+            self.hits += 1
+            instrumentation.count("synonym_cache.hits")
+            return list(synonyms)
+
+    def set(self, key: SynonymKey, synonyms: List[str]):
+        """保存一个词的同义词列表。"""
+        with self._lock:
+            self._remember(key, list(synonyms))
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO synonyms (word, flag, model, max_synonyms, synonyms) VALUES (?, ?, ?, ?, ?)",
+                    (*key, json.dumps(synonyms, ensure_ascii=False)),
+                )
+                self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """返回命中/未命中次数以及内存中的条目数。"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self._memory),
+            }
+
+    def close(self):
+        """关闭磁盘存储。"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
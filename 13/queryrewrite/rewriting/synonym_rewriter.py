@@ -1,94 +1,265 @@
-import itertools
-from typing import List
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from importlib.util import find_spec
+import asyncio
 import json
-import random
 
-try:
-    import jieba.posseg as pseg
-    HAS_JIEBA = True
-except ImportError:
-    HAS_JIEBA = False
+# jieba.posseg加载较慢，在第一次分词时才导入
+HAS_JIEBA = find_spec("jieba") is not None
+if not HAS_JIEBA:
     print("Warning: jieba not installed, falling back to simple split. Install jieba for Chinese POS support.")
 
-from queryrewrite.llm.base import LLMBase
+from queryrewrite import instrumentation
+from queryrewrite.llm.base import LLMBase, get_model_name
 from queryrewrite.utils.data_models import Query, RewrittenQuery
+from queryrewrite.utils.super_json import SuperJSON
 from queryrewrite.utils.super_list import SuperList
+from .combinations import count_combinations, sample_combinations
+from .synonym_cache import SynonymCache
 
 class SynonymRewriter:
     """通过调用LLM为查询中的词语生成同义词，从而重写查询。"""
 
-    def __init__(self, llm: LLMBase, thinking: str = '', max_combos: int = 50, max_synonyms_per_word: int = 5):
+    SKIP_FLAGS = ('x', 'wp', 'ws', 'w')  # 常见的跳过标记：未知/标点/空格
+
+    def __init__(self, llm: LLMBase, thinking: str = '', max_combos: int = 50, max_synonyms_per_word: int = 5,
+                 synonym_cache: Optional[SynonymCache] = None, batch_words: bool = False, batch_size: int = 50):
         """
         参数:
             llm: 大语言模型实例。
             thinking: 可选的思考或引导提示。
             max_combos: 生成重写查询的最大数量。
             max_synonyms_per_word: 为单个词生成的同义词上限，用于控制组合爆炸。
+            synonym_cache: 可选的同义词缓存，可在多个重写器/任务间共享；默认为当前实例独有的内存缓存。
+            batch_words: 是否在一次LLM调用中为查询的所有实词生成同义词（响应中缺失的词再逐词请求）。
+            batch_size: 批量模式下单个prompt包含的最大词数。
         """
         self.llm = llm
         self.thinking = thinking
         self.max_combos = max_combos
         self.max_synonyms_per_word = max_synonyms_per_word
+        self.synonym_cache = synonym_cache if synonym_cache is not None else SynonymCache()
+        self.model_name = get_model_name(llm)
+        self.batch_words = batch_words
+        self.batch_size = batch_size
 
     def _tokenize_pos(self, text: str) -> List[tuple]:
         """带词性标注的分词：如果jieba可用则使用，否则使用带模拟词性的简单拆分。"""
         if HAS_JIEBA:
-            return list(pseg.cut(text))
+            # 第一次分词时会加载jieba词典，也计入 tokenize
+            with instrumentation.stage("tokenize"):
+                import jieba.posseg as pseg
+                return list(pseg.cut(text))
         else:
             # 后备方案：简单拆分，模拟词性（'n'代表名词/动词，'x'代表其他）
             words = text.split()
             return [(w, 'n' if len(w) > 1 else 'x') for w in words]
 
     def _get_synonyms(self, word: str, flag: str) -> List[str]:
-        """通过LLM获取同义词，如果词性是标点/未知则跳过。"""
-        skip_flags = ['x', 'wp', 'ws', 'w']  # 常见的跳过标记：未知/标点/空格
-        if flag in skip_flags:
+        """获取同义词：先查缓存，未命中再调用LLM；如果词性是标点/未知则跳过。"""
+        if flag in self.SKIP_FLAGS:
             return [word]  # 跳过LLM，保留原词
 
-        prompt = f"{self.thinking}\\n\\n生成‘{word}’的最多{self.max_synonyms_per_word}个同义词，以json list的格式返回。"
-        response = self.llm.invoke(prompt)
-        
+        key = (word, flag, self.model_name, self.max_synonyms_per_word)
+        synonyms = self.synonym_cache.get(key)
+        if synonyms is not None:
+            return synonyms
+
+        return self._store_synonyms(key, word, self._request_synonyms(word))
+
+    async def _aget_synonyms(self, word: str, flag: str) -> List[str]:
+        """_get_synonyms 的异步版本：未命中缓存时等待LLM而不阻塞事件循环。"""
+        if flag in self.SKIP_FLAGS:
+            return [word]
+
+        key = (word, flag, self.model_name, self.max_synonyms_per_word)
+        synonyms = self.synonym_cache.get(key)
+        if synonyms is not None:
+            return synonyms
+
+        response = await instrumentation.ainvoke_llm(self.llm, self._synonyms_prompt(word))
+        return self._store_synonyms(key, word, self._parse_synonyms(word, response))
+
+    def _store_synonyms(self, key: tuple, word: str, synonyms: Optional[List[str]]) -> List[str]:
+        """缓存成功生成的同义词；失败时回退到原词。"""
+        if synonyms is None:
+            return [word]  # 失败的结果不缓存，下次重试
+        self.synonym_cache.set(key, synonyms)
+        return synonyms
+
+    def _synonyms_prompt(self, word: str) -> str:
+        return f"{self.thinking}\\n\\n生成‘{word}’的最多{self.max_synonyms_per_word}个同义词，以json list的格式返回。"
+
+    def _request_synonyms(self, word: str) -> Optional[List[str]]:
+        """调用LLM生成单个词的同义词，失败时返回None。"""
+        response = instrumentation.invoke_llm(self.llm, self._synonyms_prompt(word))
+        return self._parse_synonyms(word, response)
+
+    def _parse_synonyms(self, word: str, response: str) -> Optional[List[str]]:
+        """解析单个词的同义词响应，失败时返回None。"""
         try:
-            synonyms = SuperList(response)
-            # 限制数量并确保是字符串列表
-            synonyms = [s.strip() for s in synonyms[:self.max_synonyms_per_word] if isinstance(s, str) and s]
-            return synonyms if synonyms else [word]
+            return self._clean_synonyms(SuperList(response)) or [word]
         except Exception as e:
             print(f"为'{word}'生成同义词失败: {e}，回退到原词。")
-            return [word]
+            return None
 
-    def rewrite(self, query: Query) -> List[RewrittenQuery]:
+    def _clean_synonyms(self, synonyms: list) -> List[str]:
+        """限制数量并确保是字符串列表。"""
+        return [s.strip() for s in synonyms[:self.max_synonyms_per_word] if isinstance(s, str) and s]
+
+    def _batch_prompt(self, words: List[str]) -> str:
+        return (f"{self.thinking}\n\n为以下每个词生成最多{self.max_synonyms_per_word}个同义词，"
+                f"以json object的格式返回，键为原词，值为该词同义词的json list：\n"
+                f"{json.dumps(words, ensure_ascii=False)}")
+
+    def _request_synonyms_batch(self, words: List[str]) -> Dict[str, List[str]]:
+        """一次LLM调用为多个词生成同义词，返回 词 -> 同义词列表；解析失败或缺失的词不在结果中。"""
+        response = instrumentation.invoke_llm(self.llm, self._batch_prompt(words))
+        return self._parse_synonyms_batch(words, response)
+
+    def _parse_synonyms_batch(self, words: List[str], response: str) -> Dict[str, List[str]]:
+        """解析批量同义词响应，返回 词 -> 同义词列表。"""
+        try:
+            parsed = SuperJSON.loads(response)
+        except Exception as e:
+            print(f"批量生成同义词失败: {e}，回退到逐词生成。")
+            return {}
+        # 响应中包含多个json对象时合并
+        objects = parsed if isinstance(parsed, list) else [parsed]
+        merged = {}
+        for obj in objects:
+            if isinstance(obj, dict):
+                merged.update(obj)
+
+        result = {}
+        for word in words:
+            value = merged.get(word)
+            if not isinstance(value, (list, str)):
+                continue
+            try:
+                synonyms = self._clean_synonyms(SuperList(value))
+            except (ValueError, TypeError):
+                continue
+            if synonyms:
+                result[word] = synonyms
+        return result
+
+    def _content_tokens(self, words_pos: Iterable[Tuple[str, str]]) -> List[Tuple[str, str]]:
+        """返回需要生成同义词且尚未缓存的词（已去重）。"""
+        tokens = []
+        for word, flag in dict.fromkeys(words_pos):
+            if flag in self.SKIP_FLAGS:
+                continue
+            if (word, flag, self.model_name, self.max_synonyms_per_word) not in self.synonym_cache:
+                tokens.append((word, flag))
+        return tokens
+
+    def _prefetch(self, tokens: List[Tuple[str, str]]):
+        """批量请求同义词并写入缓存；缺失的词留给逐词请求。"""
+        words = list(dict.fromkeys(word for word, _ in tokens))
+        synonyms_by_word = {}
+        for i in range(0, len(words), self.batch_size):
+            synonyms_by_word.update(self._request_synonyms_batch(words[i:i + self.batch_size]))
+        self._cache_prefetched(tokens, synonyms_by_word)
+
+    async def _aprefetch(self, tokens: List[Tuple[str, str]]):
+        """_prefetch 的异步版本：各批次并发请求。"""
+        words = list(dict.fromkeys(word for word, _ in tokens))
+        batches = [words[i:i + self.batch_size] for i in range(0, len(words), self.batch_size)]
+        responses = await asyncio.gather(*(instrumentation.ainvoke_llm(self.llm, self._batch_prompt(batch)) for batch in batches))
+        synonyms_by_word = {}
+        for batch, response in zip(batches, responses):
+            synonyms_by_word.update(self._parse_synonyms_batch(batch, response))
+        self._cache_prefetched(tokens, synonyms_by_word)
+
+    def _cache_prefetched(self, tokens: List[Tuple[str, str]], synonyms_by_word: Dict[str, List[str]]):
+        for word, flag in tokens:
+            if word in synonyms_by_word:
+                self.synonym_cache.set((word, flag, self.model_name, self.max_synonyms_per_word), synonyms_by_word[word])
+
+    def prefetch_synonyms(self, queries: List[Query]):
         """
-        通过为其词语生成同义词来重写查询。
+        用尽量少的LLM调用为一组查询的所有实词预取同义词。
+
+        参数:
+            queries: 随后要重写的查询列表。
+        """
+        words_pos = [(word, flag) for query in queries for word, flag in self._tokenize_pos(query["query"])]
+        tokens = self._content_tokens(words_pos)
+        if tokens:
+            self._prefetch(tokens)
+
+    def iter_rewrite(self, query: Query) -> Iterator[RewrittenQuery]:
+        """
+        逐个生成重写后的查询。
+
+        同义词在生成第一个结果前请求完毕；调用方停止迭代后不再生成剩余的组合。
 
         参数:
             query: 要重写的查询对象（使用 .query 和 .reference 属性）。
 
         返回:
-            一个重写后的查询列表（List[RewrittenQuery]，数量有上限）。
+            重写后查询的迭代器（数量有上限）。
         """
         if not query["query"].strip():
-            return []
+            return
+
+        words_pos = [(word, flag) for word, flag in self._tokenize_pos(query["query"])]
+        if self.batch_words:
+            tokens = self._content_tokens(words_pos)
+            if tokens:
+                self._prefetch(tokens)
+        # 查询内去重：重复出现的词只请求一次同义词
+        synonyms_by_token = {token: self._get_synonyms(*token) for token in dict.fromkeys(words_pos)}
+        yield from self._combine(query, words_pos, synonyms_by_token)
+
+    async def arewrite(self, query: Query) -> List[RewrittenQuery]:
+        """
+        rewrite 的异步版本：并发请求各个词的同义词，等待LLM时不阻塞事件循环。
+
+        参数:
+            query: 要重写的查询对象（使用 .query 和 .reference 属性）。
+
+        返回:
+            一个重写后的查询列表（List[RewrittenQuery]，数量有上限）。
+        """
+        with instrumentation.stage("rewrite.synonym"):
+            if not query["query"].strip():
+                return []
 
-        words_pos = self._tokenize_pos(query["query"])
-        rewritten_word_lists = []
-        for word, flag in words_pos:
-            synonyms = self._get_synonyms(word, flag)
-            rewritten_word_lists.append(synonyms)
+            words_pos = [(word, flag) for word, flag in self._tokenize_pos(query["query"])]
+            if self.batch_words:
+                tokens = self._content_tokens(words_pos)
+                if tokens:
+                    await self._aprefetch(tokens)
+            unique_tokens = list(dict.fromkeys(words_pos))
+            synonym_lists = await asyncio.gather(*(self._aget_synonyms(*token) for token in unique_tokens))
+            return list(self._combine(query, words_pos, dict(zip(unique_tokens, synonym_lists))))
 
-        # 生成组合，如果太多则进行采样
-        all_combos = list(itertools.product(*rewritten_word_lists))
-        num_combos = len(all_combos)
+    def _combine(self, query: Query, words_pos: List[Tuple[str, str]],
+                 synonyms_by_token: Dict[Tuple[str, str], List[str]]) -> Iterator[RewrittenQuery]:
+        """用每个词的同义词组合出重写后的查询。"""
+        rewritten_word_lists = [synonyms_by_token[token] for token in words_pos]
+
+        # 惰性生成组合，如果太多则直接在下标空间中采样
+        num_combos = count_combinations(rewritten_word_lists)
         if num_combos > self.max_combos:
             print(f"警告: {num_combos} 个组合超过了最大值 {self.max_combos}；将进行采样。")
-            all_combos = random.sample(all_combos, self.max_combos)
 
-        rewritten_queries = []
-        for combination in all_combos:
+        for combination in sample_combinations(rewritten_word_lists, self.max_combos):
             # 智能拼接：对中文类查询不加空格，对混合/英文查询加空格
             joined_query = "".join(combination) if all(len(w) > 1 and not w.isascii() for w in combination) else " ".join(combination)
-            rewritten_queries.append(
-                {"query": joined_query, "reference": query["reference"]}
-            )
+            instrumentation.count("candidates.generated")
+            yield {"query": joined_query, "reference": query["reference"]}
+
+    def rewrite(self, query: Query) -> List[RewrittenQuery]:
+        """
+        通过为其词语生成同义词来重写查询。
 
-        return rewritten_queries
+        参数:
+            query: 要重写的查询对象（使用 .query 和 .reference 属性）。
+
+        返回:
+            一个重写后的查询列表（List[RewrittenQuery]，数量有上限）。
+        """
+        with instrumentation.stage("rewrite.synonym"):
+            return list(self.iter_rewrite(query))
@@ -0,0 +1,3 @@
+from .fake_ollama import FakeOllamaServer, parse_latency, template_responder
+
+__all__ = ["FakeOllamaServer", "parse_latency", "template_responder"]
@@ -0,0 +1,423 @@
+"""
+Ollama-compatible stand-in server for load testing and profiling.
+
+Implements ``/api/generate``, ``/api/chat`` and ``/api/embed`` (plus
+``/api/tags`` and ``/api/version``) with deterministic responses, so the
+client-side stack (OllamaLLM, AsyncOllamaLLM, langchain_ollama, plain
+``requests.post`` callers) can be exercised without a model.
+
+Run it standalone with::
+
+    python -m queryrewrite.testing.fake_ollama --port 11434 --latency uniform:0.05,0.2 --max-concurrency 4
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+# Returns the response text for (prompt, request body)
+Responder = Callable[[str, Dict[str, Any]], str]
+# Returns a delay in seconds
+LatencySampler = Callable[[random.Random], float]
+
+DEFAULT_TEMPLATE = "fake response from {model} for prompt {hash}"
+# Only these placeholders are substituted; other braces (e.g. JSON objects) are kept as is
+_PLACEHOLDER = re.compile(r"\{(prompt|model|hash)\}")
+
+# One CJK character, or a run of other non-space characters with its leading whitespace
+_TOKEN_PATTERN = re.compile(r"[一-鿿]|\s*[^\s一-鿿]+|\s+")
+
+def split_tokens(text: str) -> List[str]:
+    """Splits a response into the pieces streamed as individual chunks (and counted as tokens)."""
+    return _TOKEN_PATTERN.findall(text)
+
+def parse_latency(spec: Union[str, float, LatencySampler, None]) -> LatencySampler:
+    """
+    Builds a latency sampler.
+
+    Args:
+        spec: None or a number for a fixed delay in seconds, a callable taking a
+            random.Random, or a string: "fixed:S", "uniform:LOW,HIGH",
+            "normal:MEAN,STDDEV", "lognormal:MU,SIGMA" or "exponential:MEAN".
+            Samples are clamped at 0.
+
+    Returns:
+        A function drawing one delay from the distribution.
+    """
+    if spec is None:
+        return lambda rng: 0.0
+    if callable(spec):
+        return spec
+    if isinstance(spec, (int, float)):
+        return lambda rng: float(spec)
+
+    name, _, params = spec.partition(":")
+    values = [float(v) for v in params.split(",") if v.strip()]
+    distributions = {
+        "fixed": (1, lambda rng, s: s),
+        "uniform": (2, lambda rng, low, high: rng.uniform(low, high)),
+        "normal": (2, lambda rng, mean, stddev: rng.gauss(mean, stddev)),
+        "lognormal": (2, lambda rng, mu, sigma: rng.lognormvariate(mu, sigma)),
+        "exponential": (1, lambda rng, mean: rng.expovariate(1 / mean) if mean > 0 else 0.0),
+    }
+    if name not in distributions or len(values) != distributions[name][0]:
+        raise ValueError(f"Invalid latency specification: {spec}")
+    sample = distributions[name][1]
+    return lambda rng: max(0.0, sample(rng, *values))
+
+class TokenBucket:
+    """Thread-safe token bucket limiting the generated tokens per second across all requests."""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        """
+        Args:
+            rate: Tokens replenished per second.
+            burst: Bucket capacity (defaults to one second of tokens).
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive.")
+        self.rate = rate
+        self.capacity = burst if burst is not None else rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0):
+        """Blocks until the requested number of tokens is available."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Take the tokens now (possibly going negative) and sleep off the debt
+            self._tokens -= tokens
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+
+def template_responder(
+    template: str = DEFAULT_TEMPLATE,
+    rules: Sequence[Tuple[str, str]] = (),
+) -> Responder:
+    """
+    Builds a deterministic responder from canned rules and a default template.
+
+    The placeholders ``{prompt}``, ``{model}`` and ``{hash}`` (the first 12 hex
+    digits of the prompt's SHA-256) are replaced; any other braces, such as a
+    canned JSON object, are returned unchanged.
+
+    Args:
+        template: Template used when no rule matches.
+        rules: (regex, template) pairs; the first regex found in the prompt wins.
+    """
+    compiled = [(re.compile(pattern), rule_template) for pattern, rule_template in rules]
+
+    def respond(prompt: str, request: Dict[str, Any]) -> str:
+        fields = {
+            "prompt": prompt,
+            "model": request.get("model", ""),
+            "hash": hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:12],
+        }
+        for pattern, rule_template in compiled:
+            if pattern.search(prompt):
+                return _PLACEHOLDER.sub(lambda match: fields[match.group(1)], rule_template)
+        return _PLACEHOLDER.sub(lambda match: fields[match.group(1)], template)
+
+    return respond
+
+def fake_embedding(text: str, dimensions: int) -> List[float]:
+    """Deterministic unit-length embedding derived from the text's hash."""
+    rng = random.Random(hashlib.sha256(text.encode("utf-8")).digest())
+    vector = [rng.gauss(0.0, 1.0) for _ in range(dimensions)]
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+class FakeOllamaServer:
+    """
+    In-process fake Ollama server running on a background thread.
+
+    Usage::
+
+        with FakeOllamaServer(latency="uniform:0.01,0.05") as server:
+            llm = AsyncOllamaLLM(model="fake", base_url=server.url)
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        responder: Optional[Responder] = None,
+        latency: Union[str, float, LatencySampler, None] = None,
+        token_latency: Union[str, float, LatencySampler, None] = None,
+        max_concurrency: Optional[int] = None,
+        reject_when_busy: bool = False,
+        tokens_per_second: Optional[float] = None,
+        embedding_dimensions: int = 64,
+        seed: int = 0,
+    ):
+        """
+        Initializes the FakeOllamaServer.
+
+        Args:
+            host: Interface to bind.
+            port: Port to bind (0 picks a free port; see ``url``).
+            responder: Function producing the response text; defaults to template_responder().
+            latency: Delay before the first token (see parse_latency).
+            token_latency: Additional delay per generated token (see parse_latency).
+            max_concurrency: Maximum number of requests processed at once, like a
+                single GPU serving a fixed number of parallel slots; None for no limit.
+            reject_when_busy: Answer 503 instead of queueing when all slots are busy.
+            tokens_per_second: Shared generation throughput limit across all requests.
+            embedding_dimensions: Length of the vectors returned by /api/embed.
+            seed: Seed of the latency random generator.
+        """
+        self.responder = responder or template_responder()
+        self.latency = parse_latency(latency)
+        self.token_latency = parse_latency(token_latency)
+        self.reject_when_busy = reject_when_busy
+        self.embedding_dimensions = embedding_dimensions
+        self._slots = threading.BoundedSemaphore(max_concurrency) if max_concurrency else None
+        self._bucket = TokenBucket(tokens_per_second) if tokens_per_second else None
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._stats: Dict[str, Any] = {"requests": {}, "rejected": 0, "tokens": 0, "max_in_flight": 0}
+
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """Base URL of the running server, e.g. http://127.0.0.1:54321."""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeOllamaServer":
+        """Starts serving on a background thread."""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-ollama", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """Serves on the calling thread until interrupted."""
+        self._httpd.serve_forever()
+
+    def stop(self):
+        """Stops the server and closes its socket."""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> "FakeOllamaServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns request counts per endpoint, rejected requests, generated tokens and peak concurrency."""
+        with self._lock:
+            return {**self._stats, "requests": dict(self._stats["requests"])}
+
+    def _sample(self, sampler: LatencySampler) -> float:
+        with self._lock:
+            return sampler(self._rng)
+
+    def _enter(self, path: str) -> bool:
+        """Takes a processing slot; returns False if the request must be rejected."""
+        if self._slots is not None:
+            if not self._slots.acquire(blocking=not self.reject_when_busy):
+                with self._lock:
+                    self._stats["rejected"] += 1
+                return False
+        with self._lock:
+            self._stats["requests"][path] = self._stats["requests"].get(path, 0) + 1
+            self._in_flight += 1
+            self._stats["max_in_flight"] = max(self._stats["max_in_flight"], self._in_flight)
+        return True
+
+    def _leave(self):
+        with self._lock:
+            self._in_flight -= 1
+        if self._slots is not None:
+            self._slots.release()
+
+    def _generate_tokens(self, text: str):
+        """Yields the response pieces, paced by the per-token latency and the throughput limit."""
+        tokens = split_tokens(text)
+        with self._lock:
+            self._stats["tokens"] += len(tokens)
+        for token in tokens:
+            if self._bucket is not None:
+                self._bucket.acquire()
+            delay = self._sample(self.token_latency)
+            if delay:
+                time.sleep(delay)
+            yield token
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def send_response(self, code, message=None):
+                self._responded = True
+                super().send_response(code, message)
+
+            def _send_json(self, status: int, body: Dict[str, Any]):
+                data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _read_json(self) -> Dict[str, Any]:
+                length = int(self.headers.get("Content-Length") or 0)
+                return json.loads(self.rfile.read(length) or b"{}")
+
+            def do_GET(self):
+                if self.path == "/api/version":
+                    self._send_json(200, {"version": "0.0.0-fake"})
+                elif self.path == "/api/tags":
+                    self._send_json(200, {"models": []})
+                elif self.path == "/":
+                    data = b"Ollama is running"
+                    self.send_response(200)
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                else:
+                    self._send_json(404, {"error": "not found"})
+
+            def do_POST(self):
+                routes = {"/api/generate": self._generate, "/api/chat": self._chat, "/api/embed": self._embed}
+                route = routes.get(self.path)
+                if route is None:
+                    self._send_json(404, {"error": "not found"})
+                    return
+                try:
+                    body = self._read_json()
+                except ValueError:
+                    self._send_json(400, {"error": "invalid JSON body"})
+                    return
+                if not server._enter(self.path):
+                    self._send_json(503, {"error": "server busy, please try again"})
+                    return
+                self._responded = False
+                try:
+                    route(body)
+                except Exception as e:
+                    if self._responded:
+                        raise
+                    # A failing responder answers with an error instead of dropping the connection
+                    self._send_json(500, {"error": f"{type(e).__name__}: {e}"})
+                finally:
+                    server._leave()
+
+            def _complete(self, body: Dict[str, Any], prompt: str, chunk: Callable[[str], Dict[str, Any]]):
+                """Sends a generate/chat completion, streamed as NDJSON unless stream is false."""
+                started = time.monotonic()
+                text = server.responder(prompt, body)
+                first_token_delay = server._sample(server.latency)
+                if first_token_delay:
+                    time.sleep(first_token_delay)
+                base = {"model": body.get("model", ""), "created_at": datetime.now(timezone.utc).isoformat()}
+
+                def final(extra: Dict[str, Any]) -> Dict[str, Any]:
+                    return {
+                        **base, **extra, "done": True, "done_reason": "stop",
+                        "total_duration": int((time.monotonic() - started) * 1e9),
+                        "prompt_eval_count": len(split_tokens(prompt)),
+                        "eval_count": len(split_tokens(text)),
+                    }
+
+                if not body.get("stream", True):
+                    pieces = "".join(server._generate_tokens(text))
+                    self._send_json(200, final(chunk(pieces)))
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for token in server._generate_tokens(text):
+                    self._write_chunk({**base, **chunk(token), "done": False})
+                self._write_chunk(final(chunk("")))
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _write_chunk(self, body: Dict[str, Any]):
+                data = json.dumps(body, ensure_ascii=False).encode("utf-8") + b"\n"
+                self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+
+            def _generate(self, body: Dict[str, Any]):
+                self._complete(body, body.get("prompt", ""), lambda text: {"response": text})
+
+            def _chat(self, body: Dict[str, Any]):
+                messages = body.get("messages") or []
+                prompt = "\n".join(str(m.get("content", "")) for m in messages if isinstance(m, dict))
+                self._complete(body, prompt, lambda text: {"message": {"role": "assistant", "content": text}})
+
+            def _embed(self, body: Dict[str, Any]):
+                inputs = body.get("input", "")
+                if isinstance(inputs, str):
+                    inputs = [inputs]
+                delay = server._sample(server.latency)
+                if delay:
+                    time.sleep(delay)
+                self._send_json(200, {
+                    "model": body.get("model", ""),
+                    "embeddings": [fake_embedding(text, server.embedding_dimensions) for text in inputs],
+                })
+
+        return Handler
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog="python -m queryrewrite.testing.fake_ollama",
+                                     description="Run a fake Ollama server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--latency", help="Delay before the first token, e.g. fixed:0.1 or uniform:0.05,0.2.")
+    parser.add_argument("--token-latency", help="Delay per generated token, same format as --latency.")
+    parser.add_argument("--max-concurrency", type=int, help="Number of requests processed at once.")
+    parser.add_argument("--reject-when-busy", action="store_true", help="Answer 503 instead of queueing.")
+    parser.add_argument("--tokens-per-second", type=float, help="Shared generation throughput limit.")
+    parser.add_argument("--template", default=DEFAULT_TEMPLATE, help="Response template ({prompt}, {model}, {hash}).")
+    parser.add_argument("--rules", help="JSON file with a list of [regex, template] pairs.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rules = []
+    if args.rules:
+        with open(args.rules, "r", encoding="utf-8") as f:
+            rules = [tuple(rule) for rule in json.load(f)]
+    server = FakeOllamaServer(
+        host=args.host, port=args.port, responder=template_responder(args.template, rules),
+        latency=args.latency, token_latency=args.token_latency, max_concurrency=args.max_concurrency,
+        reject_when_busy=args.reject_when_busy, tokens_per_second=args.tokens_per_second, seed=args.seed,
+    )
+    print(f"Fake Ollama server listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Warm-up of the jieba tokenizer and a serialized tokenizer state.
+
+jieba builds its prefix dictionary on first use (about a second) and every
+``jieba.add_word`` call re-segments the word to pick its frequency, so each
+new process pays for both. ``warmup`` does that work once, up front, and can
+save the resulting dictionary (base dictionary plus custom words) to a file
+that later processes load in a fraction of the time (the file is a pickle:
+only load state files you created)::
+
+    import queryrewrite
+
+    queryrewrite.warmup(glossary, state_path="jieba_state.bin")
+
+Processes forked after a warm-up share the warmed dictionary; scoring worker
+processes load the saved state instead of rebuilding it.
+"""
+
+import gc
+import os
+import pickle
+import tempfile
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set
+
+from queryrewrite.utils.data_models import Glossary
+from queryrewrite.validation.tokenization import token_cache
+
+STATE_FORMAT = 1
+
+# Words added by warmup in this process (inherited by forked workers)
+_warm_words: Set[str] = set()
+# State file used by the last warmup, passed on to scoring workers
+_state_path: Optional[str] = None
+# State files written or loaded by this process -> the custom words they contain
+_saved_words: Dict[str, FrozenSet[str]] = {}
+
+def _words(glossary: Optional[Glossary], custom_words: Optional[Iterable[str]]) -> List[str]:
+    words = [term for group in glossary or () for term in group]
+    words.extend(custom_words or ())
+    return list(dict.fromkeys(word for word in words if word and word.strip()))
+
+def _jieba():
+    import jieba
+    return jieba
+
+def save_tokenizer_state(path: str, words: Iterable[str] = ()):
+    """
+    Writes the initialized jieba dictionary to a file.
+
+    Args:
+        path: Destination file; written atomically.
+        words: The custom words the dictionary contains, stored so that load_tokenizer_state
+            can tell whether the state covers the words a caller needs.
+    """
+    jieba = _jieba()
+    tokenizer = jieba.dt
+    tokenizer.check_initialized()
+    words = frozenset(words)
+    state = {
+        "format": STATE_FORMAT,
+        "jieba": jieba.__version__,
+        "dictionary": tokenizer.dictionary,
+        "words": sorted(words),
+        "freq": tokenizer.FREQ,
+        "total": tokenizer.total,
+        "tags": tokenizer.user_word_tag_tab,
+    }
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory)
+    with os.fdopen(fd, "wb") as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_path, path)
+    _saved_words[path] = words
+
+def load_tokenizer_state(path: str, words: Iterable[str] = ()) -> bool:
+    """
+    Loads a saved jieba dictionary into the default tokenizer.
+
+    Args:
+        path: File written by save_tokenizer_state.
+        words: Custom words the caller needs; the state is rejected if it lacks any of them.
+
+    Returns:
+        True if the state was loaded; False if the file is missing, unreadable or
+        does not match (jieba version, dictionary or words), leaving jieba untouched.
+    """
+    global _warm_words
+    jieba = _jieba()
+    # The dictionary has ~350k entries; cyclic GC passes during unpickling would dominate the load
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, ValueError, TypeError, AttributeError):
+        return False
+    finally:
+        if gc_enabled:
+            gc.enable()
+    tokenizer = jieba.dt
+    if (
+        not isinstance(state, dict)
+        or state.get("format") != STATE_FORMAT
+        or state.get("jieba") != jieba.__version__
+        or state.get("dictionary") != tokenizer.dictionary
+        or not set(words) <= set(state["words"])
+    ):
+        return False
+    with tokenizer.lock:
+        tokenizer.FREQ = state["freq"]
+        tokenizer.total = state["total"]
+        tokenizer.user_word_tag_tab.update(state["tags"])
+        tokenizer.initialized = True
+    # The loaded dictionary replaces any words added before
+    _warm_words = set(state["words"])
+    _saved_words[path] = frozenset(_warm_words)
+    token_cache.clear()
+    return True
+
+def tokenizer_state_path() -> Optional[str]:
+    """Returns the state file used by the last warmup call, if any."""
+    return _state_path
+
+def warmup(
+    glossary: Optional[Glossary] = None,
+    custom_words: Optional[Iterable[str]] = None,
+    state_path: Optional[str] = None,
+    pos_tagging: bool = False,
+    save: bool = True,
+):
+    """
+    Loads the tokenizer and the other lazily imported dependencies up front.
+
+    Initializes jieba's dictionary and adds the glossary terms and custom words
+    to it, so later tokenization keeps them whole. With ``state_path`` the
+    dictionary is loaded from that file when it matches, and otherwise built
+    and saved there for the next process (also when jieba was already warmed
+    but the file is missing or lacks some of the words). Calling warmup again
+    with words that were already added is cheap.
+
+    Args:
+        glossary: Glossary whose terms are added to the jieba dictionary.
+        custom_words: Additional words added to the jieba dictionary.
+        state_path: Serialized tokenizer state to load from, or to create.
+        pos_tagging: Also load jieba's part-of-speech tagger (used by SynonymRewriter).
+        save: Write the state file when it is missing or outdated. Scoring workers pass
+            False so that they only read the state file shared with the parent process.
+    """
+    global _state_path
+    jieba = _jieba()
+    words = _words(glossary, custom_words)
+    missing = [word for word in words if word not in _warm_words]
+
+    if missing or not jieba.dt.initialized:
+        loaded = state_path is not None and load_tokenizer_state(state_path, words)
+        if not loaded:
+            jieba.initialize()
+            for word in words:
+                if word not in _warm_words:
+                    jieba.add_word(word)
+                    _warm_words.add(word)
+            if missing:
+                # Tokenizations cached before the words were added are stale
+                token_cache.clear()
+    if state_path is not None:
+        if save and (not os.path.exists(state_path) or not _warm_words <= _saved_words.get(state_path, frozenset())):
+            save_tokenizer_state(state_path, _warm_words)
+        _state_path = state_path
+
+    if pos_tagging:
+        import jieba.posseg  # noqa: F401
+    import numpy  # noqa: F401
@@ -1,6 +1,7 @@
-from .data_models import Query, RewrittenQuery, Glossary
+from .data_models import Query, RewrittenQuery, RewriteResult, ParetoCandidate, Glossary
 from .super_float import SuperFloat, extract_float
 from .super_list import SuperList, extract_list
 from .super_json import SuperJSON, extract_json
+from .json_stream import JSONArrayStreamParser, iter_json_array
 
-__all__ = ["Query", "RewrittenQuery", "Glossary", "SuperFloat", "extract_float", "SuperList", "extract_list", "SuperJSON", "extract_json"]
+__all__ = ["Query", "RewrittenQuery", "RewriteResult", "ParetoCandidate", "Glossary", "SuperFloat", "extract_float", "SuperList", "extract_list", "SuperJSON", "extract_json", "JSONArrayStreamParser", "iter_json_array"]
@@ -1,4 +1,4 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 # Using TypedDict for structured dictionaries
 from typing import TypedDict
@@ -11,4 +11,15 @@ class RewrittenQuery(TypedDict):
     query: str
     reference: str
 
+class RewriteResult(TypedDict):
+    query: Query
+    rewritten_queries: List[RewrittenQuery]
+    error: Optional[str]
+
+class ParetoCandidate(TypedDict):
+    query: RewrittenQuery
+    front: int
+    rouge_l: float
+    bleu: float
+
 Glossary = List[List[str]]
@@ -0,0 +1,173 @@
+import json
+from typing import Any, Callable, Iterable, Iterator, List, Optional
+
+_CLOSERS = {'{': '}', '[': ']'}
+_THINK_OPEN = "<think>"
+_THINK_CLOSE = "</think>"
+# 没有新元素时的返回值
+_NOTHING = object()
+# 元素无法解析时的返回值
+_INVALID = object()
+
+class JSONArrayStreamParser:
+    """
+    增量JSON数组解析器：逐块输入LLM的输出，数组中的每个元素一闭合就立即解析并返回。
+
+    解析第一个出现的JSON数组（可以在对象内部，如 {"response": [...]}），
+    开头的 <think>...</think> 块会被跳过，数组结束后的内容会被忽略。
+    无法解析的元素被跳过。
+
+    指定 accept 时，数组中第一个被接受的元素之前出现无法解析或不被接受的元素，
+    说明这是正文中的方括号（如引用标注"[1]"），解析器会放弃它并继续寻找下一个数组。
+    """
+
+    def __init__(self, accept: Optional[Callable[[Any], bool]] = None):
+        """
+        参数:
+            accept: 判断元素是否是期望形状的函数；为None时接受所有可解析的元素。
+        """
+        self.accept = accept
+        self._pending = ""          # 判断开头是否为 <think> 块时暂存的文本
+        self._started = False       # 是否已越过开头可能的 <think> 块
+        self._restart()
+
+    def _restart(self):
+        """回到寻找数组的状态。"""
+        self._closers: List[str] = []
+        self._in_string = False
+        self._escaped = False
+        self._array_depth = 0       # 目标数组内部的括号深度，找到数组前为0
+        self._element: List[str] = []
+        self._accepted = False      # 当前数组是否已有被接受的元素
+        self.done = False           # 目标数组是否已经结束
+
+    def feed(self, chunk: str) -> List[Any]:
+        """
+        输入一段文本，返回这段文本中闭合的数组元素。
+
+        参数:
+            chunk: LLM输出的下一段文本。
+
+        返回:
+            新解析出的元素列表（可能为空）。
+        """
+        if self.done:
+            return []
+        if not self._started:
+            self._pending += chunk
+            stripped = self._pending.lstrip()
+            if stripped.startswith(_THINK_OPEN):
+                end = stripped.find(_THINK_CLOSE)
+                if end == -1:
+                    return []
+                chunk = stripped[end + len(_THINK_CLOSE):]
+            elif _THINK_OPEN.startswith(stripped):
+                return []  # 还可能是 <think> 的开头
+            else:
+                chunk = self._pending
+            self._pending = ""
+            self._started = True
+
+        values = []
+        for char in chunk:
+            value = self._feed_char(char)
+            if value is not _NOTHING:
+                if value is not _INVALID and (self.accept is None or self.accept(value)):
+                    self._accepted = True
+                    values.append(value)
+                elif self.accept is not None and not self._accepted:
+                    # 正文中的方括号，继续寻找下一个数组
+                    self._restart()
+                    continue
+            if self.done:
+                if self.accept is not None and not self._accepted:
+                    self._restart()
+                    continue
+                break
+        return values
+
+    def _emit(self) -> Any:
+        text = "".join(self._element).strip()
+        self._element.clear()
+        if not text:
+            return _NOTHING
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError:
+            return _INVALID
+
+    def _feed_char(self, char: str) -> Any:
+        closers = self._closers
+        in_element = self._array_depth and len(closers) >= self._array_depth
+        if self._in_string:
+            if in_element:
+                self._element.append(char)
+            if self._escaped:
+                self._escaped = False
+            elif char == '\\':
+                self._escaped = True
+            elif char == '"':
+                self._in_string = False
+                # 字符串元素在右引号处结束
+                if in_element and len(closers) == self._array_depth:
+                    return self._emit()
+            return _NOTHING
+
+        if not self._array_depth:
+            # 寻找第一个数组；只在JSON对象内部跟踪字符串，正文中的引号不影响
+            if char == '[':
+                closers.append(']')
+                self._array_depth = len(closers)
+            elif char == '{':
+                closers.append('}')
+            elif char == '}' and closers:
+                closers.pop()
+            elif char == '"' and closers:
+                self._in_string = True
+            return _NOTHING
+
+        if len(closers) == self._array_depth:
+            # 数组这一层：分隔符、元素开头和数组结尾；数字等标量元素在分隔符处结束
+            if char == ']':
+                closers.pop()
+                self.done = True
+                return self._emit()
+            if char == ',':
+                return self._emit()
+            if char.isspace() and not self._element:
+                return _NOTHING
+            self._element.append(char)
+            if char == '"':
+                self._in_string = True
+            elif char in _CLOSERS:
+                closers.append(_CLOSERS[char])
+            return _NOTHING
+
+        # 元素内部
+        self._element.append(char)
+        if char == '"':
+            self._in_string = True
+        elif char in _CLOSERS:
+            closers.append(_CLOSERS[char])
+        elif char in '}]':
+            closers.pop()
+            # 对象或数组元素在配对的右括号处结束
+            if len(closers) == self._array_depth:
+                return self._emit()
+        return _NOTHING
+
+def iter_json_array(chunks: Iterable[str]) -> Iterator[Any]:
+    """
+    从文本块流中逐个产出第一个JSON数组的元素。
+
+    参数:
+        chunks: 文本块的可迭代对象，如LLM的流式输出。
+
+    返回:
+        数组元素的迭代器；数组结束后不再读取后续文本块。
+    """
+    parser = JSONArrayStreamParser()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+        if parser.done:
+            return
@@ -1,53 +1,125 @@
 import json
 import re
-from typing import Any, List, Union
+from typing import Any, Dict, List, Tuple, Union
+
+from queryrewrite import instrumentation
+
+# 括号的配对关系
+_CLOSERS = {'{': '}', '[': ']'}
+# 最外层之外只需要找左括号；值内部只关心引号和括号；字符串内部只关心引号和转义
+_TOP_LEVEL = re.compile(r'[\[{]')
+_STRUCTURAL = re.compile(r'["\[\]{}]')
+_STRING_END = re.compile(r'["\\]')
+# 解析失败的标记
+_INVALID = object()
+# 被截断（到末尾仍未闭合）的值最多尝试补全的次数，避免深层嵌套时反复补全
+_MAX_TRUNCATED_ATTEMPTS = 2
+# 解析失败后最多向内深入的层数；每层解析的片段互不重叠，总耗时保持线性
+_MAX_FAILED_DEPTH = 2
 
 class SuperJSON(json.JSONDecoder):
     """
     超级JSON处理类，继承自标准库json模块，扩展loads方法：
-    1. 能自动提取并解析字符串中所有合法的json子串。
-    2. 能自动补全缺失的右侧大括号。
+    1. 能自动提取并解析字符串中所有合法的json子串（对象和数组）。
+    2. 能自动补全被截断的json（缺失的右括号和未闭合的字符串）。
     3. 其余方法与标准json模块一致。
     """
     @classmethod
     def loads(cls, s: str, *args, **kwargs) -> Union[Any, List[Any]]:
         """
         扩展的loads方法：
-        - 自动提取并解析字符串中的所有json子串。
-        - 自动补全缺失的右侧大括号。
-        - 如果只找到一个json对象，直接返回；多个则返回列表。
+        - 自动提取并解析字符串中的所有最外层json对象和数组，字符串值中的括号不影响配对。
+        - 自动补全末尾被截断的json。
+        - 如果只找到一个json值，直接返回；多个则返回列表。
         """
-        json_objs = []
-        # 用栈算法提取最大外层JSON对象
-        start = s.find('{')
-        while start != -1:
-            stack = []
-            for i in range(start, len(s)):
-                if s[i] == '{':
-                    stack.append('{')
-                elif s[i] == '}':
-                    if stack:
-                        stack.pop()
-                    if not stack:
-                        # 找到配对的最大JSON对象
-                        json_str = s[start:i+1]
-                        try:
-                            obj = json.loads(json_str, *args, **kwargs)
-                            json_objs.append(obj)
-                        except json.JSONDecodeError:
-                            # 尝试补全右侧大括号
-                            fixed = cls._fix_braces(json_str)
-                            try:
-                                obj = json.loads(fixed, *args, **kwargs)
-                                json_objs.append(obj)
-                            except Exception:
-                                pass
-                        # 继续查找下一个
-                        start = s.find('{', i+1)
-                        break
+        with instrumentation.stage("parse.superjson"):
+            return cls._loads(s, *args, **kwargs)
+
+    @classmethod
+    def _decode(cls, text: str, args, kwargs) -> Any:
+        try:
+            return json.loads(text, *args, **kwargs)
+        except (json.JSONDecodeError, RecursionError):
+            return _INVALID
+
+    @staticmethod
+    def _scan(s: str, start: int) -> Tuple[Dict[int, int], Dict[int, List[int]], List[int], bool]:
+        """
+        从 start 处的左括号开始单遍扫描到与它配对的右括号（或字符串末尾），跟踪字符串和转义状态。
+
+        返回:
+            (左括号位置 -> 配对的右括号之后的位置, 左括号位置 -> 直接包含的左括号位置列表,
+             末尾仍未闭合的左括号位置（由外到内）, 末尾是否处于未闭合的字符串中)
+        """
+        ends: Dict[int, int] = {}
+        children: Dict[int, List[int]] = {start: []}
+        openers = [start]
+        in_string = False
+        index = start + 1
+        length = len(s)
+        while index < length:
+            if in_string:
+                found = _STRING_END.search(s, index)
+                if found is None:
+                    break
+                if found.group() == '\\':
+                    index = found.end() + 1  # 跳过被转义的字符
+                    continue
+                in_string = False
+                index = found.end()
+                continue
+            found = _STRUCTURAL.search(s, index)
+            if found is None:
+                break
+            char = found.group()
+            index = found.end()
+            if char == '"':
+                in_string = True
+            elif char in _CLOSERS:
+                children[openers[-1]].append(found.start())
+                children[found.start()] = []
+                openers.append(found.start())
             else:
-                # 没有找到配对的右括号
+                ends[openers.pop()] = index
+                if not openers:
+                    return ends, children, [], False
+        return ends, children, openers, in_string
+
+    @classmethod
+    def _loads(cls, s: str, *args, **kwargs) -> Union[Any, List[Any]]:
+        json_objs = []
+        position = 0
+        truncated_attempts = 0
+        while True:
+            match = _TOP_LEVEL.search(s, position)
+            if match is None:
                 break
+            start = match.start()
+            ends, children, unclosed, in_string = cls._scan(s, start)
+
+            # 依次尝试最外层的值；解析失败（如正文中的"[注]"）时改为尝试它直接包含的值，
+            # 配对关系在扫描时已经得到，不需要重新扫描。没有尝试解析的未闭合值不计入失败层数
+            pending = [(start, 0)]
+            while pending:
+                opener, failures = pending.pop()
+                end = ends.get(opener)
+                if end is not None:
+                    obj = cls._decode(s[opener:end], args, kwargs)
+                elif truncated_attempts < _MAX_TRUNCATED_ATTEMPTS:
+                    # 到达末尾仍未闭合：补全字符串和右括号后再解析
+                    truncated_attempts += 1
+                    still_open = unclosed[unclosed.index(opener):]
+                    fixed = s[opener:] + ('"' if in_string else '') + ''.join(_CLOSERS[s[p]] for p in reversed(still_open))
+                    obj = cls._decode(fixed, args, kwargs)
+                else:
+                    pending.extend((child, failures) for child in reversed(children[opener]))
+                    continue
+                if obj is not _INVALID:
+                    json_objs.append(obj)
+                elif failures < _MAX_FAILED_DEPTH:
+                    pending.extend((child, failures + 1) for child in reversed(children[opener]))
+            position = ends.get(start, len(s))
+
         if not json_objs:
             # 如果没找到json子串，尝试整体修复后解析
             try:
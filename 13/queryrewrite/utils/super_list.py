@@ -1,6 +1,23 @@
-import re
+import ast
 import json
-from typing import Union, Optional, List, Any
+import re
+from typing import Dict, Iterator, List, Optional, Tuple, Union, Any
+
+from queryrewrite import instrumentation
+
+_CODE_FENCE = "```"
+# Inside a list only quotes, brackets and escapes matter
+_STRUCTURAL = re.compile(r"""[\[\]"']""")
+_STRING_END = {'"': re.compile(r'["\\]'), "'": re.compile(r"['\\]")}
+# A quote opens a string only where a value can start, so apostrophes in prose such as "[it's]" are ignored
+_VALUE_START = frozenset("[,:{(")
+# What can follow "[" in a JSON or Python list literal; other spans (e.g. "[注]" in prose) are not parsed
+_LIST_START = re.compile(r"""\[\s*(?:[\[\]{("'+\-.\d]|true|false|null|True|False|None)""")
+# Spans that JSON cannot parse but a Python literal may: single quotes, Python constants, trailing commas
+_PYTHON_ONLY = re.compile(r"'|\b(?:True|False|None)\b|,\s*[\]})]")
+# Levels to descend below spans that failed to parse; parsed spans on one level do not
+# overlap, so this keeps the total parsing work linear in the input length
+_MAX_FAILED_DEPTH = 2
 
 
 class SuperList(list):
@@ -21,7 +38,8 @@ class SuperList(list):
         """
         if isinstance(value, str):
             # Extract the first list from the string
-            extracted_value = self._extract_first_list(value)
+            with instrumentation.stage("parse.superlist"):
+                extracted_value = self._extract_first_list(value)
             if extracted_value is not None:
                 super().__init__(extracted_value)
             else:
@@ -31,10 +49,117 @@ class SuperList(list):
             super().__init__(value)
     
     @staticmethod
-    def _extract_first_list(text: str) -> Optional[List[Any]]:
+    def _parse_list(text: str) -> Optional[List[Any]]:
+        """Parses a bracketed span as a JSON or Python list literal; None if it is neither."""
+        try:
+            parsed = json.loads(text)
+        except (json.JSONDecodeError, ValueError, RecursionError):
+            # Prose such as "[2023年]" fails here; only retry spans that look like Python literals
+            if not _PYTHON_ONLY.search(text):
+                return None
+            try:
+                # Single-quoted lists, e.g. ['a', 'b'] or ['a', true]
+                parsed = json.loads(text.replace("'", '"')) if "'" in text else None
+            except (json.JSONDecodeError, ValueError, RecursionError):
+                parsed = None
+            if parsed is None:
+                try:
+                    parsed = ast.literal_eval(text)
+                except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+                    return None
+        return parsed if isinstance(parsed, list) else None
+
+    @staticmethod
+    def _bracket_spans(text: str) -> Tuple[List[int], Dict[int, int], Dict[int, List[int]]]:
+        """
+        Pairs the square brackets of a string in one linear pass, skipping quoted strings.
+
+        Returns:
+            (outermost "[" positions, "[" position -> position after its "]" for closed
+            brackets, "[" position -> directly nested "[" positions)
+        """
+        roots: List[int] = []
+        ends: Dict[int, int] = {}
+        children: Dict[int, List[int]] = {}
+        openers: List[int] = []
+        index = 0
+        length = len(text)
+        while index < length:
+            if not openers:
+                # Outside any list quotes are prose: jump to the next opening bracket
+                index = text.find("[", index)
+                if index == -1:
+                    break
+                roots.append(index)
+                children[index] = []
+                openers.append(index)
+                index += 1
+                continue
+            found = _STRUCTURAL.search(text, index)
+            if found is None:
+                break
+            char = found.group()
+            position = found.start()
+            index = found.end()
+            if char == "[":
+                children[openers[-1]].append(position)
+                children[position] = []
+                openers.append(position)
+            elif char == "]":
+                ends[openers.pop()] = index
+            else:
+                previous = position - 1
+                while previous >= 0 and text[previous].isspace():
+                    previous -= 1
+                if previous < 0 or text[previous] not in _VALUE_START:
+                    continue
+                # Skip the string, honouring backslash escapes
+                string_end = _STRING_END[char]
+                while True:
+                    found = string_end.search(text, index)
+                    if found is None:
+                        index = length
+                        break
+                    index = found.end()
+                    if found.group() == char:
+                        break
+                    index += 1
+        return roots, ends, children
+
+    @classmethod
+    def _iter_lists(cls, text: str) -> Iterator[List[Any]]:
+        """Yields the parseable lists of a string in order of their opening bracket, outermost first."""
+        roots, ends, children = cls._bracket_spans(text)
+        for root in roots:
+            pending = [(root, 0)]
+            while pending:
+                opener, failures = pending.pop()
+                end = ends.get(opener)
+                if end is None or not _LIST_START.match(text, opener):
+                    # Unclosed or not a list literal: nothing was parsed, look inside at no cost
+                    pending.extend((child, failures) for child in reversed(children[opener]))
+                    continue
+                parsed = cls._parse_list(text[opener:end])
+                if parsed is not None:
+                    yield parsed
+                elif failures < _MAX_FAILED_DEPTH:
+                    # Not a list (e.g. "[1, x]"): look at the brackets nested in it
+                    pending.extend((child, failures + 1) for child in reversed(children[opener]))
+
+    @classmethod
+    def _first_list(cls, text: str) -> Optional[List[Any]]:
+        return next(cls._iter_lists(text), None)
+
+    @classmethod
+    def _extract_first_list(cls, text: str) -> Optional[List[Any]]:
         """
         Extract the first complete list from a string.
         
+        Lists inside a fenced code block take precedence over lists in the
+        surrounding prose. Brackets are paired in a single quote-aware pass and
+        each candidate is parsed as JSON, then as a Python literal, so the cost
+        stays linear even on long unbalanced LLM output.
+        
         Args:
             text: String that may contain lists
             
@@ -44,93 +169,26 @@ class SuperList(list):
         if not isinstance(text, str):
             return None
         
-        # Strategy 1: Try to parse the entire text as JSON (if it's a pure JSON array)
-        try:
-            parsed = json.loads(text.strip())
-            if isinstance(parsed, list):
+        # Strategy 1: The entire text is a (JSON or Python) list
+        stripped = text.strip()
+        if stripped.startswith("[") and stripped.endswith("]"):
+            parsed = cls._parse_list(stripped)
+            if parsed is not None:
                 return parsed
-        except (json.JSONDecodeError, ValueError):
-            pass
-        
-        # Strategy 2: Look for JSON arrays in code blocks (most common in LLM responses)
-        code_block_patterns = [
-            r'```(?:python|json)?\s*(\[.*?\])\s*```',
-            r'`(\[.*?\])`',
-        ]
-        
-        for pattern in code_block_patterns:
-            match = re.search(pattern, text, re.DOTALL)
-            if match:
-                try:
-                    parsed_list = json.loads(match.group(1))
-                    if isinstance(parsed_list, list):
-                        return parsed_list
-                except (json.JSONDecodeError, ValueError):
-                    continue
         
-        # Strategy 3: Convert single quotes to double quotes for JSON parsing
-        # Find patterns like ['item1', 'item2'] and convert to ["item1", "item2"]
-        single_quote_pattern = r'\[\s*\'[^\']*\'(?:\s*,\s*\'[^\']*\')*\s*\]'
-        match = re.search(single_quote_pattern, text, re.DOTALL)
-        if match:
-            try:
-                # Replace single quotes with double quotes for JSON parsing
-                json_str = match.group(0).replace("'", '"')
-                parsed_list = json.loads(json_str)
-                if isinstance(parsed_list, list):
-                    return parsed_list
-            except (json.JSONDecodeError, ValueError):
-                pass
-        
-        # Strategy 4: Look for nested lists specifically
-        nested_list_pattern = r'\[\s*\[.*?\](?:\s*,\s*\[.*?\])*\s*\]'
-        match = re.search(nested_list_pattern, text, re.DOTALL)
-        if match:
-            try:
-                json_str = match.group(0)
-                # 确保嵌套列表中的所有元素都是有效的JSON
-                parsed_list = json.loads(json_str)
-                if isinstance(parsed_list, list) and all(isinstance(item, list) for item in parsed_list):
-                    return parsed_list
-            except (json.JSONDecodeError, ValueError):
-                pass
-                
-        # Strategy 5: Look for JSON arrays using more specific patterns
-        # This pattern looks for complete JSON arrays with proper structure
-        json_patterns = [
-            r'\[\s*"[^"]*"(?:\s*,\s*"[^"]*")*\s*\]',  # Array of strings
-            r'\[\s*\d+(?:\s*,\s*\d+)*\s*\]',  # Array of numbers
-            r'\[\s*{[^}]*}(?:\s*,\s*{[^}]*})*\s*\]',  # Array of objects
-        ]
-        
-        for pattern in json_patterns:
-            match = re.search(pattern, text, re.DOTALL)
-            if match:
-                try:
-                    parsed_list = json.loads(match.group(0))
-                    if isinstance(parsed_list, list):
-                        return parsed_list
-                except (json.JSONDecodeError, ValueError):
-                    continue
-        
-        # Strategy 6: Handle mixed type arrays
-        mixed_type_pattern = r'\[\s*(?:[^\[\]]*|\[[^\[\]]*\])*\]'
-        match = re.search(mixed_type_pattern, text, re.DOTALL)
-        if match:
-            try:
-                # Try to fix common issues with mixed type arrays
-                json_str = match.group(0)
-                # Replace single quotes with double quotes
-                json_str = json_str.replace("'", '"')
-                # Handle boolean values (True/False -> true/false)
-                json_str = json_str.replace('True', 'true').replace('False', 'false')
-                parsed_list = json.loads(json_str)
-                if isinstance(parsed_list, list):
-                    return parsed_list
-            except (json.JSONDecodeError, ValueError):
-                pass
+        # Strategy 2: Look for lists in code blocks (most common in LLM responses)
+        start = text.find(_CODE_FENCE)
+        while start != -1:
+            end = text.find(_CODE_FENCE, start + len(_CODE_FENCE))
+            if end == -1:
+                break
+            parsed = cls._first_list(text[start + len(_CODE_FENCE):end])
+            if parsed is not None:
+                return parsed
+            start = text.find(_CODE_FENCE, end + len(_CODE_FENCE))
         
-        return None
+        # Strategy 3: The first bracketed span anywhere that parses as a list
+        return cls._first_list(text)
     
     @classmethod
     def from_string(cls, text: str) -> 'SuperList':
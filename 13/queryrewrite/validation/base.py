@@ -1,6 +1,8 @@
 from enum import Enum
-from typing import List
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, Sequence
 
+from queryrewrite import instrumentation
 from queryrewrite.utils.data_models import RewrittenQuery
 from .validators import (
     no_validation,
@@ -9,7 +11,8 @@ from .validators import (
     most_detailed,
     llm_semantic_similarity,
     filter_by_rouge_l_bleu_thresholds,
-    
+    best_rouge_l_bleu_normalized,
+    iter_filter_by_rouge_l_bleu_thresholds,
 )
 from queryrewrite.llm.base import LLMBase
 
@@ -26,7 +29,9 @@ def validate(
     rewritten_queries: List[RewrittenQuery],
     original_query: str,
     llm: LLMBase = None,
-    thinking:str=''
+    thinking:str='',
+    workers: int = 1,
+    custom_words: Optional[Sequence[str]] = None,
 ) -> List[RewrittenQuery]:
     """
     Unified entry point for query validation.
@@ -36,16 +41,30 @@ def validate(
         rewritten_queries: The list of rewritten queries to validate.
         original_query: The original query string.
         llm: The LLM instance to use for LLM-based validation.
+        thinking: Prompt prefix for LLM-based validation.
+        workers: Number of processes used to compute ROUGE-L/BLEU scores. Candidates are
+            sharded across a process pool whose workers load the jieba dictionary once.
+        custom_words: Custom jieba words loaded by each worker process; pass the same
+            words added to this process's jieba dictionary so tokenization matches.
 
     Returns:
         A list of validated queries.
     """
+    if not isinstance(method, ValidationMethod):
+        raise ValueError(f"Unknown validation method: {method}")
+    with instrumentation.stage(f"validate.{method.value}"):
+        validated = _validate(method, rewritten_queries, original_query, llm, thinking, workers, custom_words)
+    instrumentation.count("candidates.validated", len(rewritten_queries))
+    instrumentation.count("candidates.accepted", len(validated))
+    return validated
+
+def _validate(method, rewritten_queries, original_query, llm, thinking, workers, custom_words) -> List[RewrittenQuery]:
     if method == ValidationMethod.NONE:
         return no_validation(rewritten_queries, original_query)
     elif method == ValidationMethod.ROUGE_L_BLEU_NORMALIZED:
-        return rouge_l_bleu_normalized(rewritten_queries, original_query)
+        return rouge_l_bleu_normalized(rewritten_queries, original_query, workers=workers, custom_words=custom_words)
     elif method == ValidationMethod.PARETO_OPTIMAL:
-        return pareto_optimal(rewritten_queries, original_query)
+        return pareto_optimal(rewritten_queries, original_query, workers=workers, custom_words=custom_words)
     elif method == ValidationMethod.MOST_DETAILED:
         return most_detailed(rewritten_queries, original_query)
     elif method == ValidationMethod.LLM_SEMANTIC_SIMILARITY:
@@ -53,6 +72,72 @@ def validate(
             raise ValueError("LLM instance is required for this validation method.")
         return llm_semantic_similarity(rewritten_queries, original_query, llm,thinking)
     elif method == ValidationMethod.FILTER_BY_ROUGE_L_BLEU_THRESHOLDS:
-        return filter_by_rouge_l_bleu_thresholds(rewritten_queries, original_query)
+        return filter_by_rouge_l_bleu_thresholds(rewritten_queries, original_query, workers=workers, custom_words=custom_words)
     else:
         raise ValueError(f"Unknown validation method: {method}")
+
+
+def iter_validate(
+    method: ValidationMethod,
+    candidates: Iterable[RewrittenQuery],
+    original_query: str,
+    llm: LLMBase = None,
+    thinking: str = '',
+    stop_after: Optional[int] = None,
+) -> Iterator[RewrittenQuery]:
+    """
+    Streaming entry point for query validation.
+
+    Candidates are consumed incrementally: NONE and FILTER_BY_ROUGE_L_BLEU_THRESHOLDS
+    yield each accepted query as soon as it is seen, ROUGE_L_BLEU_NORMALIZED and
+    MOST_DETAILED keep only the running best, and the remaining methods, which need
+    every candidate, collect them first and delegate to validate.
+
+    Args:
+        method: The validation method to use.
+        candidates: Rewritten queries, e.g. from iter_rewrite.
+        original_query: The original query string.
+        llm: The LLM instance to use for LLM-based validation.
+        thinking: Prompt prefix for LLM-based validation.
+        stop_after: For NONE and FILTER_BY_ROUGE_L_BLEU_THRESHOLDS, stop consuming
+            candidates once this many queries have been accepted.
+
+    Returns:
+        An iterator over the validated queries.
+    """
+    if stop_after is not None:
+        if method not in (ValidationMethod.NONE, ValidationMethod.FILTER_BY_ROUGE_L_BLEU_THRESHOLDS):
+            raise ValueError(f"stop_after is not supported by validation method: {method}")
+        if stop_after < 1:
+            raise ValueError("stop_after must be at least 1.")
+
+    def _counted(items: Iterable[RewrittenQuery], counter: str) -> Iterator[RewrittenQuery]:
+        for item in items:
+            instrumentation.count(counter)
+            yield item
+
+    def _streamed() -> Iterator[RewrittenQuery]:
+        seen = _counted(candidates, "candidates.validated")
+        if method == ValidationMethod.NONE:
+            yield from islice(seen, stop_after)
+        elif method == ValidationMethod.FILTER_BY_ROUGE_L_BLEU_THRESHOLDS:
+            yield from iter_filter_by_rouge_l_bleu_thresholds(seen, original_query, stop_after=stop_after)
+        elif method == ValidationMethod.ROUGE_L_BLEU_NORMALIZED:
+            yield from best_rouge_l_bleu_normalized(seen, original_query)
+        else:
+            best_query = max(seen, key=lambda rq: len(rq["query"]), default=None)
+            if best_query is not None:
+                yield best_query
+
+    def _validated() -> Iterator[RewrittenQuery]:
+        if method in (ValidationMethod.NONE, ValidationMethod.FILTER_BY_ROUGE_L_BLEU_THRESHOLDS,
+                      ValidationMethod.ROUGE_L_BLEU_NORMALIZED, ValidationMethod.MOST_DETAILED):
+            yield from _counted(_streamed(), "candidates.accepted")
+        else:
+            # validate records its own counters
+            yield from validate(method, list(candidates), original_query, llm, thinking)
+
+    # Argument errors are raised here; candidates are only consumed once iteration starts
+    if not isinstance(method, ValidationMethod):
+        raise ValueError(f"Unknown validation method: {method}")
+    return _validated()
@@ -0,0 +1,49 @@
+from typing import Dict, Hashable, List, Sequence
+
+class LCSReference:
+    """
+    Bit-parallel longest common subsequence against a fixed reference sequence.
+
+    Reference tokens are mapped to ids once and every id gets a bitmask of the
+    positions it occupies; each hypothesis is then processed one token at a
+    time with a few big-int operations (Hyyrö's variant of the Allison-Dix
+    algorithm), so memory stays O(m) bits and no (m+1)×(n+1) table is built.
+    """
+
+    def __init__(self, reference: Sequence[Hashable]):
+        """
+        Args:
+            reference: The reference token sequence.
+        """
+        self.length = len(reference)
+        self.ids: Dict[Hashable, int] = {}
+        self._masks: List[int] = []
+        for position, token in enumerate(reference):
+            token_id = self.ids.get(token)
+            if token_id is None:
+                token_id = self.ids[token] = len(self._masks)
+                self._masks.append(0)
+            self._masks[token_id] |= 1 << position
+        self._full = (1 << self.length) - 1
+
+    def token_ids(self, tokens: Sequence[Hashable]) -> List[int]:
+        """Maps hypothesis tokens to reference ids (-1 for tokens not in the reference)."""
+        return [self.ids.get(token, -1) for token in tokens]
+
+    def lcs_length(self, hypothesis: Sequence[Hashable]) -> int:
+        """Returns the LCS length between the reference and a hypothesis token sequence."""
+        masks, full = self._masks, self._full
+        # Zero bits of v mark reference positions where the LCS grows
+        v = full
+        for token_id in self.token_ids(hypothesis):
+            if token_id >= 0:
+                u = v & masks[token_id]
+                v = ((v + u) | (v - u)) & full
+        return self.length - v.bit_count()
+
+def lcs_length(x: Sequence[Hashable], y: Sequence[Hashable]) -> int:
+    """Length of the longest common subsequence of two token sequences."""
+    # The bitset spans the longer sequence so the hypothesis loop is the shorter one
+    if len(x) < len(y):
+        x, y = y, x
+    return LCSReference(x).lcs_length(y)
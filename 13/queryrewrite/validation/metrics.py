@@ -1,36 +1,46 @@
 # from rouge_score import rouge_scorer
-from rouge_chinese import Rouge 
-import jieba
-from nltk.translate.bleu_score import sentence_bleu, SmoothingFunction
+from functools import lru_cache
 import re
 
+from .lcs import LCSReference
+from .scoring import rouge_l_f1, rouge_words
+from .tokenization import tokenize
+
+@lru_cache(maxsize=256)
+def _lcs_reference(reference_words: tuple) -> LCSReference:
+    # Validators compare many candidates with the same reference
+    return LCSReference(reference_words)
+
 def calculate_rouge_l(candidate: str, reference: str) -> float:
     """
     Calculates the ROUGE-L F1 score for Chinese text using jieba for tokenization.
+
+    Scores are the same as rouge_chinese's summary-level ROUGE-L; the LCS is
+    computed with the bit-parallel kernel against a cached reference.
     """
-    # Use jieba's precise mode for tokenization (default)
-    candidate_tokens = " ".join(jieba.cut(candidate))
-    reference_tokens = " ".join(jieba.cut(reference))
+    # Use jieba's precise mode for tokenization (default), through the shared cache
+    candidate_words = rouge_words(tokenize(candidate))
+    reference_words = rouge_words(tokenize(reference))
+    if not candidate_words or not reference_words:
+        raise ValueError("Collections must contain at least 1 sentence.")
 
-    # print(f"Candidate tokens: {candidate_tokens}")
-    # print(f"Reference tokens: {reference_tokens}")
+    lcs = _lcs_reference(tuple(reference_words)).lcs_length(candidate_words)
+    return rouge_l_f1(lcs, len(reference_words), len(candidate_words))
 
-    # Initialize the scorer without stemming
-    rouge = Rouge()
-    scores = rouge.get_scores(candidate_tokens,reference_tokens)
-    # print(scores)
-    return scores[0]["rouge-l"]["f"]
 def calculate_bleu(candidate: str, reference: str) -> float:
     """
     Calculates the BLEU score for Chinese text using jieba for tokenization.
     """
+    # nltk is slow to import and only needed here
+    from nltk.translate.bleu_score import sentence_bleu, SmoothingFunction
+
     # Use a regular expression to check for Chinese characters
     if not (re.search(r'[\u4e00-\u9fff]', reference) or re.search(r'[\u4e00-\u9fff]', candidate)):
         raise ValueError("This function is intended for Chinese text.")
     
-    # Use jieba's precise mode (default) to get word lists
-    reference_tokens = [list(jieba.cut(reference))]
-    candidate_tokens = list(jieba.cut(candidate))
+    # Use jieba's precise mode (default) to get word lists, through the shared cache
+    reference_tokens = [list(tokenize(reference))]
+    candidate_tokens = list(tokenize(candidate))
     
     # print(f"Reference tokens: {reference_tokens}")
     # print(f"Candidate tokens: {candidate_tokens}")
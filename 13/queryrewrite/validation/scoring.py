@@ -0,0 +1,250 @@
+import atexit
+import re
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, List, Optional, Sequence, Tuple
+
+from queryrewrite import instrumentation
+from .lcs import LCSReference
+from .tokenization import tokenize
+
+# numpy and jieba are imported on first use to keep the package import cheap
+if TYPE_CHECKING:
+    import numpy as np
+
+# Sentence splitting rules of rouge_chinese.Rouge.cut_sent
+_SENTENCE_BREAKS = [
+    (re.compile(r'([。！？\?])([^”’])'), r"\1\n\2"),
+    (re.compile(r'(\.{6})([^”’])'), r"\1\n\2"),
+    (re.compile(r'(…{2})([^”’])'), r"\1\n\2"),
+    (re.compile(r'([。！？\?][”’])([^，。！？\?])'), r"\1\n\2"),
+]
+_CHINESE = re.compile(r'[一-鿿]')
+
+# Smallest shard worth sending to a worker process
+MIN_SHARD_SIZE = 32
+# Process pools kept alive at the same time; the least recently used one is shut down
+MAX_SCORING_POOLS = 4
+
+BLEU_ORDER = 4
+# SmoothingFunction().method1 epsilon
+_BLEU_EPSILON = 0.1
+
+def rouge_words(tokens: Sequence[str]) -> List[str]:
+    """
+    Returns the flattened word sequence rouge_chinese scores ROUGE-L on for a
+    space-joined jieba tokenization (empty when the text has no sentences).
+    """
+    para = " ".join(tokens)
+    for pattern, replacement in _SENTENCE_BREAKS:
+        para = pattern.sub(replacement, para)
+    sentences = [" ".join(s.split()) for s in para.rstrip().split("\n") if len(s) > 0]
+    return [word for sentence in sentences for word in sentence.split(" ")]
+
+def rouge_l_f1(lcs, reference_length, candidate_length):
+    """ROUGE-L F1 from an LCS length, as computed by rouge_chinese (works on scalars and arrays)."""
+    recall = lcs / reference_length
+    precision = lcs / candidate_length
+    return 2.0 * ((precision * recall) / (precision + recall + 1e-8))
+
+def _ngram_counts(tokens: Sequence[str], n: int) -> Counter:
+    return Counter(tuple(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+
+class ReferenceScorer:
+    """
+    Scores many candidates against one reference (the original query).
+
+    The reference is tokenized and its ROUGE-L word sequence and BLEU n-gram
+    tables are built once; each candidate then only pays for its own
+    tokenization (shared through the token cache) and counting. Scores are
+    identical to calculate_rouge_l / calculate_bleu.
+    """
+
+    def __init__(self, reference: str):
+        """
+        Args:
+            reference: The reference text, i.e. the original query.
+        """
+        self.reference = reference
+        tokens = tokenize(reference)
+        self._has_chinese = _CHINESE.search(reference) is not None
+        self._rouge_words = rouge_words(tokens)
+        self._rouge_lcs_reference = LCSReference(self._rouge_words)
+        self._bleu_length = len(tokens)
+        self._bleu_ngrams = [_ngram_counts(tokens, n) for n in range(1, BLEU_ORDER + 1)]
+
+    def _rouge_lcs(self, candidate: str) -> Tuple[int, int]:
+        """Returns (LCS length, candidate word count) for ROUGE-L."""
+        words = rouge_words(tokenize(candidate))
+        if not words or not self._rouge_words:
+            raise ValueError("Collections must contain at least 1 sentence.")
+        return self._rouge_lcs_reference.lcs_length(words), len(words)
+
+    def _bleu_counts(self, candidate: str) -> Tuple[List[int], List[int], int]:
+        """Returns the clipped n-gram matches, n-gram totals and length of a candidate for BLEU."""
+        if not (self._has_chinese or _CHINESE.search(candidate)):
+            raise ValueError("This function is intended for Chinese text.")
+        tokens = tokenize(candidate)
+        numerators, denominators = [], []
+        for n, reference_counts in enumerate(self._bleu_ngrams, 1):
+            counts = _ngram_counts(tokens, n)
+            numerators.append(sum(min(count, reference_counts[ngram]) for ngram, count in counts.items()))
+            # As in nltk: the denominator is at least 1
+            denominators.append(max(1, sum(counts.values())))
+        return numerators, denominators, len(tokens)
+
+    def _bleu(self, numerators: "np.ndarray", denominators: "np.ndarray", lengths: "np.ndarray") -> "np.ndarray":
+        import numpy as np
+
+        # method1 smoothing: add epsilon to zero-match orders
+        precisions = np.where(numerators == 0, _BLEU_EPSILON, numerators) / denominators
+        reference_length = self._bleu_length
+        with np.errstate(divide="ignore"):
+            brevity = np.where(
+                lengths > reference_length,
+                1.0,
+                np.exp(1 - reference_length / np.maximum(lengths, 1)),
+            )
+        brevity[lengths == 0] = 0.0
+        scores = brevity * np.exp(np.log(precisions).sum(axis=1) / BLEU_ORDER)
+        # No matching unigrams means a score of 0
+        scores[numerators[:, 0] == 0] = 0.0
+        return scores
+
+    def rouge_l(self, candidate: str) -> float:
+        """ROUGE-L F1 of a single candidate against the reference."""
+        lcs, length = self._rouge_lcs(candidate)
+        return rouge_l_f1(lcs, len(self._rouge_words), length)
+
+    def bleu(self, candidate: str) -> float:
+        """BLEU (method1 smoothing) of a single candidate against the reference."""
+        import numpy as np
+
+        numerators, denominators, length = self._bleu_counts(candidate)
+        return float(self._bleu(np.array([numerators]), np.array([denominators]), np.array([length]))[0])
+
+    def score_many(self, candidates: Sequence[str]) -> "np.ndarray":
+        """
+        Scores candidates against the reference.
+
+        Args:
+            candidates: Candidate texts.
+
+        Returns:
+            Float array of shape (len(candidates), 2) holding (rouge_l, bleu) per row.
+
+        Raises:
+            ValueError: If a candidate has no words, or neither it nor the reference contains Chinese text.
+        """
+        import numpy as np
+
+        count = len(candidates)
+        lcs = np.zeros(count, dtype=np.int64)
+        rouge_lengths = np.zeros(count, dtype=np.int64)
+        numerators = np.zeros((count, BLEU_ORDER), dtype=np.int64)
+        denominators = np.ones((count, BLEU_ORDER), dtype=np.int64)
+        bleu_lengths = np.zeros(count, dtype=np.int64)
+        for i, candidate in enumerate(candidates):
+            lcs[i], rouge_lengths[i] = self._rouge_lcs(candidate)
+            numerators[i], denominators[i], bleu_lengths[i] = self._bleu_counts(candidate)
+
+        scores = np.empty((count, 2), dtype=np.float64)
+        if count:
+            scores[:, 0] = rouge_l_f1(lcs, len(self._rouge_words), rouge_lengths)
+            scores[:, 1] = self._bleu(numerators, denominators, bleu_lengths)
+        return scores
+
+def _init_worker(custom_words: Tuple[str, ...], state_path: Optional[str]):
+    """
+    Loads the jieba dictionary (and custom words) once per worker process.
+
+    Workers forked from a warmed-up parent already have it; otherwise the saved
+    tokenizer state of the parent's warmup is loaded when available.
+    """
+    from queryrewrite.tokenizer_state import warmup
+    # Only the parent writes the shared state file; a worker's words would replace the parent's
+    warmup(custom_words=custom_words, state_path=state_path, save=False)
+
+def _score_shard(original_query: str, candidates: List[str]) -> "np.ndarray":
+    return ReferenceScorer(original_query).score_many(candidates)
+
+_pools: "OrderedDict[Tuple[int, Tuple[str, ...], Optional[str]], ProcessPoolExecutor]" = OrderedDict()
+# Guards _pools; reentrant so that score_candidates can also hold it while submitting
+_pools_lock = threading.RLock()
+
+def get_scoring_pool(workers: int, custom_words: Optional[Sequence[str]] = None) -> ProcessPoolExecutor:
+    """
+    Returns a process pool for scoring, created on first use and reused afterwards.
+
+    Args:
+        workers: Number of worker processes.
+        custom_words: Words added to each worker's jieba dictionary; they should
+            match the words added to the dictionary of the calling process.
+
+    At most MAX_SCORING_POOLS pools are kept; creating another one shuts down the
+    least recently used pool (its running tasks still finish).
+    """
+    from queryrewrite.tokenizer_state import tokenizer_state_path
+
+    key = (workers, tuple(custom_words or ()), tokenizer_state_path())
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is not None:
+            _pools.move_to_end(key)
+            return pool
+        while len(_pools) >= MAX_SCORING_POOLS:
+            _, evicted = _pools.popitem(last=False)
+            evicted.shutdown(wait=False)
+        pool = _pools[key] = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=key[1:])
+        return pool
+
+@atexit.register
+def shutdown_scoring_pools():
+    """Shuts down all scoring process pools."""
+    while True:
+        with _pools_lock:
+            if not _pools:
+                return
+            _, pool = _pools.popitem()
+        pool.shutdown()
+
+def score_candidates(
+    original_query: str,
+    candidates: Sequence[str],
+    workers: int = 1,
+    custom_words: Optional[Sequence[str]] = None,
+) -> "np.ndarray":
+    """
+    Scores all candidates against the original query in one pass.
+
+    Args:
+        original_query: The reference query.
+        candidates: Candidate query texts.
+        workers: Number of processes to shard the candidates across (1 scores in-process).
+        custom_words: Custom jieba words loaded by each worker process.
+
+    Returns:
+        Float array of shape (len(candidates), 2) with columns (rouge_l, bleu), in candidate order.
+    """
+    import numpy as np
+
+    if workers < 1:
+        raise ValueError("workers must be at least 1.")
+    if not candidates:
+        return np.empty((0, 2), dtype=np.float64)
+    candidates = list(candidates)
+    shards = min(workers, len(candidates) // MIN_SHARD_SIZE)
+    with instrumentation.stage("score"):
+        if shards <= 1:
+            return ReferenceScorer(original_query).score_many(candidates)
+
+        size = -(-len(candidates) // shards)
+        chunks = [candidates[i:i + size] for i in range(0, len(candidates), size)]
+        # map submits every shard right away; holding the lock until then keeps another
+        # thread from evicting the pool in between
+        with _pools_lock:
+            pool = get_scoring_pool(workers, custom_words)
+            results = pool.map(_score_shard, [original_query] * len(chunks), chunks)
+        # map yields results in submission order, so rows stay aligned with the candidates
+        return np.concatenate(list(results))
@@ -0,0 +1,74 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Tuple
+
+from queryrewrite import instrumentation
+
+class TokenCache:
+    """
+    Bounded LRU cache of jieba tokenizations shared by the validation metrics.
+
+    Validators score many candidates against the same original query, so the
+    reference string is tokenized once instead of once per metric and candidate.
+    """
+
+    def __init__(self, maxsize: int = 100_000):
+        """
+        Args:
+            maxsize: Maximum number of cached tokenizations.
+        """
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1.")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._cache: "OrderedDict[str, Tuple[str, ...]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def tokenize(self, text: str) -> Tuple[str, ...]:
+        """Returns the jieba (precise mode) tokens of a string as a tuple."""
+        with self._lock:
+            tokens = self._cache.get(text)
+            if tokens is not None:
+                self._cache.move_to_end(text)
+                self.hits += 1
+                instrumentation.count("token_cache.hits")
+                return tokens
+            self.misses += 1
+
+        instrumentation.count("token_cache.misses")
+        # Imported on the first miss: loading jieba is the bulk of the package's import time
+        import jieba
+        with instrumentation.stage("tokenize"):
+            tokens = tuple(jieba.cut(text))
+        with self._lock:
+            self._cache[text] = tokens
+            if len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        return tokens
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit/miss counters, the hit rate and the current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self._cache),
+                "maxsize": self.maxsize,
+            }
+
+    def clear(self):
+        """Drops all cached tokenizations (e.g. after changing the jieba dictionary) and resets the counters."""
+        with self._lock:
+            self._cache.clear()
+            self.hits = 0
+            self.misses = 0
+
+# Process-wide cache used by all metrics
+token_cache = TokenCache()
+
+def tokenize(text: str) -> Tuple[str, ...]:
+    """Tokenizes a string through the shared token cache."""
+    return token_cache.tokenize(text)
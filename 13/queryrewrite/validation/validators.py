@@ -1,19 +1,26 @@
-from typing import List
+import asyncio
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
 
-from queryrewrite.utils.data_models import RewrittenQuery
-from .metrics import calculate_rouge_l, calculate_bleu
+from queryrewrite import instrumentation
+from queryrewrite.utils.data_models import ParetoCandidate, RewrittenQuery
+from .scoring import ReferenceScorer, score_candidates
 from queryrewrite.llm.base import LLMBase
 from queryrewrite.utils.super_float import SuperFloat
+from queryrewrite.utils.super_list import SuperList
 
 def no_validation(rewritten_queries: List[RewrittenQuery], original_query: str) -> List[RewrittenQuery]:
     """Returns the rewritten queries without any validation."""
     return rewritten_queries
 
-def rouge_l_bleu_normalized(rewritten_queries: List[RewrittenQuery], original_query: str, rouge_weight: float = 0.7) -> List[RewrittenQuery]:
+def rouge_l_bleu_normalized(rewritten_queries: List[RewrittenQuery], original_query: str, rouge_weight: float = 0.7,
+                            workers: int = 1, custom_words: Optional[Sequence[str]] = None) -> List[RewrittenQuery]:
     """
     通过加权的ROUGE-L和(1-BLEU)分数来选择最佳查询。
     ROUGE-L (越高越好) 代表语义相似度。
     BLEU (越低越好) 代表词汇差异度。我们使用 (1-BLEU) 使其变为越高越好。
+    workers 大于 1 时在多个进程中计算分数，custom_words 为每个进程加载的jieba自定义词。
     """
     if not rewritten_queries:
         return []
@@ -22,23 +29,69 @@ def rouge_l_bleu_normalized(rewritten_queries: List[RewrittenQuery], original_qu
         raise ValueError("rouge_weight must be between 0 and 1.")
     bleu_weight = 1 - rouge_weight
 
-    scored_queries = []
-    for rq in rewritten_queries:
-        rouge_l = calculate_rouge_l(rq["query"], original_query)
-        bleu = calculate_bleu(rq["query"], original_query)
-        # 综合得分：ROUGE-L越高越好，BLEU越低越好 (1-BLEU)
-        score = rouge_weight * rouge_l + bleu_weight * (1 - bleu)
-        scored_queries.append((score, rq))
+    scores = score_candidates(original_query, [rq["query"] for rq in rewritten_queries], workers, custom_words)
+    # 综合得分：ROUGE-L越高越好，BLEU越低越好 (1-BLEU)
+    combined = rouge_weight * scores[:, 0] + bleu_weight * (1 - scores[:, 1])
 
-    if not scored_queries:
-        return []
+    # 返回综合得分最高的查询（得分相同时取第一个）
+    return [rewritten_queries[int(combined.argmax())]]
+
+def best_rouge_l_bleu_normalized(candidates: Iterable[RewrittenQuery], original_query: str, rouge_weight: float = 0.7) -> List[RewrittenQuery]:
+    """
+    rouge_l_bleu_normalized 的流式版本：逐个消费候选，只保留当前得分最高的查询。
+    结果与 rouge_l_bleu_normalized 相同（得分相同时取第一个）。
+    """
+    if not (0 <= rouge_weight <= 1):
+        raise ValueError("rouge_weight must be between 0 and 1.")
+    bleu_weight = 1 - rouge_weight
+
+    scorer = None
+    best_query, best_score = None, None
+    for rq in candidates:
+        if scorer is None:
+            scorer = ReferenceScorer(original_query)
+        score = rouge_weight * scorer.rouge_l(rq["query"]) + bleu_weight * (1 - scorer.bleu(rq["query"]))
+        if best_score is None or score > best_score:
+            best_query, best_score = rq, score
+    return [best_query] if best_query is not None else []
+
+def iter_filter_by_rouge_l_bleu_thresholds(candidates: Iterable[RewrittenQuery], original_query: str,
+                                           rouge_l_threshold: float = 0.4, bleu_threshold: float = 0.3,
+                                           stop_after: Optional[int] = None) -> Iterator[RewrittenQuery]:
+    """
+    Streaming variant of filter_by_rouge_l_bleu_thresholds.
+
+    Scores candidates as they arrive and yields those meeting both thresholds.
+
+    Args:
+        candidates: Rewritten queries, e.g. a rewriter's iter_rewrite iterator
+        original_query: The original query for comparison
+        rouge_l_threshold: Minimum ROUGE-L score threshold (default: 0.4)
+        bleu_threshold: Maximum BLEU score threshold (default: 0.3)
+        stop_after: Stop consuming candidates once this many queries qualified (default: no limit)
 
-    # 返回综合得分最高的查询
-    best_query = max(scored_queries, key=lambda item: item[0])
-    return [best_query[1]]
+    Returns:
+        Iterator over the queries that meet both threshold criteria
+    """
+    if stop_after is not None and stop_after < 1:
+        raise ValueError("stop_after must be at least 1.")
+
+    scorer = None
+    found = 0
+    for rq in candidates:
+        if scorer is None:
+            scorer = ReferenceScorer(original_query)
+        rouge_l_score = scorer.rouge_l(rq["query"])
+        bleu_score = scorer.bleu(rq["query"])
+        if rouge_l_score >= rouge_l_threshold and bleu_score < bleu_threshold:
+            yield rq
+            found += 1
+            if stop_after is not None and found >= stop_after:
+                return
 
 def filter_by_rouge_l_bleu_thresholds(rewritten_queries: List[RewrittenQuery], original_query: str, 
-                        rouge_l_threshold: float = 0.4, bleu_threshold: float = 0.3) -> List[RewrittenQuery]:
+                        rouge_l_threshold: float = 0.4, bleu_threshold: float = 0.3,
+                        workers: int = 1, custom_words: Optional[Sequence[str]] = None) -> List[RewrittenQuery]:
     """
     Filters queries based on ROUGE-L and BLEU score thresholds.
     
@@ -51,6 +104,8 @@ def filter_by_rouge_l_bleu_thresholds(rewritten_queries: List[RewrittenQuery], o
         original_query: The original query for comparison
         rouge_l_threshold: Minimum ROUGE-L score threshold (default: 0.4)
         bleu_threshold: Maximum BLEU score threshold (default: 0.3)
+        workers: Number of processes used to compute the scores (default: 1)
+        custom_words: Custom jieba words loaded by each worker process
         
     Returns:
         List of queries that meet both threshold criteria
@@ -59,10 +114,9 @@ def filter_by_rouge_l_bleu_thresholds(rewritten_queries: List[RewrittenQuery], o
         return []
 
     optimal_queries = []
-    
-    for rq in rewritten_queries:
-        rouge_l_score = calculate_rouge_l(rq["query"], original_query)
-        bleu_score = calculate_bleu(rq["query"], original_query)
+    scores = score_candidates(original_query, [rq["query"] for rq in rewritten_queries], workers, custom_words)
+
+    for rq, (rouge_l_score, bleu_score) in zip(rewritten_queries, scores):
         # print(f"Query: {rq['query']}, ROUGE-L: {rouge_l_score}, BLEU: {bleu_score}")
         # Check if query meets both criteria:
         # - ROUGE-L score >= threshold (higher semantic similarity)
@@ -72,31 +126,71 @@ def filter_by_rouge_l_bleu_thresholds(rewritten_queries: List[RewrittenQuery], o
     
     return optimal_queries
 
-def pareto_optimal(rewritten_queries: List[RewrittenQuery], original_query: str) -> List[RewrittenQuery]:
-    """Finds the Pareto optimal set of rewritten queries based on ROUGE-L and BLEU scores."""
+def pareto_front_ranks(scores: Sequence[Tuple[float, float]]) -> List[int]:
+    """
+    Assigns each (rouge_l, bleu) point its non-dominated front (0 is the Pareto front).
+
+    Higher ROUGE-L and lower BLEU are better; identical points share a front. Points are
+    swept in order of ROUGE-L descending while each front keeps its lowest BLEU so far;
+    those minima are sorted across fronts, so a point's front is found by bisection,
+    giving O(n log n) overall.
+    """
+    ranks = [0] * len(scores)
+    # Identical points never dominate each other, so they are ranked once as a group
+    positions: Dict[Tuple[float, float], List[int]] = {}
+    for i, point in enumerate(scores):
+        positions.setdefault((float(point[0]), float(point[1])), []).append(i)
+
+    front_min_bleu: List[float] = []
+    for rouge_l, bleu in sorted(positions, key=lambda point: (-point[0], point[1])):
+        # Every point already swept has a higher ROUGE-L, or the same ROUGE-L and a lower BLEU,
+        # so it dominates this one exactly when its BLEU is not higher.
+        front = bisect_right(front_min_bleu, bleu)
+        if front == len(front_min_bleu):
+            front_min_bleu.append(bleu)
+        else:
+            front_min_bleu[front] = bleu
+        for i in positions[(rouge_l, bleu)]:
+            ranks[i] = front
+    return ranks
+
+def pareto_optimal(
+    rewritten_queries: List[RewrittenQuery],
+    original_query: str,
+    num_fronts: int = 1,
+    return_scores: bool = False,
+    workers: int = 1,
+    custom_words: Optional[Sequence[str]] = None,
+) -> Union[List[RewrittenQuery], List[ParetoCandidate]]:
+    """
+    Finds the Pareto optimal set of rewritten queries based on ROUGE-L and BLEU scores.
+
+    Args:
+        rewritten_queries: List of rewritten queries.
+        original_query: The original query for comparison.
+        num_fronts: Number of non-dominated fronts to return (1 returns only the Pareto front).
+        return_scores: If True, return ParetoCandidate dicts with the front and scores of each query.
+        workers: Number of processes used to compute the scores.
+        custom_words: Custom jieba words loaded by each worker process.
+
+    Returns:
+        Queries of the first num_fronts fronts, ordered by front and then by input order.
+    """
+    if num_fronts < 1:
+        raise ValueError("num_fronts must be at least 1.")
     if not rewritten_queries:
         return []
 
-    scores = []
-    for rq in rewritten_queries:
-        rouge_l = calculate_rouge_l(rq["query"], original_query)
-        bleu = calculate_bleu(rq["query"], original_query)
-        scores.append((rouge_l, bleu, rq))
-
-    pareto_front = []
-    for i, (r1, b1, q1) in enumerate(scores):
-        is_dominated = False
-        for j, (r2, b2, q2) in enumerate(scores):
-            if i == j: continue
-            # A query is dominated if another query is better or equal in all objectives
-            # and strictly better in at least one objective.
-            if (r2 >= r1 and b2 <= b1) and (r2 > r1 or b2 < b1):
-                is_dominated = True
-                break
-        if not is_dominated:
-            pareto_front.append(q1)
-            
-    return pareto_front
+    scores = score_candidates(original_query, [rq["query"] for rq in rewritten_queries], workers, custom_words).tolist()
+    ranks = pareto_front_ranks(scores)
+    selected = sorted((i for i, front in enumerate(ranks) if front < num_fronts), key=lambda i: (ranks[i], i))
+
+    if return_scores:
+        return [
+            {"query": rewritten_queries[i], "front": ranks[i], "rouge_l": scores[i][0], "bleu": scores[i][1]}
+            for i in selected
+        ]
+    return [rewritten_queries[i] for i in selected]
 
 def most_detailed(rewritten_queries: List[RewrittenQuery], original_query: str) -> List[RewrittenQuery]:
     """返回最长的查询。如果没有重写查询，则返回空列表。"""
@@ -105,21 +199,136 @@ def most_detailed(rewritten_queries: List[RewrittenQuery], original_query: str)
     # 返回所有查询中最长的一个
     return [max(rewritten_queries, key=lambda rq: len(rq["query"]))]
 
-def llm_semantic_similarity(rewritten_queries: List[RewrittenQuery], original_query: str, llm: LLMBase,thinking:str='') -> List[RewrittenQuery]:
-    """使用LLM寻找语义最相似且词汇差异最大（BLEU最低）的查询。"""
+def _similarity_prompt(original_query: str, candidate: str, thinking: str) -> str:
+    return f'{thinking}\n\n评估以下两个查询的语义相似度，\n查询1: {original_query}\n查询2: {candidate}，返回一个0到1之间的浮点数，semantic_similarity=。'
+
+def _similarity_responses(llm: LLMBase, original_query: str, candidates: List[str], thinking: str) -> List[Union[str, float]]:
+    """逐个询问LLM，返回原始响应。"""
+    return [instrumentation.invoke_llm(llm, _similarity_prompt(original_query, candidate, thinking)) for candidate in candidates]
+
+def _batch_similarity_prompt(original_query: str, candidates: List[str], thinking: str) -> str:
+    numbered = "\n".join(f"{i}. {candidate}" for i, candidate in enumerate(candidates, 1))
+    return (f'{thinking}\n\n评估原始查询与以下每个候选查询的语义相似度，\n原始查询: {original_query}\n'
+            f'候选查询:\n{numbered}\n按候选顺序返回{len(candidates)}个0到1之间的浮点数，以json list的格式返回。')
+
+def _parse_batch_similarities(response: str, candidates: List[str]) -> Optional[List[float]]:
+    """解析批量相似度响应；解析失败或数量不符时返回None。"""
+    try:
+        values = SuperList(response)
+        if len(values) != len(candidates):
+            raise ValueError(f"expected {len(candidates)} scores, got {len(values)}")
+        return [SuperFloat(value) for value in values]
+    except (ValueError, TypeError) as e:
+        print(f"批量评估相似度失败: {e}，回退到逐个评估。")
+        return None
+
+def _batch_similarity_responses(llm: LLMBase, original_query: str, candidates: List[str], thinking: str) -> List[Union[str, float]]:
+    """一次询问LLM多个候选的相似度；解析失败或数量不符时回退为逐个询问。"""
+    response = instrumentation.invoke_llm(llm, _batch_similarity_prompt(original_query, candidates, thinking))
+    similarities = _parse_batch_similarities(response, candidates)
+    if similarities is None:
+        return _similarity_responses(llm, original_query, candidates, thinking)
+    return similarities
+
+async def _asimilarity_responses(llm: LLMBase, original_query: str, candidates: List[str], thinking: str) -> List[Union[str, float]]:
+    """_similarity_responses 的异步版本：并发询问各个候选。"""
+    return list(await asyncio.gather(*(instrumentation.ainvoke_llm(llm, _similarity_prompt(original_query, candidate, thinking))
+                                       for candidate in candidates)))
+
+async def _abatch_similarity_responses(llm: LLMBase, original_query: str, candidates: List[str], thinking: str) -> List[Union[str, float]]:
+    """_batch_similarity_responses 的异步版本。"""
+    response = await instrumentation.ainvoke_llm(llm, _batch_similarity_prompt(original_query, candidates, thinking))
+    similarities = _parse_batch_similarities(response, candidates)
+    if similarities is None:
+        return await _asimilarity_responses(llm, original_query, candidates, thinking)
+    return similarities
+
+def llm_semantic_similarity(
+    rewritten_queries: List[RewrittenQuery],
+    original_query: str,
+    llm: LLMBase,
+    thinking: str = '',
+    max_workers: int = 1,
+    batch_size: int = 1,
+) -> List[RewrittenQuery]:
+    """
+    使用LLM寻找语义最相似且词汇差异最大（BLEU最低）的查询。
+
+    参数:
+        rewritten_queries: 重写后的查询列表。
+        original_query: 原始查询。
+        llm: 用于评估相似度的LLM实例。
+        thinking: 提示词前缀。
+        max_workers: 并发请求LLM的线程数，1 为顺序执行。
+        batch_size: 每次提示词评估的候选数；大于 1 时要求LLM返回json list格式的相似度列表。
+
+    返回:
+        最佳查询组成的列表（没有可用结果时为空列表）。
+    """
+    if max_workers < 1:
+        raise ValueError("max_workers must be at least 1.")
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1.")
+    if not rewritten_queries:
+        return []
+
+    candidates = [rq["query"] for rq in rewritten_queries]
+    chunks = [candidates[i:i + batch_size] for i in range(0, len(candidates), batch_size)]
+    score_chunk = _batch_similarity_responses if batch_size > 1 else _similarity_responses
+    if max_workers == 1:
+        chunk_responses = [score_chunk(llm, original_query, chunk, thinking) for chunk in chunks]
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            chunk_responses = list(executor.map(lambda chunk: score_chunk(llm, original_query, chunk, thinking), chunks))
+    responses = [response for chunk in chunk_responses for response in chunk]
+    return _most_similar(rewritten_queries, original_query, responses)
+
+async def allm_semantic_similarity(
+    rewritten_queries: List[RewrittenQuery],
+    original_query: str,
+    llm: LLMBase,
+    thinking: str = '',
+    batch_size: int = 1,
+) -> List[RewrittenQuery]:
+    """
+    llm_semantic_similarity 的异步版本：所有LLM请求并发等待，不阻塞事件循环。
+
+    并发数由LLM实现限制（如 AsyncOllamaLLM 的 max_in_flight）。
+
+    参数:
+        rewritten_queries: 重写后的查询列表。
+        original_query: 原始查询。
+        llm: 用于评估相似度的LLM实例。
+        thinking: 提示词前缀。
+        batch_size: 每次提示词评估的候选数；大于 1 时要求LLM返回json list格式的相似度列表。
+
+    返回:
+        最佳查询组成的列表（没有可用结果时为空列表）。
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1.")
     if not rewritten_queries:
         return []
 
+    candidates = [rq["query"] for rq in rewritten_queries]
+    chunks = [candidates[i:i + batch_size] for i in range(0, len(candidates), batch_size)]
+    score_chunk = _abatch_similarity_responses if batch_size > 1 else _asimilarity_responses
+    chunk_responses = await asyncio.gather(*(score_chunk(llm, original_query, chunk, thinking) for chunk in chunks))
+    responses = [response for chunk in chunk_responses for response in chunk]
+    return _most_similar(rewritten_queries, original_query, responses)
+
+def _most_similar(rewritten_queries: List[RewrittenQuery], original_query: str,
+                  responses: List[Union[str, float]]) -> List[RewrittenQuery]:
+    """在LLM给出的相似度中选出最高的查询，相似度相同时选BLEU最低的。"""
     best_query = None
     highest_similarity = -1.0
     lowest_bleu_at_highest_sim = 2.0  # BLEU 分数在 0 和 1 之间
+    scorer = ReferenceScorer(original_query)
 
-    for rq in rewritten_queries:
-        prompt = f'{thinking}\n\n评估以下两个查询的语义相似度，\n查询1: {original_query}\n查询2: {rq["query"]}，返回一个0到1之间的浮点数，semantic_similarity=。'
-        response = llm.invoke(prompt)
+    for rq, response in zip(rewritten_queries, responses):
         try:
             similarity = SuperFloat(response)
-            bleu_score = calculate_bleu(rq["query"], original_query)
+            bleu_score = scorer.bleu(rq["query"])
             
             # 核心选择逻辑：
             # 1. 如果当前查询的相似度更高，则更新最佳查询。
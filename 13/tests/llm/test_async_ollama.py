@@ -0,0 +1,196 @@
+import asyncio
+import json
+import threading
+
+import httpx
+import pytest
+
+from queryrewrite.llm.base import LLMBase
+from queryrewrite.llm.async_ollama import AsyncOllamaLLM
+from queryrewrite.rewriting.llm_rewriter import LLMRewriter
+from queryrewrite.rewriting.synonym_rewriter import SynonymRewriter
+from queryrewrite.validation.validators import allm_semantic_similarity, llm_semantic_similarity
+
+
+class EchoLLM(LLMBase):
+    """A sync-only LLM used to exercise the default ainvoke."""
+
+    def invoke(self, prompt: str) -> str:
+        return f"echo: {prompt}"
+
+
+def test_default_ainvoke_runs_invoke():
+    """Tests that LLMBase.ainvoke falls back to the sync invoke."""
+    assert asyncio.run(EchoLLM().ainvoke("hi")) == "echo: hi"
+
+
+def test_default_stream_yields_invoke_response():
+    """Tests that LLMBase.stream yields the invoke response as one chunk."""
+    assert list(EchoLLM().stream("hi")) == ["echo: hi"]
+
+
+def _generate_handler(request: httpx.Request) -> httpx.Response:
+    payload = json.loads(request.content)
+    assert request.url.path == "/api/generate"
+    assert payload["stream"] is False
+    return httpx.Response(200, json={"model": payload["model"], "response": f"re: {payload['prompt']}", "done": True})
+
+
+def test_async_ollama_invoke():
+    """Tests the sync invoke of AsyncOllamaLLM."""
+    llm = AsyncOllamaLLM(model="test-model")
+    llm._client = httpx.Client(base_url=llm.base_url, transport=httpx.MockTransport(_generate_handler))
+
+    assert llm.invoke("prompt") == "re: prompt"
+
+
+def test_async_ollama_stream():
+    """Tests that AsyncOllamaLLM.stream yields the tokens of a streamed generation."""
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert json.loads(request.content)["stream"] is True
+        lines = [{"response": "[\"a\"", "done": False}, {"response": ", \"b\"]", "done": False}, {"response": "", "done": True}]
+        return httpx.Response(200, content="\n".join(json.dumps(line) for line in lines).encode())
+
+    llm = AsyncOllamaLLM(model="test-model")
+    llm._client = httpx.Client(base_url=llm.base_url, transport=httpx.MockTransport(handler))
+
+    assert list(llm.stream("prompt")) == ['["a"', ', "b"]']
+
+
+def test_async_ollama_ainvoke_limits_in_flight(monkeypatch):
+    """Tests that ainvoke never exceeds max_in_flight concurrent requests."""
+    in_flight = 0
+    peak = 0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return _generate_handler(request)
+
+    llm = AsyncOllamaLLM(model="test-model", max_in_flight=3)
+    monkeypatch.setattr(
+        llm,
+        "_new_async_client",
+        lambda: httpx.AsyncClient(base_url=llm.base_url, transport=httpx.MockTransport(handler)),
+    )
+
+    async def run():
+        async with llm:
+            return await asyncio.gather(*(llm.ainvoke(f"p{i}") for i in range(12)))
+
+    results = asyncio.run(run())
+
+    assert results == [f"re: p{i}" for i in range(12)]
+    assert peak <= 3
+
+
+def test_async_client_is_closed_with_its_event_loop(monkeypatch):
+    """Tests that each asyncio.run closes the async client it created instead of leaking it."""
+    llm = AsyncOllamaLLM(model="test-model")
+    clients = []
+
+    def new_client():
+        clients.append(httpx.AsyncClient(base_url=llm.base_url, transport=httpx.MockTransport(_generate_handler)))
+        return clients[-1]
+
+    monkeypatch.setattr(llm, "_new_async_client", new_client)
+
+    assert asyncio.run(llm.ainvoke("a")) == "re: a"
+    assert clients[0].is_closed
+    assert asyncio.run(llm.ainvoke("b")) == "re: b"
+    assert len(clients) == 2 and clients[1].is_closed
+
+
+def test_event_loops_get_separate_async_clients(monkeypatch):
+    """Tests that a loop starting to use the instance does not close another loop's client mid-request."""
+    llm = AsyncOllamaLLM(model="test-model")
+    clients = []
+    second_done = threading.Event()
+    closed_mid_request = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if json.loads(request.content)["prompt"] == "first":
+            # Keeps the first request in flight until the other loop has finished
+            while not second_done.is_set():
+                await asyncio.sleep(0.005)
+            closed_mid_request.append(clients[0].is_closed)
+        return _generate_handler(request)
+
+    def new_client():
+        clients.append(httpx.AsyncClient(base_url=llm.base_url, transport=httpx.MockTransport(handler)))
+        return clients[-1]
+
+    monkeypatch.setattr(llm, "_new_async_client", new_client)
+    results = {}
+    first = threading.Thread(target=lambda: results.update(first=asyncio.run(llm.ainvoke("first"))))
+    first.start()
+    while not clients:
+        second_done.wait(0.005)
+    results["second"] = asyncio.run(llm.ainvoke("second"))
+    second_done.set()
+    first.join()
+
+    assert results == {"first": "re: first", "second": "re: second"}
+    assert closed_mid_request == [False]
+    assert len(clients) == 2 and all(client.is_closed for client in clients)
+
+
+def test_llm_rewriter_arewrite():
+    """Tests that LLMRewriter can await the LLM."""
+    class ListLLM(LLMBase):
+        def invoke(self, prompt: str) -> str:
+            return '[{"query": "q1", "reference": "r"}, {"query": "q2", "reference": "r"}]'
+
+    result = asyncio.run(LLMRewriter(ListLLM()).arewrite({"query": "q", "reference": "r"}))
+
+    assert [rq["query"] for rq in result] == ["q1", "q2"]
+
+
+class ConcurrentLLM(LLMBase):
+    """An LLM whose ainvoke awaits, recording how many calls overlap."""
+
+    def __init__(self, respond):
+        self.respond = respond
+        self.in_flight = 0
+        self.peak = 0
+
+    def invoke(self, prompt: str) -> str:
+        return self.respond(prompt)
+
+    async def ainvoke(self, prompt: str) -> str:
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        return self.respond(prompt)
+
+
+def test_synonym_rewriter_arewrite_requests_words_concurrently():
+    """Tests that SynonymRewriter.arewrite matches rewrite while awaiting the words' LLM calls together."""
+    query = {"query": "如何 测试 大型 模型", "reference": "r"}
+    llm = ConcurrentLLM(lambda prompt: '["甲", "乙"]')
+
+    result = asyncio.run(SynonymRewriter(llm).arewrite(query))
+
+    assert result == SynonymRewriter(llm).rewrite(query)
+    assert llm.peak > 1
+
+
+def test_allm_semantic_similarity_matches_sync():
+    """Tests that allm_semantic_similarity awaits the candidates together and picks the same query."""
+    candidates = [{"query": q, "reference": "r"} for q in ("测试模型", "评估模型", "检验模型")]
+    llm = ConcurrentLLM(lambda prompt: "0.9" if "评估模型" in prompt else "0.2")
+
+    result = asyncio.run(allm_semantic_similarity(candidates, "测试大模型", llm))
+
+    assert result == llm_semantic_similarity(candidates, "测试大模型", llm) == [candidates[1]]
+    assert llm.peak == 3
+
+
+def test_invalid_max_in_flight():
+    """Tests that a non-positive max_in_flight is rejected."""
+    with pytest.raises(ValueError):
+        AsyncOllamaLLM(max_in_flight=0)
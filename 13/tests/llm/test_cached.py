@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+from unittest.mock import MagicMock
+
+from queryrewrite.llm.base import LLMBase
+from queryrewrite.llm.cached import CachedLLM
+
+
+class CountingLLM(LLMBase):
+    """An LLM that counts how often it is invoked."""
+
+    def __init__(self, model: str = "test-model"):
+        self.model = model
+        self.calls = 0
+
+    def invoke(self, prompt: str) -> str:
+        self.calls += 1
+        return f"response to {prompt}"
+
+
+def test_cached_llm_hits_and_misses():
+    """Tests that repeated prompts are served from the cache."""
+    llm = CountingLLM()
+    cached = CachedLLM(llm, path=":memory:")
+
+    assert cached.invoke("a") == "response to a"
+    assert cached.invoke("a") == "response to a"
+    assert cached.invoke("b") == "response to b"
+
+    assert llm.calls == 2
+    stats = cached.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 2, 2)
+    assert stats["hit_rate"] == pytest.approx(1 / 3)
+
+
+def test_cached_llm_keys_on_model_and_options():
+    """Tests that the model name and options are part of the cache key."""
+    cached = CachedLLM(CountingLLM("m1"), path=":memory:")
+    assert cached.cache_key("p") != CachedLLM(CountingLLM("m2"), path=":memory:").cache_key("p")
+    assert cached.cache_key("p") != CachedLLM(CountingLLM("m1"), path=":memory:", options={"temperature": 0}).cache_key("p")
+
+
+def test_cached_llm_persists_between_instances(tmp_path):
+    """Tests that a rerun reuses responses stored by a previous run."""
+    path = str(tmp_path / "cache.sqlite3")
+    CachedLLM(CountingLLM(), path=path).invoke("a")
+
+    llm = CountingLLM()
+    cached = CachedLLM(llm, path=path)
+
+    assert cached.invoke("a") == "response to a"
+    assert llm.calls == 0
+
+
+def test_cached_llm_evicts_least_recently_used():
+    """Tests that the cache never grows past max_entries."""
+    llm = CountingLLM()
+    cached = CachedLLM(llm, path=":memory:", max_entries=2)
+
+    cached.invoke("a")
+    cached.invoke("b")
+    cached.invoke("a")  # refresh "a" so that "b" is the eviction candidate
+    cached.invoke("c")
+
+    assert cached.stats()["size"] == 2
+    cached.invoke("a")
+    assert llm.calls == 3
+    cached.invoke("b")
+    assert llm.calls == 4
+
+
+def test_cached_llm_ttl(monkeypatch):
+    """Tests that expired entries are refreshed from the wrapped LLM."""
+    now = [1000.0]
+    monkeypatch.setattr("queryrewrite.llm.cached.time.time", lambda: now[0])
+    llm = CountingLLM()
+    cached = CachedLLM(llm, path=":memory:", ttl=60)
+
+    cached.invoke("a")
+    now[0] += 30
+    cached.invoke("a")
+    assert llm.calls == 1
+
+    now[0] += 61
+    cached.invoke("a")
+    assert llm.calls == 2
+
+
+def test_cached_llm_ainvoke():
+    """Tests the asynchronous cache path."""
+    llm = CountingLLM()
+    cached = CachedLLM(llm, path=":memory:")
+
+    async def run():
+        return [await cached.ainvoke("a"), await cached.ainvoke("a")]
+
+    assert asyncio.run(run()) == ["response to a", "response to a"]
+    assert llm.calls == 1
+
+
+def test_cached_llm_wraps_mock():
+    """Tests that any LLM-like object can be wrapped."""
+    mock_llm = MagicMock()
+    mock_llm.invoke.return_value = "0.8"
+    cached = CachedLLM(mock_llm, path=":memory:", model="mock")
+
+    assert cached.invoke("p") == "0.8"
+    assert cached.invoke("p") == "0.8"
+    mock_llm.invoke.assert_called_once_with("p")
@@ -0,0 +1,109 @@
+import asyncio
+import gzip
+import time
+from unittest.mock import MagicMock
+
+import pytest
+from langchain_core.messages import AIMessage
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+
+from queryrewrite.llm.cassette import Cassette, CassetteLLM, CassetteMissError, cassette_runnable
+
+def make_llm(*responses):
+    llm = MagicMock()
+    llm.model = "fake"
+    llm.invoke.side_effect = list(responses)
+    return llm
+
+@pytest.mark.parametrize("filename", ["llm.jsonl", "llm.jsonl.gz"])
+def test_record_then_replay(tmp_path, filename):
+    path = str(tmp_path / filename)
+    with Cassette(path, mode="record") as cassette:
+        recorder = CassetteLLM(make_llm("first", "second", "other"), cassette)
+        assert [recorder.invoke("a"), recorder.invoke("a"), recorder.invoke("b")] == ["first", "second", "other"]
+
+    replayer = CassetteLLM(None, Cassette(path, mode="replay"), model="fake")
+    # Repeated prompts replay in recording order, then stick to the last response
+    assert [replayer.invoke("a"), replayer.invoke("b"), replayer.invoke("a"), replayer.invoke("a")] == \
+        ["first", "other", "second", "second"]
+    with pytest.raises(CassetteMissError):
+        replayer.invoke("c")
+
+@pytest.mark.parametrize("filename", ["llm.jsonl", "llm.jsonl.gz"])
+def test_record_replaces_existing_cassette(tmp_path, filename):
+    path = str(tmp_path / filename)
+    for response in ["OLD", "NEW"]:
+        with Cassette(path, mode="record") as cassette:
+            CassetteLLM(make_llm(response), cassette).invoke("a")
+
+    replay = Cassette(path, mode="replay")
+    assert len(replay) == 1
+    assert CassetteLLM(None, replay, model="fake").invoke("a") == "NEW"
+
+def test_gzip_cassette_is_one_stream(tmp_path):
+    path = tmp_path / "llm.jsonl.gz"
+    prompts = [f"prompt {i}" for i in range(500)]
+    with Cassette(str(path), mode="record") as cassette:
+        recorder = CassetteLLM(make_llm(*(f"改写后的查询{i}：如何评估大模型的效果？" for i in range(500))), cassette)
+        for prompt in prompts:
+            recorder.invoke(prompt)
+
+    # One gzip member: the file is about as small as compressing all lines at once
+    plain = path.with_suffix("")
+    with Cassette(str(plain), mode="record") as cassette:
+        recorder = CassetteLLM(make_llm(*(f"改写后的查询{i}：如何评估大模型的效果？" for i in range(500))), cassette)
+        for prompt in prompts:
+            recorder.invoke(prompt)
+    assert path.stat().st_size < len(gzip.compress(plain.read_bytes())) * 1.1
+    assert len(Cassette(str(path), mode="replay")) == 500
+
+def test_auto_mode_records_only_misses(tmp_path):
+    path = str(tmp_path / "llm.jsonl")
+    CassetteLLM(make_llm("recorded"), Cassette(path)).invoke("a")
+
+    llm = make_llm("live")
+    cassette = Cassette(path)
+    wrapped = CassetteLLM(llm, cassette)
+    assert wrapped.invoke("a") == "recorded"
+    assert wrapped.invoke("b") == "live"
+    assert llm.invoke.call_count == 1
+    assert cassette.stats()["hits"] == 1 and len(Cassette(path)) == 2
+
+def test_replay_simulates_latency(tmp_path):
+    path = str(tmp_path / "llm.jsonl")
+    llm = MagicMock()
+    llm.model = "fake"
+    llm.invoke.side_effect = lambda prompt: time.sleep(0.05) or "slow"
+    CassetteLLM(llm, Cassette(path, mode="record")).invoke("a")
+
+    replayer = CassetteLLM(None, Cassette(path, mode="replay", simulate_latency=True), model="fake")
+    started = time.perf_counter()
+    assert replayer.invoke("a") == "slow"
+    assert time.perf_counter() - started >= 0.05
+
+    fast = CassetteLLM(None, Cassette(path, mode="replay"), model="fake")
+    started = time.perf_counter()
+    fast.invoke("a")
+    assert time.perf_counter() - started < 0.05
+
+def test_async_replay(tmp_path):
+    path = str(tmp_path / "llm.jsonl")
+    CassetteLLM(make_llm("answer"), Cassette(path, mode="record")).invoke("a")
+    replayer = CassetteLLM(None, Cassette(path, mode="replay"), model="fake")
+    assert asyncio.run(replayer.ainvoke("a")) == "answer"
+
+def test_runnable_in_lcel_chain(tmp_path):
+    path = str(tmp_path / "chat.jsonl")
+    chat = MagicMock()
+    chat.model = "fake-chat"
+    chat.invoke.return_value = AIMessage(content="回答")
+    prompt = ChatPromptTemplate.from_template("问题: {text}")
+
+    chain = prompt | cassette_runnable(chat, Cassette(path, mode="record")) | StrOutputParser()
+    assert chain.invoke({"text": "你好"}) == "回答"
+
+    replay_chain = prompt | cassette_runnable(None, Cassette(path, mode="replay"), model="fake-chat")
+    result = replay_chain.invoke({"text": "你好"})
+    assert isinstance(result, AIMessage) and result.content == "回答"
+    assert chat.invoke.call_count == 1
@@ -0,0 +1,77 @@
+import json
+import threading
+import time
+
+import pytest
+from unittest.mock import MagicMock
+
+from queryrewrite.rewriting.base import rewrite_many, RewriteMethod
+
+
+def _llm_response(prompt: str) -> str:
+    """Echoes the query found in the prompt as two rewrites."""
+    user_input = json.loads(prompt[prompt.rindex("{"):])
+    if user_input["query"] == "boom":
+        raise RuntimeError("LLM unavailable")
+    # Finish later queries first to make sure results are reordered
+    time.sleep(0.05 if user_input["query"] == "q0" else 0.0)
+    return json.dumps([
+        {"query": f"{user_input['query']} a", "reference": user_input["reference"]},
+        {"query": f"{user_input['query']} b", "reference": user_input["reference"]},
+    ])
+
+
+def test_rewrite_many_keeps_input_order():
+    """Tests that rewrite_many returns results in input order."""
+    llm = MagicMock()
+    llm.invoke.side_effect = _llm_response
+    queries = [{"query": f"q{i}", "reference": "ref"} for i in range(5)]
+
+    results = rewrite_many(RewriteMethod.LLM, queries, llm=llm, max_concurrency=3)
+
+    assert [r["query"] for r in results] == queries
+    assert all(r["error"] is None for r in results)
+    assert results[0]["rewritten_queries"][0] == {"query": "q0 a", "reference": "ref"}
+
+
+def test_rewrite_many_reports_failures():
+    """Tests that a failing query does not abort the batch."""
+    llm = MagicMock()
+    llm.invoke.side_effect = _llm_response
+    queries = [{"query": "q1", "reference": "ref"}, {"query": "boom", "reference": "ref"}]
+
+    results = rewrite_many(RewriteMethod.LLM, queries, llm=llm)
+
+    assert len(results[0]["rewritten_queries"]) == 2
+    assert results[1]["rewritten_queries"] == []
+    assert "LLM unavailable" in results[1]["error"]
+
+
+def test_rewrite_many_bounds_concurrency():
+    """Tests that no more than max_concurrency LLM calls are in flight."""
+    lock = threading.Lock()
+    in_flight = []
+    peak = []
+
+    def slow_response(prompt):
+        with lock:
+            in_flight.append(1)
+            peak.append(len(in_flight))
+        time.sleep(0.02)
+        with lock:
+            in_flight.pop()
+        return '[{"query": "x", "reference": "ref"}, {"query": "y", "reference": "ref"}]'
+
+    llm = MagicMock()
+    llm.invoke.side_effect = slow_response
+    queries = [{"query": f"q{i}", "reference": "ref"} for i in range(10)]
+
+    rewrite_many(RewriteMethod.LLM, queries, llm=llm, max_concurrency=2)
+
+    assert max(peak) <= 2
+
+
+def test_rewrite_many_invalid_concurrency():
+    """Tests that a non-positive max_concurrency is rejected."""
+    with pytest.raises(ValueError):
+        rewrite_many(RewriteMethod.LLM, [], llm=MagicMock(), max_concurrency=0)
@@ -0,0 +1,48 @@
+import itertools
+import time
+
+from queryrewrite.rewriting.combinations import count_combinations, sample_combinations
+from queryrewrite.rewriting.glossary_rewriter import GlossaryRewriter
+
+
+def test_small_product_is_returned_in_order():
+    """Tests that a product within the limit is enumerated completely."""
+    word_lists = [["a", "b"], ["c"], ["d", "e"]]
+
+    assert list(sample_combinations(word_lists, 10)) == list(itertools.product(*word_lists))
+
+
+def test_sampling_is_unique_and_valid():
+    """Tests that sampled combinations are distinct members of the product."""
+    word_lists = [["a", "b", "c"]] * 4
+    product = set(itertools.product(*word_lists))
+
+    for max_combos in (10, 50):  # both sampling strategies
+        sample = list(sample_combinations(word_lists, max_combos))
+        assert len(sample) == max_combos
+        assert len(set(sample)) == max_combos
+        assert set(sample) <= product
+
+
+def test_huge_product_is_not_materialized():
+    """Tests that sampling from a trillion-sized product stays O(max_combos)."""
+    word_lists = [[f"w{i}_{j}" for j in range(5)] for i in range(30)]
+    assert count_combinations(word_lists) == 5 ** 30
+
+    start = time.perf_counter()
+    sample = list(sample_combinations(word_lists, 100))
+
+    assert time.perf_counter() - start < 1.0
+    assert len(set(sample)) == 100
+    assert all(len(combination) == 30 for combination in sample)
+
+
+def test_glossary_rewriter_with_huge_product():
+    """Tests that a glossary-heavy query is capped at max_combos."""
+    glossary = [["测试", "评估", "评测", "检验", "检测"]]
+    rewriter = GlossaryRewriter(glossary, max_combos=20)
+
+    result = rewriter.rewrite({"query": "测试" * 20, "reference": "ref"})
+
+    assert len(result) == 20
+    assert len({rq["query"] for rq in result}) == 20
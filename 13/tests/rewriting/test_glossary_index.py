@@ -0,0 +1,87 @@
+import random
+
+import pytest
+
+from queryrewrite.rewriting.glossary_index import compile_glossary, load_compiled_glossary
+from queryrewrite.rewriting.glossary_matcher import GlossaryMatcher
+from queryrewrite.rewriting.glossary_rewriter import GlossaryRewriter
+
+
+GLOSSARY = [
+    ["测试", "评估", "评测"],
+    ["大型语言模型", "大模型", "LLM"],
+    ["语言", "自然语言"],
+    ["模型测试", "模型评测"],
+]
+
+
+@pytest.fixture
+def compiled(tmp_path):
+    """Fixture for a compiled and memory-mapped glossary."""
+    path = compile_glossary(GLOSSARY, str(tmp_path / "glossary.idx"))
+    with load_compiled_glossary(path) as index:
+        yield index
+
+
+def test_compiled_glossary_matches_like_matcher(compiled):
+    """Tests that the compiled index finds the same spans as GlossaryMatcher."""
+    matcher = GlossaryMatcher(GLOSSARY)
+    alphabet = "测试评估大型语言模自然LM的 s"
+    rng = random.Random(0)
+    texts = ["如何测试大型语言模型？", "LLMs 和 LLM", "自然语言模型测试"]
+    texts += ["".join(rng.choice(alphabet) for _ in range(30)) for _ in range(200)]
+
+    for text in texts:
+        assert compiled.find_spans(text) == matcher.find_spans(text)
+    assert len(compiled) == len(matcher)
+
+
+def test_compiled_glossary_groups(compiled):
+    """Tests that synonym groups are decoded from the string pool."""
+    assert [compiled.group(i) for i in range(len(GLOSSARY))] == GLOSSARY
+
+
+def test_compiled_glossary_backs_rewriter(compiled):
+    """Tests that GlossaryRewriter accepts a compiled glossary."""
+    result = GlossaryRewriter(compiled).rewrite({"query": "测试大模型", "reference": "ref"})
+
+    assert len(result) == 9
+    assert {"query": "评测大模型", "reference": "ref"} in result
+
+
+def test_rejects_foreign_files(tmp_path):
+    """Tests that loading a file that is not a compiled glossary fails."""
+    path = tmp_path / "not_a_glossary.idx"
+    path.write_bytes(b"x" * 64)
+
+    with pytest.raises(ValueError):
+        load_compiled_glossary(str(path))
+
+
+@pytest.mark.parametrize("size", [0, 10])
+def test_rejects_files_shorter_than_header(tmp_path, size):
+    """Tests that a file shorter than the header fails with ValueError."""
+    path = tmp_path / "short.idx"
+    path.write_bytes(b"x" * size)
+
+    with pytest.raises(ValueError):
+        load_compiled_glossary(str(path))
+
+
+def test_rejects_truncated_files(tmp_path):
+    """Tests that a compiled glossary cut short fails with ValueError."""
+    path = compile_glossary(GLOSSARY, str(tmp_path / "glossary.idx"))
+    with open(path, "rb+") as f:
+        f.truncate(len(f.read()) - 8)
+
+    with pytest.raises(ValueError):
+        load_compiled_glossary(path)
+
+
+def test_compiled_glossary_long_repetitive_text(tmp_path):
+    """Tests matching with failure links on text that repeatedly almost matches a long term."""
+    term = "甲" * 200 + "乙"
+    path = compile_glossary([[term, "丙"]], str(tmp_path / "glossary.idx"))
+    text = "甲" * 5000 + "乙"
+    with load_compiled_glossary(path) as index:
+        assert index.find_spans(text) == GlossaryMatcher([[term, "丙"]]).find_spans(text) == [(4800, 5001, [term, "丙"])]
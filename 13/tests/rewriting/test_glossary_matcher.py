@@ -0,0 +1,62 @@
+import jieba
+
+from queryrewrite.rewriting.glossary_matcher import GlossaryMatcher
+from queryrewrite.rewriting.glossary_rewriter import GlossaryRewriter
+
+
+def _terms(text, matcher):
+    return [text[start:end] for start, end, _ in matcher.find_spans(text)]
+
+
+def test_longest_match_wins():
+    """Tests that overlapping terms resolve to the leftmost-longest match."""
+    matcher = GlossaryMatcher([["大模型", "LLM"], ["大型语言模型"], ["语言", "自然语言"], ["模型测试"]])
+
+    assert _terms("如何测试大型语言模型", matcher) == ["大型语言模型"]
+    assert _terms("大模型测试", matcher) == ["大模型"]
+    assert _terms("自然语言处理", matcher) == ["自然语言"]
+
+
+def test_suffix_terms_are_found():
+    """Tests that terms reachable only through failure links are matched."""
+    matcher = GlossaryMatcher([["abcd"], ["bc"], ["测试"]])
+
+    assert _terms("abc 测试", matcher) == ["测试"]
+    assert _terms("x abce", matcher) == []
+    assert _terms("评测与测试", matcher) == ["测试"]
+
+
+def test_ascii_terms_respect_word_boundaries():
+    """Tests that English terms are not matched inside longer words."""
+    matcher = GlossaryMatcher([["LLM", "大模型"]])
+
+    assert _terms("LLMs 和 LLM", matcher) == ["LLM"]
+    assert _terms("测试LLM的能力", matcher) == ["LLM"]
+
+
+def test_spans_carry_synonym_groups():
+    """Tests that each span carries the full synonym group of its term."""
+    matcher = GlossaryMatcher([["测试", "评估", "评测"]])
+
+    assert matcher.find_spans("评估一下") == [(0, 2, ["测试", "评估", "评测"])]
+    assert len(matcher) == 3
+
+
+def test_matcher_does_not_touch_jieba_dictionary():
+    """Tests that building a rewriter no longer mutates the global jieba dictionary."""
+    term = "某个不存在的领域术语"
+    GlossaryRewriter([[term, "同义术语"]])
+
+    jieba.initialize()
+    assert term not in jieba.dt.FREQ
+
+
+def test_matcher_is_reusable_across_rewriters():
+    """Tests that one compiled matcher can back many rewriters."""
+    matcher = GlossaryMatcher([["测试", "评测"]])
+    queries = [{"query": "测试", "reference": "ref"}, {"query": "模型测试", "reference": "ref"}]
+
+    results = [GlossaryRewriter(matcher, max_combos=10).rewrite(q) for q in queries]
+
+    assert {rq["query"] for rq in results[0]} == {"测试", "评测"}
+    assert {rq["query"] for rq in results[1]} == {"模型测试", "模型评测"}
@@ -61,3 +61,78 @@ def test_synonym_rewriter(mock_llm):
     # This is a more complex test, as it depends on the mock LLM's response
     # for each word. For simplicity, we'll just check that it returns something.
     assert len(result) > 0
+
+
+def test_llm_rewriter_parses_objects_with_braces():
+    """Tests the LLMRewriter with a top-level list of objects whose strings contain braces."""
+    llm = MagicMock()
+    llm.invoke.return_value = '<think>{思考}</think>[{"query": "如何{测试}模型", "reference": "r1"}, {"query": "q2", "reference": "r2"}]'
+    rewriter = LLMRewriter(llm)
+
+    result = rewriter.rewrite({"query": "test query", "reference": "test reference"})
+
+    assert result == [{"query": "如何{测试}模型", "reference": "r1"}, {"query": "q2", "reference": "r2"}]
+
+
+def test_llm_rewriter_ignores_citations_before_response():
+    """Tests that a bracketed citation in the thinking block does not hide the response object."""
+    llm = MagicMock()
+    llm.invoke.return_value = '<think>参考文献[1]</think>{"response": [{"query": "q1", "reference": "r1"}]}'
+    rewriter = LLMRewriter(llm)
+
+    result = rewriter.rewrite({"query": "test query", "reference": "test reference"})
+
+    assert result == [{"query": "q1", "reference": "r1"}]
+
+
+class ChunkedLLM:
+    """A streaming LLM stub that records how many chunks were consumed."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.consumed = 0
+
+    def stream(self, prompt):
+        for chunk in self.chunks:
+            self.consumed += 1
+            yield chunk
+
+
+def test_llm_rewriter_streams_rewrites():
+    """Tests that the streaming LLMRewriter yields each rewrite as soon as it is complete."""
+    llm = ChunkedLLM(['{"response": [{"query": "q1", ', '"reference": "r1"}, ', '{"query": "q2", "reference": "r2"}]}', ' ignored'])
+    rewriter = LLMRewriter(llm, stream=True)
+
+    results = rewriter.iter_rewrite({"query": "test query", "reference": "test reference"})
+
+    assert next(results) == {"query": "q1", "reference": "r1"}
+    assert llm.consumed == 2
+    assert list(results) == [{"query": "q2", "reference": "r2"}]
+    # The stream is closed once the response array ends
+    assert llm.consumed == 3
+
+
+def test_llm_rewriter_stream_falls_back_to_full_response():
+    """Tests that a streamed response without a JSON array falls back to the raw response."""
+    llm = ChunkedLLM(["just a ", "plain rewrite"])
+    rewriter = LLMRewriter(llm, stream=True)
+
+    assert list(rewriter.iter_rewrite({"query": "test query", "reference": "ref"})) == [
+        {"query": "just a plain rewrite", "reference": "ref"}
+    ]
+
+
+def test_llm_rewriter_stream_skips_bracketed_prose():
+    """Tests that a citation like "[1]" before the response array does not end the stream."""
+    llm = ChunkedLLM([
+        '根据规范[1]，改写如下：',
+        '[{"query": "q1", "reference": "r1"},',
+        ' {"query": "q2", "reference": "r2"}]',
+    ])
+    rewriter = LLMRewriter(llm, stream=True)
+
+    assert list(rewriter.iter_rewrite({"query": "test query", "reference": "ref"})) == [
+        {"query": "q1", "reference": "r1"},
+        {"query": "q2", "reference": "r2"},
+    ]
+    assert llm.consumed == 3
@@ -0,0 +1,131 @@
+import pytest
+from unittest.mock import MagicMock
+
+from queryrewrite.rewriting.synonym_cache import SynonymCache
+from queryrewrite.rewriting.synonym_rewriter import SynonymRewriter
+
+
+@pytest.fixture
+def mock_llm():
+    """Fixture for a mock LLM returning two synonyms."""
+    llm = MagicMock()
+    llm.model = "test-model"
+    llm.invoke.return_value = '["同义词1", "同义词2"]'
+    return llm
+
+
+def test_repeated_words_are_requested_once(mock_llm):
+    """Tests that tokens are deduplicated within a query."""
+    rewriter = SynonymRewriter(mock_llm)
+
+    rewriter.rewrite({"query": "测试测试，测试", "reference": "ref"})
+
+    assert mock_llm.invoke.call_count == 1
+
+
+def test_cache_is_shared_across_queries(mock_llm):
+    """Tests that a word is only requested once for a batch of queries."""
+    cache = SynonymCache()
+    rewriter = SynonymRewriter(mock_llm, synonym_cache=cache)
+
+    rewriter.rewrite({"query": "测试模型", "reference": "ref"})
+    calls = mock_llm.invoke.call_count
+    SynonymRewriter(mock_llm, synonym_cache=cache).rewrite({"query": "模型测试", "reference": "ref"})
+
+    assert mock_llm.invoke.call_count == calls
+    assert cache.stats()["hits"] >= 2
+
+
+def test_cache_key_includes_max_synonyms(mock_llm):
+    """Tests that a different synonym limit is not served from the cache."""
+    cache = SynonymCache()
+    SynonymRewriter(mock_llm, synonym_cache=cache).rewrite({"query": "测试", "reference": "ref"})
+    SynonymRewriter(mock_llm, synonym_cache=cache, max_synonyms_per_word=1).rewrite({"query": "测试", "reference": "ref"})
+
+    assert mock_llm.invoke.call_count == 2
+
+
+def test_failed_lookups_are_not_cached(mock_llm):
+    """Tests that parse failures are retried instead of being memoized."""
+    mock_llm.invoke.return_value = "no list here"
+    rewriter = SynonymRewriter(mock_llm)
+
+    assert rewriter._get_synonyms("测试", "vn") == ["测试"]
+    assert rewriter._get_synonyms("测试", "vn") == ["测试"]
+    assert mock_llm.invoke.call_count == 2
+
+
+def test_lru_eviction():
+    """Tests that the in-process store is bounded."""
+    cache = SynonymCache(maxsize=2)
+    cache.set(("a", "n", "m", 5), ["a1"])
+    cache.set(("b", "n", "m", 5), ["b1"])
+    cache.get(("a", "n", "m", 5))
+    cache.set(("c", "n", "m", 5), ["c1"])
+
+    assert cache.get(("b", "n", "m", 5)) is None
+    assert cache.get(("a", "n", "m", 5)) == ["a1"]
+    assert cache.stats()["size"] == 2
+
+
+def test_disk_store_persists(tmp_path):
+    """Tests that the optional on-disk store survives a new cache instance."""
+    path = str(tmp_path / "synonyms.sqlite3")
+    SynonymCache(path=path).set(("测试", "vn", "m", 5), ["评测", "评估"])
+
+    assert SynonymCache(path=path).get(("测试", "vn", "m", 5)) == ["评测", "评估"]
+
+
+def test_batched_mode_uses_one_call_per_query():
+    """Tests that batch_words asks for all content words in a single prompt."""
+    llm = MagicMock()
+    llm.model = "test-model"
+    llm.invoke.return_value = '{"如何": ["怎样"], "测试": ["评测", "评估"], "模型": ["模式"]}'
+    rewriter = SynonymRewriter(llm, batch_words=True)
+
+    result = rewriter.rewrite({"query": "如何测试模型", "reference": "ref"})
+
+    assert llm.invoke.call_count == 1
+    assert {"query": "怎样评测模式", "reference": "ref"} in result
+
+
+def test_batched_mode_ignores_citations():
+    """Tests that a bracketed citation next to the batched response object is ignored."""
+    llm = MagicMock()
+    llm.model = "test-model"
+    llm.invoke.return_value = '参考[1]：{"测试": ["评测"], "模型": ["模式"]}'
+    rewriter = SynonymRewriter(llm, batch_words=True)
+
+    result = rewriter.rewrite({"query": "测试模型", "reference": "ref"})
+
+    assert llm.invoke.call_count == 1
+    assert {"query": "评测模式", "reference": "ref"} in result
+
+
+def test_batched_mode_falls_back_for_missing_words():
+    """Tests that words missing from the batched response are requested one by one."""
+    llm = MagicMock()
+    llm.model = "test-model"
+    llm.invoke.side_effect = ['{"测试": ["评测"]}', '["模式"]']
+    rewriter = SynonymRewriter(llm, batch_words=True)
+
+    result = rewriter.rewrite({"query": "测试模型", "reference": "ref"})
+
+    assert llm.invoke.call_count == 2
+    assert "模型" in llm.invoke.call_args_list[1].args[0]
+    assert result == [{"query": "评测模式", "reference": "ref"}]
+
+
+def test_prefetch_synonyms_for_a_group_of_queries():
+    """Tests that a group of queries can be served by one batched prompt."""
+    llm = MagicMock()
+    llm.model = "test-model"
+    llm.invoke.return_value = '```json\n{"测试": ["评测"], "模型": ["模式"], "评估": ["评价"]}\n```'
+    rewriter = SynonymRewriter(llm)
+    queries = [{"query": "测试模型", "reference": "ref"}, {"query": "评估模型", "reference": "ref"}]
+
+    rewriter.prefetch_synonyms(queries)
+    results = [rewriter.rewrite(q) for q in queries]
+
+    assert llm.invoke.call_count == 1
+    assert results == [[{"query": "评测模式", "reference": "ref"}], [{"query": "评价模式", "reference": "ref"}]]
@@ -0,0 +1,101 @@
+import json
+from unittest.mock import MagicMock
+
+from queryrewrite import cli
+
+GLOSSARY = [["测试", "评估", "评测"], ["大型语言模型", "大模型", "LLM"]]
+
+def write_inputs(tmp_path, queries):
+    input_path = tmp_path / "queries.jsonl"
+    input_path.write_text(
+        "".join(json.dumps({"query": q, "reference": f"ref{i}"}, ensure_ascii=False) + "\n" for i, q in enumerate(queries)),
+        encoding="utf-8",
+    )
+    glossary_path = tmp_path / "glossary.json"
+    glossary_path.write_text(json.dumps(GLOSSARY, ensure_ascii=False), encoding="utf-8")
+    return str(input_path), str(glossary_path)
+
+def read_outputs(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+def test_cli_rewrites_and_checkpoints(tmp_path):
+    input_path, glossary_path = write_inputs(tmp_path, ["如何测试大型语言模型", "大模型评测方法"])
+    output_path = str(tmp_path / "out.jsonl")
+
+    assert cli.main([input_path, output_path, "--rewrite", "glossary", "--glossary", glossary_path,
+                     "--validate", "most_detailed", "--concurrency", "2"]) == 0
+
+    results = sorted(read_outputs(output_path), key=lambda r: r["index"])
+    assert [r["index"] for r in results] == [0, 1]
+    assert all(r["error"] is None and len(r["rewritten_queries"]) == 1 for r in results)
+    assert cli.load_checkpoint(output_path + ".ckpt") == {0, 1}
+
+def test_cli_resumes_from_checkpoint(tmp_path):
+    input_path, glossary_path = write_inputs(tmp_path, ["如何测试大型语言模型", "大模型评测方法", "LLM测试"])
+    output_path = tmp_path / "out.jsonl"
+    # Simulate a crash: one finished record and a half-written line
+    output_path.write_text('{"index": 0, "query": {}, "rewritten_queries": [], "error": null}\n{"index": 1, "que', encoding="utf-8")
+    (tmp_path / "out.jsonl.ckpt").write_text("0\n", encoding="utf-8")
+
+    cli.main([input_path, str(output_path), "--rewrite", "glossary", "--glossary", glossary_path])
+
+    assert sorted(r["index"] for r in read_outputs(output_path)) == [0, 1, 2]
+    assert cli.load_checkpoint(str(output_path) + ".ckpt") == {0, 1, 2}
+
+def test_cli_reports_errors_per_record(tmp_path, monkeypatch):
+    input_path, _ = write_inputs(tmp_path, ["如何测试大型语言模型"])
+    output_path = str(tmp_path / "out.jsonl")
+    llm = MagicMock()
+    llm.invoke.side_effect = RuntimeError("boom")
+    monkeypatch.setattr(cli, "build_llm", lambda args: llm)
+
+    cli.main([input_path, output_path, "--rewrite", "llm"])
+
+    [result] = read_outputs(output_path)
+    assert result["error"] == "RuntimeError: boom"
+
+def test_cli_reports_malformed_lines(tmp_path):
+    input_path, glossary_path = write_inputs(tmp_path, ["如何测试大型语言模型"])
+    with open(input_path, "a", encoding="utf-8") as f:
+        f.write('{"query": "大模型评测\n{"reference": "no query"}\n["not", "an", "object"]\n{"query": "LLM测试"}\n')
+    output_path = str(tmp_path / "out.jsonl")
+
+    assert cli.main([input_path, output_path, "--rewrite", "glossary", "--glossary", glossary_path]) == 0
+
+    results = {r["index"]: r for r in read_outputs(output_path)}
+    assert sorted(results) == [0, 1, 2, 3, 4]
+    assert results[1]["error"].startswith("JSONDecodeError")
+    assert results[2]["error"].startswith("KeyError")
+    assert results[3]["error"].startswith("TypeError")
+    assert results[0]["error"] is None and results[4]["error"] is None
+    assert cli.load_checkpoint(output_path + ".ckpt") == {0, 1, 2, 3, 4}
+
+def test_cli_repairs_torn_checkpoint(tmp_path):
+    queries = ["如何测试大型语言模型"] * 13
+    input_path, glossary_path = write_inputs(tmp_path, queries)
+    output_path = tmp_path / "out.jsonl"
+    output_path.write_text("", encoding="utf-8")
+    # A crash while writing "12\n" left only "1"
+    (tmp_path / "out.jsonl.ckpt").write_text("".join(f"{i}\n" for i in range(12)) + "1", encoding="utf-8")
+
+    cli.main([input_path, str(output_path), "--rewrite", "glossary", "--glossary", glossary_path])
+
+    assert [r["index"] for r in read_outputs(output_path)] == [12]
+    lines = (tmp_path / "out.jsonl.ckpt").read_text(encoding="utf-8").splitlines()
+    assert lines == [str(i) for i in range(13)]
+
+def test_repair_output_reads_back_across_blocks(tmp_path, monkeypatch):
+    monkeypatch.setattr(cli, "_REPAIR_BLOCK_SIZE", 4)
+    path = tmp_path / "out.jsonl"
+    path.write_bytes(b'{"a": 1}\n' + b'{"b": "torn' * 3)
+    cli.repair_output(str(path))
+    assert path.read_bytes() == b'{"a": 1}\n'
+
+    path.write_bytes(b"no newline at all")
+    cli.repair_output(str(path))
+    assert path.read_bytes() == b""
+
+    path.write_bytes(b"1\n2\n")
+    cli.repair_output(str(path))
+    assert path.read_bytes() == b"1\n2\n"
@@ -0,0 +1,43 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+# Seconds allowed for importing the package entry points in a fresh interpreter
+IMPORT_BUDGET = float(os.environ.get("QR_IMPORT_BUDGET", "0.5"))
+HEAVY_MODULES = ["jieba", "numpy", "nltk", "rouge_chinese", "langchain_core", "langchain_ollama", "httpx"]
+ENTRY_POINTS = [
+    "queryrewrite.rewriting.base",
+    "queryrewrite.validation.base",
+    "queryrewrite.pipeline",
+    "queryrewrite.cli",
+]
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _cold_import(modules, runs=3):
+    """Imports modules in fresh interpreters; returns the fastest time and the heavy modules loaded."""
+    script = (
+        "import json, sys, time\n"
+        "started = time.perf_counter()\n"
+        f"for name in {modules!r}: __import__(name)\n"
+        "elapsed = time.perf_counter() - started\n"
+        f"print(json.dumps([elapsed, [m for m in {HEAVY_MODULES!r} if m in sys.modules]]))\n"
+    )
+    results = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", script], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+        ).stdout
+        results.append(json.loads(output))
+    return min(elapsed for elapsed, _ in results), results[0][1]
+
+@pytest.mark.parametrize("module", ENTRY_POINTS)
+def test_entry_point_does_not_import_heavy_dependencies(module):
+    _, loaded = _cold_import([module], runs=1)
+    assert loaded == []
+
+def test_cold_import_within_budget():
+    elapsed, _ = _cold_import(ENTRY_POINTS)
+    assert elapsed < IMPORT_BUDGET, f"cold import took {elapsed:.3f}s, budget is {IMPORT_BUDGET:.3f}s"
@@ -0,0 +1,109 @@
+import json
+import time
+from contextlib import nullcontext
+from unittest.mock import MagicMock
+
+from queryrewrite import instrumentation
+from queryrewrite.instrumentation import Recorder, get_recorder, instrument
+from queryrewrite.pipeline import rewrite_and_validate
+from queryrewrite.rewriting.base import RewriteMethod
+from queryrewrite.rewriting.llm_rewriter import LLMRewriter
+from queryrewrite.validation.base import ValidationMethod, validate
+from queryrewrite.validation.tokenization import token_cache
+
+GLOSSARY = [["大模型", "LLM", "大语言模型"], ["评测", "评估", "测评"]]
+QUERY = {"query": "如何评测大模型的效果", "reference": "参考答案"}
+
+def test_disabled_is_a_no_op():
+    assert get_recorder() is None
+    assert isinstance(instrumentation.stage("anything"), nullcontext)
+    instrumentation.count("anything")
+    llm = MagicMock()
+    llm.invoke.return_value = "ok"
+    assert instrumentation.invoke_llm(llm, "prompt") == "ok"
+
+def test_stage_and_count():
+    with instrument() as recorder:
+        assert get_recorder() is recorder
+        with instrumentation.stage("work"):
+            pass
+        with instrumentation.stage("work"):
+            pass
+        instrumentation.count("items", 3)
+    assert get_recorder() is None
+
+    data = recorder.to_dict()
+    assert data["stages"]["work"]["count"] == 2
+    assert data["stages"]["work"]["max"] <= data["stages"]["work"]["total"]
+    assert data["counters"] == {"items": 3}
+
+def test_nested_instrument_restores_previous_recorder():
+    outer, inner = Recorder(), Recorder()
+    with instrument(outer):
+        with instrument(inner):
+            instrumentation.count("x")
+        instrumentation.count("y")
+    assert inner.counters == {"x": 1}
+    assert outer.counters == {"y": 1}
+
+def test_llm_calls_are_recorded():
+    llm = MagicMock()
+    llm.invoke.return_value = '{"response": [{"query": "改写", "reference": "参考答案"}]}'
+    with instrument() as recorder:
+        rewritten = LLMRewriter(llm).rewrite(QUERY)
+
+    counters = recorder.counters
+    assert counters["llm.calls"] == 1
+    assert counters["llm.prompt_chars"] == len(llm.invoke.call_args[0][0])
+    assert counters["llm.response_chars"] == len(llm.invoke.return_value)
+    assert counters["candidates.generated"] == len(rewritten) == 1
+    assert {"rewrite.llm", "llm", "parse.superjson"} <= set(recorder.stages)
+
+def test_rewrite_and_validate_stages():
+    token_cache.clear()
+    with instrument() as recorder:
+        candidates = rewrite_and_validate(QUERY, RewriteMethod.GLOSSARY, ValidationMethod.NONE, glossary=GLOSSARY)
+        validate(ValidationMethod.PARETO_OPTIMAL, candidates, QUERY["query"])
+
+    counters = recorder.counters
+    assert counters["candidates.generated"] == len(candidates) == 9
+    # Streamed NONE validation plus the batch Pareto validation
+    assert counters["candidates.validated"] == 18
+    assert counters["token_cache.misses"] > 0
+    assert {"validate.pareto_optimal", "score", "tokenize"} <= set(recorder.stages)
+
+def test_trace_file(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    llm = MagicMock()
+    llm.invoke.return_value = "ok"
+    with instrument(trace_path=str(path)):
+        with instrumentation.stage("work"):
+            instrumentation.invoke_llm(llm, "prompt")
+
+    events = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert [(event["type"], event.get("name")) for event in events] == [
+        ("stage", "llm"), ("llm", None), ("stage", "work"), ("summary", None),
+    ]
+    assert events[-1]["counters"]["llm.calls"] == 1
+    assert events[-1]["stages"]["work"]["count"] == 1
+
+def test_pipeline_records_rewrite_and_tokenize_stages():
+    with instrument() as recorder:
+        candidates = rewrite_and_validate(QUERY, RewriteMethod.GLOSSARY, ValidationMethod.PARETO_OPTIMAL, glossary=GLOSSARY)
+
+    stages = recorder.stages
+    assert candidates
+    assert {"rewrite.glossary", "tokenize", "validate.pareto_optimal"} <= set(stages)
+    # The rewriter was consumed once through iter_rewrite
+    assert stages["rewrite.glossary"]["count"] == 1
+
+def test_iter_stage_excludes_consumer_time():
+    def produce():
+        yield 1
+        yield 2
+
+    with instrument() as recorder:
+        for _ in instrumentation.iter_stage("work", produce()):
+            time.sleep(0.05)
+    assert recorder.stages["work"]["count"] == 1
+    assert recorder.stages["work"]["total"] < 0.05
@@ -0,0 +1,57 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from queryrewrite.pipeline import iter_rewrite_candidates, rewrite_and_validate
+from queryrewrite.rewriting.base import RewriteMethod, iter_rewrite, rewrite
+from queryrewrite.validation.base import ValidationMethod, iter_validate, validate
+
+GLOSSARY = [["大模型", "LLM", "大语言模型"], ["评测", "评估", "测评"], ["效果", "表现"]]
+QUERY = {"query": "如何评测大模型的效果", "reference": "参考答案"}
+
+def test_iter_rewrite_matches_rewrite():
+    assert list(iter_rewrite(RewriteMethod.GLOSSARY, QUERY, glossary=GLOSSARY)) == \
+        rewrite(RewriteMethod.GLOSSARY, QUERY, glossary=GLOSSARY)
+
+@pytest.mark.parametrize("method", [
+    ValidationMethod.NONE,
+    ValidationMethod.ROUGE_L_BLEU_NORMALIZED,
+    ValidationMethod.MOST_DETAILED,
+    ValidationMethod.PARETO_OPTIMAL,
+    ValidationMethod.FILTER_BY_ROUGE_L_BLEU_THRESHOLDS,
+])
+def test_iter_validate_matches_validate(method):
+    candidates = rewrite(RewriteMethod.GLOSSARY, QUERY, glossary=GLOSSARY)
+    assert list(iter_validate(method, iter(candidates), QUERY["query"])) == validate(method, candidates, QUERY["query"])
+
+def test_stop_after_halts_generation():
+    consumed = []
+
+    def candidates():
+        for rq in rewrite(RewriteMethod.GLOSSARY, QUERY, glossary=GLOSSARY):
+            consumed.append(rq)
+            yield rq
+
+    result = list(iter_validate(ValidationMethod.NONE, candidates(), QUERY["query"], stop_after=2))
+    assert len(result) == 2
+    assert len(consumed) == 2
+
+def test_stop_after_rejected_for_global_methods():
+    with pytest.raises(ValueError):
+        iter_validate(ValidationMethod.PARETO_OPTIMAL, [], QUERY["query"], stop_after=1)
+
+def test_rewrite_and_validate_skips_later_rewriters():
+    llm = MagicMock()
+    result = rewrite_and_validate(
+        QUERY, [RewriteMethod.GLOSSARY, RewriteMethod.LLM], ValidationMethod.NONE,
+        glossary=GLOSSARY, llm=llm, stop_after=3,
+    )
+    assert len(result) == 3
+    llm.invoke.assert_not_called()
+
+def test_rewrite_and_validate_chains_methods():
+    llm = MagicMock()
+    llm.invoke.return_value = '{"response": [{"query": "大模型效果怎么评估", "reference": "参考答案"}]}'
+    candidates = list(iter_rewrite_candidates([RewriteMethod.GLOSSARY, RewriteMethod.LLM], QUERY, GLOSSARY, llm))
+    assert candidates[-1]["query"] == "大模型效果怎么评估"
+    assert len(candidates) == len(rewrite(RewriteMethod.GLOSSARY, QUERY, glossary=GLOSSARY)) + 1
@@ -0,0 +1,68 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import queryrewrite
+from queryrewrite import tokenizer_state
+from queryrewrite.tokenizer_state import load_tokenizer_state, tokenizer_state_path
+from queryrewrite.validation.tokenization import tokenize
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture(autouse=True)
+def restore_state_path(monkeypatch):
+    # warmup records the state file for scoring workers; keep it out of other tests
+    monkeypatch.setattr(tokenizer_state, "_state_path", None)
+
+def test_warmup_adds_glossary_terms():
+    assert "量子蜂巢算力" not in tokenize("量子蜂巢算力怎么样")
+    queryrewrite.warmup([["量子蜂巢算力", "QHC"]])
+    # The stale cached tokenization was dropped
+    assert tokenize("量子蜂巢算力怎么样")[0] == "量子蜂巢算力"
+
+def test_state_roundtrip(tmp_path):
+    path = str(tmp_path / "jieba_state.bin")
+    queryrewrite.warmup(custom_words=["星河织梦机"], state_path=path)
+    assert os.path.exists(path)
+    assert tokenizer_state_path() == path
+
+    assert load_tokenizer_state(path, ["星河织梦机"])
+    assert not load_tokenizer_state(path, ["未收录的词"])
+    assert not load_tokenizer_state(str(tmp_path / "missing.bin"))
+    (tmp_path / "broken.bin").write_bytes(b"not a state")
+    assert not load_tokenizer_state(str(tmp_path / "broken.bin"))
+
+def test_fresh_process_loads_state_without_rebuilding(tmp_path):
+    path = str(tmp_path / "jieba_state.bin")
+    queryrewrite.warmup(custom_words=["云端织锦器"], state_path=path)
+
+    script = (
+        "import jieba, queryrewrite\n"
+        "def fail(*args, **kwargs): raise AssertionError('dictionary was rebuilt')\n"
+        "jieba.initialize = jieba.add_word = fail\n"
+        f"queryrewrite.warmup(custom_words=['云端织锦器'], state_path={path!r})\n"
+        "print(jieba.lcut('云端织锦器很好用')[0])\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", script], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    assert output.strip() == "云端织锦器"
+
+def test_warmed_words_are_saved_to_a_new_state_file(tmp_path):
+    path = str(tmp_path / "jieba_state.bin")
+    queryrewrite.warmup(custom_words=["晨曦测绘仪"])
+    queryrewrite.warmup(custom_words=["晨曦测绘仪"], state_path=path)
+    assert load_tokenizer_state(path, ["晨曦测绘仪"])
+
+def test_warmup_without_save_leaves_state_file(tmp_path):
+    path = str(tmp_path / "jieba_state.bin")
+    queryrewrite.warmup(custom_words=["极光编目器"], state_path=path)
+    saved = os.path.getmtime(path), os.path.getsize(path)
+
+    # As a scoring worker does: words missing from the file are added in memory only
+    queryrewrite.warmup(custom_words=["极光编目器", "潮汐索引机"], state_path=path, save=False)
+    assert (os.path.getmtime(path), os.path.getsize(path)) == saved
+    assert tokenize("潮汐索引机很快")[0] == "潮汐索引机"
+    assert not load_tokenizer_state(path, ["潮汐索引机"])
@@ -0,0 +1,100 @@
+import json
+import random
+import threading
+import time
+
+import httpx
+import pytest
+
+from queryrewrite.llm.async_ollama import AsyncOllamaLLM
+from queryrewrite.testing.fake_ollama import (
+    FakeOllamaServer,
+    TokenBucket,
+    parse_latency,
+    split_tokens,
+    template_responder,
+)
+
+@pytest.fixture
+def server():
+    with FakeOllamaServer(responder=template_responder("回答: {prompt}", rules=[("同义词", '["评估", "测评"]')])) as server:
+        yield server
+
+def test_generate_is_deterministic(server):
+    body = {"model": "fake", "prompt": "你好", "stream": False}
+    first = httpx.post(f"{server.url}/api/generate", json=body).json()
+    second = httpx.post(f"{server.url}/api/generate", json=body).json()
+    assert first["response"] == second["response"] == "回答: 你好"
+    assert first["done"] is True and first["eval_count"] == len(split_tokens("回答: 你好"))
+
+def test_generate_streams_ndjson(server):
+    with httpx.stream("POST", f"{server.url}/api/generate", json={"model": "fake", "prompt": "给出同义词"}) as response:
+        chunks = [json.loads(line) for line in response.iter_lines() if line]
+    assert "".join(chunk["response"] for chunk in chunks) == '["评估", "测评"]'
+    assert [chunk["done"] for chunk in chunks] == [False] * (len(chunks) - 1) + [True]
+
+def test_template_with_json_objects():
+    respond = template_responder('[{"query": "{prompt}", "reference": "y"}]', rules=[("同义词", '{"测试": ["评测"]}')])
+    assert respond("x", {}) == '[{"query": "x", "reference": "y"}]'
+    assert respond("同义词", {}) == '{"测试": ["评测"]}'
+
+def test_failing_responder_answers_500():
+    def respond(prompt, request):
+        raise RuntimeError("boom")
+
+    with FakeOllamaServer(responder=respond) as server:
+        response = httpx.post(f"{server.url}/api/generate", json={"model": "fake", "prompt": "p", "stream": False})
+    assert response.status_code == 500
+    assert response.json() == {"error": "RuntimeError: boom"}
+
+def test_chat_and_embed(server):
+    chat = httpx.post(f"{server.url}/api/chat", json={
+        "model": "fake", "stream": False, "messages": [{"role": "user", "content": "同义词"}],
+    }).json()
+    assert chat["message"] == {"role": "assistant", "content": '["评估", "测评"]'}
+
+    embed = httpx.post(f"{server.url}/api/embed", json={"model": "fake", "input": ["a", "b", "a"]}).json()
+    vectors = embed["embeddings"]
+    assert len(vectors) == 3 and len(vectors[0]) == 64
+    assert vectors[0] == vectors[2] != vectors[1]
+
+def test_client_stack_against_fake_server(server):
+    llm = AsyncOllamaLLM(model="fake", base_url=server.url)
+    try:
+        assert llm.invoke("同义词") == '["评估", "测评"]'
+    finally:
+        llm.close()
+    assert server.stats()["requests"]["/api/generate"] == 1
+
+def test_parse_latency():
+    rng = random.Random(0)
+    assert parse_latency(None)(rng) == 0.0
+    assert parse_latency(0.5)(rng) == 0.5
+    assert parse_latency("fixed:0.2")(rng) == 0.2
+    assert all(0.1 <= parse_latency("uniform:0.1,0.3")(rng) <= 0.3 for _ in range(100))
+    assert all(parse_latency("normal:0,1")(rng) >= 0 for _ in range(100))
+    with pytest.raises(ValueError):
+        parse_latency("uniform:1")
+
+def test_concurrency_limit_rejects_when_busy():
+    with FakeOllamaServer(latency=0.2, max_concurrency=1, reject_when_busy=True) as server:
+        statuses = []
+
+        def call():
+            response = httpx.post(f"{server.url}/api/generate", json={"model": "fake", "prompt": "x", "stream": False})
+            statuses.append(response.status_code)
+
+        threads = [threading.Thread(target=call) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert sorted(statuses) == [200, 503, 503]
+        assert server.stats()["rejected"] == 2
+
+def test_token_bucket_limits_throughput():
+    bucket = TokenBucket(rate=100, burst=1)
+    started = time.monotonic()
+    for _ in range(11):
+        bucket.acquire()
+    assert time.monotonic() - started >= 0.09
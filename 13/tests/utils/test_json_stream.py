@@ -0,0 +1,48 @@
+import json
+
+from queryrewrite.utils.json_stream import JSONArrayStreamParser, iter_json_array
+
+
+ITEMS = [{"query": "如何{评测}大模型", "reference": "参考\"答案\""}, {"query": "q2", "reference": "[r2]"}]
+
+
+class TestJSONArrayStreamParser:
+    """Test cases for the incremental JSON array parser."""
+
+    def test_emits_each_element_when_it_closes(self):
+        text = json.dumps({"response": ITEMS}, ensure_ascii=False)
+        parser = JSONArrayStreamParser()
+        emitted_at = []
+        for i, char in enumerate(text):
+            for value in parser.feed(char):
+                emitted_at.append((i, value))
+        assert [value for _, value in emitted_at] == ITEMS
+        # The first element is emitted at its closing brace, not at the end of the text
+        first_element = '{"response": [' + json.dumps(ITEMS[0], ensure_ascii=False)
+        assert text.startswith(first_element)
+        assert emitted_at[0][0] == len(first_element) - 1
+        assert parser.done
+
+    def test_skips_think_block_and_prose(self):
+        chunks = ["<thi", "nk>先想想[注]{和\"", "</think>好的：", '["a", ', '1.5, true', ', "b"]', ' trailing [9]']
+        assert list(iter_json_array(chunks)) == ["a", 1.5, True, "b"]
+
+    def test_skips_invalid_elements(self):
+        assert list(iter_json_array(['[{"query": "a"}, {bad}, {"query": "c"}]'])) == [{"query": "a"}, {"query": "c"}]
+
+    def test_accept_skips_arrays_in_prose(self):
+        parser = JSONArrayStreamParser(accept=lambda item: isinstance(item, dict))
+        values = parser.feed('见[1]和[注, 2]及[]：[{"query": "a"}, 3, {"query": "c"}] [{"query": "x"}]')
+        assert values == [{"query": "a"}, {"query": "c"}]
+        assert parser.done
+
+    def test_stops_reading_after_array(self):
+        consumed = []
+
+        def chunks():
+            for chunk in ['[1, 2]', ' more', ' text']:
+                consumed.append(chunk)
+                yield chunk
+
+        assert list(iter_json_array(chunks())) == [1, 2]
+        assert consumed == ['[1, 2]']
@@ -0,0 +1,62 @@
+import json
+import time
+
+import pytest
+from queryrewrite.utils.super_json import SuperJSON, extract_json
+
+
+class TestSuperJSON:
+    """Test cases for SuperJSON.loads."""
+
+    def test_single_object(self):
+        assert SuperJSON.loads('Result: {"a": 1}') == {"a": 1}
+
+    def test_top_level_array(self):
+        """A top-level JSON array is returned as the list itself."""
+        assert SuperJSON.loads('```json\n["q1", "q2"]\n```') == ["q1", "q2"]
+
+    def test_multiple_values(self):
+        assert SuperJSON.loads('{"a": 1} and then [2, 3]') == [{"a": 1}, [2, 3]]
+
+    def test_brackets_inside_strings(self):
+        text = 'x {"a": "}{ ] [", "b": "esc \\" }"} y {"c": 2}'
+        assert SuperJSON.loads(text) == [{"a": "}{ ] [", "b": 'esc " }'}, {"c": 2}]
+
+    def test_skips_prose_brackets(self):
+        assert SuperJSON.loads('<think>先想想[注]{和[</think>{"response": ["x"]}') == {"response": ["x"]}
+
+    def test_completes_truncated_value(self):
+        assert SuperJSON.loads('{"a": {"b": [1, 2') == {"a": {"b": [1, 2]}}
+        assert SuperJSON.loads('[{"query": "被截断') == [{"query": "被截断"}]
+
+    def test_finds_value_nested_in_unclosed_prose(self):
+        assert SuperJSON.loads("[a " * 1000 + '{"k": 1}') == {"k": 1}
+
+    def test_scalar_fallback(self):
+        assert SuperJSON.loads("0.85") == 0.85
+
+    def test_no_json_raises(self):
+        with pytest.raises(json.JSONDecodeError):
+            SuperJSON.loads("no json here")
+        with pytest.raises(json.JSONDecodeError):
+            extract_json("[[[[not json")
+
+    def test_many_objects(self):
+        objects = [{"query": f"q{i} {{x}}", "reference": "r"} for i in range(1000)]
+        assert SuperJSON.loads("\n".join(json.dumps(o, ensure_ascii=False) for o in objects)) == objects
+
+    @pytest.mark.parametrize("text", [
+        "[" * 20000 + "x",
+        "{" * 20000,
+        "[x]" * 20000,
+        "[a " * 20000 + '{"k": 1}',
+        '{"a": ' * 32000 + "x" + "}" * 32000,
+        "[" * 32000 + "x" + "]" * 32000,
+    ])
+    def test_pathological_input_is_linear(self, text):
+        started = time.perf_counter()
+        try:
+            SuperJSON.loads(text)
+        except json.JSONDecodeError:
+            pass
+        assert time.perf_counter() - started < 2.0
@@ -1,3 +1,5 @@
+import time
+
 import pytest
 from queryrewrite.utils.super_list import SuperList, extract_list
 
@@ -145,4 +147,40 @@ And some text.'''
     def test_list_with_single_quotes(self):
         """Test extracting list with single quoted strings."""
         result = SuperList("Names: ['John', 'Jane', 'Bob']")
-        assert result == ["John", "Jane", "Bob"]
\ No newline at end of file
+        assert result == ["John", "Jane", "Bob"]
+    
+    def test_brackets_in_prose_are_skipped(self):
+        """Test that bracketed prose and apostrophes before the list are ignored."""
+        text = "It's [note 1] and [it's] fine: ['a', 'b'] [\"c\"]"
+        assert SuperList(text) == ["a", "b"]
+    
+    def test_brackets_inside_strings(self):
+        """Test that brackets inside quoted strings do not end the list."""
+        assert SuperList('Result: ["a]", "[b", "c\\"]"] done') == ["a]", "[b", 'c"]']
+    
+    def test_list_nested_in_unclosed_bracket(self):
+        """Test extracting a list from inside an unclosed bracket."""
+        assert SuperList('[see: [1, 2] and more') == [1, 2]
+    
+    @pytest.mark.parametrize("make_text", [
+        lambda n: "[" * n,
+        lambda n: "[[x]" * n,
+        lambda n: "结果 [" + "a " * n,
+        lambda n: '["a' * n,
+        lambda n: "说明 [注] " * n,
+        lambda n: "文献[2023年]指出，" * n,
+        lambda n: "[[[x]]] " * n,
+        lambda n: "[1, " * n + "x" + "]" * n,
+        lambda n: "[" * n + "x" + "]" * n,
+    ])
+    def test_pathological_input_is_linear(self, make_text):
+        """Test that unbalanced or bracket-heavy text fails in time linear in its length."""
+        def elapsed(n):
+            text = make_text(n)
+            started = time.perf_counter()
+            with pytest.raises(ValueError):
+                SuperList(text)
+            return time.perf_counter() - started
+        small, large = elapsed(2000), elapsed(8000)
+        # 4x the input: linear work takes ~4x as long, quadratic work ~16x
+        assert large < 8 * small + 0.05
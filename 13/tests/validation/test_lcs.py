@@ -0,0 +1,32 @@
+import random
+
+from queryrewrite.validation.lcs import LCSReference, lcs_length
+
+def dp_lcs_length(x, y):
+    dp = [[0] * (len(y) + 1) for _ in range(len(x) + 1)]
+    for i in range(1, len(x) + 1):
+        for j in range(1, len(y) + 1):
+            dp[i][j] = dp[i - 1][j - 1] + 1 if x[i - 1] == y[j - 1] else max(dp[i - 1][j], dp[i][j - 1])
+    return dp[-1][-1]
+
+def test_lcs_length_matches_dynamic_programming():
+    rng = random.Random(0)
+    alphabet = ["大模型", "评测", "如何", "的", "效果", "LLM", " "]
+    for _ in range(300):
+        x = [rng.choice(alphabet) for _ in range(rng.randint(0, 40))]
+        y = [rng.choice(alphabet) for _ in range(rng.randint(0, 40))]
+        assert lcs_length(x, y) == dp_lcs_length(x, y)
+
+def test_lcs_reference_reused_for_many_hypotheses():
+    reference = LCSReference(["a", "b", "c", "b", "d", "a", "b"])
+    assert reference.lcs_length(["b", "d", "c", "a", "b", "a"]) == 4
+    assert reference.lcs_length(["x", "y"]) == 0
+    assert reference.lcs_length([]) == 0
+    assert reference.token_ids(["a", "d", "x"]) == [0, 3, -1]
+
+def test_lcs_long_reference():
+    rng = random.Random(1)
+    reference = [rng.randrange(50) for _ in range(5000)]
+    assert LCSReference(reference).lcs_length(reference) == 5000
+    hypothesis = reference[::3]
+    assert LCSReference(reference).lcs_length(hypothesis) == len(hypothesis)
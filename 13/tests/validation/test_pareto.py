@@ -0,0 +1,62 @@
+import random
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from queryrewrite.validation.validators import pareto_front_ranks, pareto_optimal
+
+def brute_force_ranks(scores):
+    """Peels non-dominated fronts with pairwise comparisons."""
+    ranks = [None] * len(scores)
+    remaining = set(range(len(scores)))
+    front = 0
+    while remaining:
+        current = [
+            i for i in remaining
+            if not any(
+                scores[j][0] >= scores[i][0] and scores[j][1] <= scores[i][1]
+                and (scores[j][0] > scores[i][0] or scores[j][1] < scores[i][1])
+                for j in remaining
+            )
+        ]
+        for i in current:
+            ranks[i] = front
+            remaining.discard(i)
+        front += 1
+    return ranks
+
+def test_pareto_front_ranks_match_brute_force():
+    rng = random.Random(0)
+    for _ in range(200):
+        # Coarse grid so ties and duplicates are common
+        scores = [(rng.randint(0, 5) / 5, rng.randint(0, 5) / 5) for _ in range(rng.randint(1, 30))]
+        assert pareto_front_ranks(scores) == brute_force_ranks(scores)
+
+@pytest.fixture
+def queries():
+    return [{"query": f"查询{i}", "reference": "参考"} for i in range(5)]
+
+SCORES = np.array([
+    [0.5, 0.5],  # front 1 (dominated by 1)
+    [0.6, 0.4],  # front 0
+    [0.9, 0.8],  # front 0
+    [0.6, 0.4],  # duplicate of 1, front 0
+    [0.4, 0.9],  # front 2
+])
+
+def test_pareto_optimal_returns_front_in_input_order(queries):
+    with patch("queryrewrite.validation.validators.score_candidates", return_value=SCORES):
+        result = pareto_optimal(queries, "原始查询")
+    assert result == [queries[1], queries[2], queries[3]]
+
+def test_pareto_optimal_multiple_fronts_with_scores(queries):
+    with patch("queryrewrite.validation.validators.score_candidates", return_value=SCORES):
+        result = pareto_optimal(queries, "原始查询", num_fronts=2, return_scores=True)
+    assert [item["query"] for item in result] == [queries[1], queries[2], queries[3], queries[0]]
+    assert [item["front"] for item in result] == [0, 0, 0, 1]
+    assert result[-1]["rouge_l"] == 0.5 and result[-1]["bleu"] == 0.5
+
+def test_pareto_optimal_invalid_num_fronts(queries):
+    with pytest.raises(ValueError):
+        pareto_optimal(queries, "原始查询", num_fronts=0)
@@ -0,0 +1,95 @@
+import threading
+import time
+from collections import OrderedDict
+
+import jieba
+import pytest
+from rouge_chinese import Rouge
+
+from queryrewrite.validation.metrics import calculate_bleu, calculate_rouge_l
+from queryrewrite.validation import scoring
+from queryrewrite.validation.scoring import ReferenceScorer, get_scoring_pool, score_candidates
+
+REFERENCE = "如何评估大模型在中文问答任务上的效果？请给出 LLM 的评测方法。"
+CANDIDATES = [
+    "怎么评测大模型的中文问答效果",
+    "如何评估大模型在中文问答任务上的效果？",
+    "请给出 LLM 的评测方法。如何评估效果？",
+    "评测",
+    "天气很好",
+    "如何评估大模型在中文问答任务上的效果？请给出 LLM 的评测方法。",
+]
+
+def rouge_chinese_l(candidate, reference):
+    return Rouge().get_scores(" ".join(jieba.cut(candidate)), " ".join(jieba.cut(reference)))[0]["rouge-l"]["f"]
+
+def test_rouge_l_matches_rouge_chinese():
+    for candidate in CANDIDATES:
+        assert calculate_rouge_l(candidate, REFERENCE) == rouge_chinese_l(candidate, REFERENCE)
+
+def test_score_candidates_matches_pairwise_metrics():
+    scores = score_candidates(REFERENCE, CANDIDATES)
+    assert scores.shape == (len(CANDIDATES), 2)
+    for candidate, (rouge_l, bleu) in zip(CANDIDATES, scores):
+        assert rouge_l == calculate_rouge_l(candidate, REFERENCE)
+        assert bleu == pytest.approx(calculate_bleu(candidate, REFERENCE), abs=1e-12)
+
+def test_score_candidates_empty():
+    assert score_candidates(REFERENCE, []).shape == (0, 2)
+
+def test_reference_scorer_single_candidate():
+    scorer = ReferenceScorer(REFERENCE)
+    assert scorer.rouge_l(CANDIDATES[0]) == calculate_rouge_l(CANDIDATES[0], REFERENCE)
+    assert scorer.bleu(CANDIDATES[0]) == pytest.approx(calculate_bleu(CANDIDATES[0], REFERENCE), abs=1e-12)
+    assert scorer.bleu("天气很好") == 0.0
+
+def test_score_candidates_keeps_metric_errors():
+    with pytest.raises(ValueError):
+        score_candidates("hello world", ["goodbye world"])
+    with pytest.raises(ValueError):
+        score_candidates(REFERENCE, ["  "])
+
+def test_score_candidates_with_workers_matches_in_process():
+    candidates = [f"{CANDIDATES[i % len(CANDIDATES)]}{i}" for i in range(100)]
+    expected = score_candidates(REFERENCE, candidates)
+    sharded = score_candidates(REFERENCE, candidates, workers=3, custom_words=["LLM评测"])
+    assert (sharded == expected).all()
+
+def test_score_candidates_small_pool_stays_in_process(monkeypatch):
+    monkeypatch.setattr("queryrewrite.validation.scoring.get_scoring_pool", None)
+    assert score_candidates(REFERENCE, CANDIDATES, workers=8).shape == (len(CANDIDATES), 2)
+
+class FakePool:
+    """Stands in for ProcessPoolExecutor; slow to create to widen races."""
+
+    created = 0
+
+    def __init__(self, **kwargs):
+        time.sleep(0.01)
+        FakePool.created += 1
+        self.shut_down = False
+
+    def shutdown(self, wait=True):
+        self.shut_down = True
+
+@pytest.fixture
+def fake_pools(monkeypatch):
+    FakePool.created = 0
+    monkeypatch.setattr(scoring, "ProcessPoolExecutor", FakePool)
+    monkeypatch.setattr(scoring, "_pools", OrderedDict())
+
+def test_scoring_pool_is_created_once_across_threads(fake_pools):
+    pools = []
+    threads = [threading.Thread(target=lambda: pools.append(get_scoring_pool(2, ["词"]))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert FakePool.created == 1
+    assert all(pool is pools[0] for pool in pools)
+
+def test_scoring_pools_are_capped(fake_pools):
+    first = get_scoring_pool(2, ["词0"])
+    pools = [get_scoring_pool(2, [f"词{i}"]) for i in range(1, scoring.MAX_SCORING_POOLS + 1)]
+    assert len(scoring._pools) == scoring.MAX_SCORING_POOLS
+    assert first.shut_down and not any(pool.shut_down for pool in pools)
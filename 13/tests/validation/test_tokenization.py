@@ -0,0 +1,51 @@
+import pytest
+
+from queryrewrite.validation.metrics import calculate_bleu, calculate_rouge_l
+from queryrewrite.validation.tokenization import TokenCache, token_cache
+
+def test_token_cache_returns_tuple_and_counts_hits():
+    """Tests that a repeated string returns the same cached tuple and is counted as a hit."""
+    cache = TokenCache(maxsize=10)
+    tokens = cache.tokenize("我爱北京天安门")
+    assert isinstance(tokens, tuple)
+    assert "".join(tokens) == "我爱北京天安门"
+    assert cache.tokenize("我爱北京天安门") is tokens
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+    assert stats["size"] == 1
+
+def test_token_cache_evicts_least_recently_used():
+    """Tests that a full cache evicts the least recently used string first."""
+    cache = TokenCache(maxsize=2)
+    cache.tokenize("苹果")
+    cache.tokenize("香蕉")
+    cache.tokenize("苹果")
+    cache.tokenize("橘子")  # evicts 香蕉
+    assert cache.stats()["size"] == 2
+    cache.tokenize("苹果")
+    assert cache.stats()["hits"] == 2
+    cache.tokenize("香蕉")
+    assert cache.stats()["misses"] == 4
+
+def test_token_cache_clear_and_invalid_size():
+    """Tests that clear() resets entries and counters and that maxsize must be positive."""
+    cache = TokenCache()
+    cache.tokenize("测试")
+    cache.clear()
+    assert cache.stats() == {"hits": 0, "misses": 0, "hit_rate": 0.0, "size": 0, "maxsize": cache.maxsize}
+    with pytest.raises(ValueError):
+        TokenCache(maxsize=0)
+
+def test_metrics_share_reference_tokenization():
+    """Tests that ROUGE-L and BLEU tokenize the shared reference only once."""
+    token_cache.clear()
+    reference = "如何评估大模型的效果"
+    for candidate in ["怎么评估大模型的效果", "大模型效果如何评测"]:
+        calculate_rouge_l(candidate, reference)
+        calculate_bleu(candidate, reference)
+    # 2 candidates + 1 reference tokenized once each
+    assert token_cache.stats()["misses"] == 3
+    assert token_cache.stats()["hits"] == 5
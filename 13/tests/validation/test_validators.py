@@ -52,3 +52,43 @@ def test_llm_semantic_similarity(rewritten_queries):
     mock_llm.invoke.return_value = "0.8"
     result = llm_semantic_similarity(rewritten_queries, "原始查询", mock_llm)
     assert len(result) == 1
+
+
+def test_llm_semantic_similarity_concurrent_keeps_bleu_tie_break():
+    """Equal similarities pick the candidate with the lowest BLEU, also with several workers."""
+    queries = [
+        {"query": "原始查询", "reference": "测试参考"},
+        {"query": "完全不同的问题", "reference": "测试参考"},
+    ]
+    mock_llm = MagicMock()
+    mock_llm.invoke.return_value = "0.8"
+    result = llm_semantic_similarity(queries, "原始查询", mock_llm, max_workers=4)
+    assert result == [queries[1]]
+    assert mock_llm.invoke.call_count == 2
+
+
+def test_llm_semantic_similarity_batched(rewritten_queries):
+    """Tests scoring several candidates with one prompt."""
+    mock_llm = MagicMock()
+    mock_llm.invoke.return_value = "相似度: [0.2, 0.9]"
+    result = llm_semantic_similarity(rewritten_queries, "原始查询", mock_llm, batch_size=2)
+    assert result == [rewritten_queries[1]]
+    assert mock_llm.invoke.call_count == 1
+
+
+def test_llm_semantic_similarity_batched_falls_back_per_candidate(rewritten_queries):
+    """A batch response with the wrong number of scores is retried one candidate at a time."""
+    mock_llm = MagicMock()
+    mock_llm.invoke.side_effect = ["[0.5]", "0.9", "0.1"]
+    result = llm_semantic_similarity(rewritten_queries, "原始查询", mock_llm, batch_size=2)
+    assert result == [rewritten_queries[0]]
+    assert mock_llm.invoke.call_count == 3
+
+
+def test_validate_with_workers_matches_single_process():
+    """validate(workers=...) shards scoring across processes without changing the result."""
+    from queryrewrite.validation.base import ValidationMethod, validate
+
+    queries = [{"query": f"重写的查询{i}更长一些", "reference": "测试参考"} for i in range(80)]
+    for method in (ValidationMethod.PARETO_OPTIMAL, ValidationMethod.ROUGE_L_BLEU_NORMALIZED):
+        assert validate(method, queries, "原始查询", workers=2) == validate(method, queries, "原始查询")
@@ -1,16 +1,18 @@
 import jieba
 
 def lcs_length(x, y):
-    """计算两个序列的最长公共子序列长度"""
-    m, n = len(x), len(y)
-    dp = [[0] * (n + 1) for _ in range(m + 1)]
-    for i in range(1, m + 1):
-        for j in range(1, n + 1):
-            if x[i-1] == y[j-1]:
-                dp[i][j] = dp[i-1][j-1] + 1
-            else:
-                dp[i][j] = max(dp[i-1][j], dp[i][j-1])
-    return dp[m][n]
+    """计算两个序列的最长公共子序列长度（位并行算法，不构建 (m+1)×(n+1) 的DP表）"""
+    # 参考序列中每个词出现位置的位掩码
+    masks = {}
+    for i, token in enumerate(x):
+        masks[token] = masks.get(token, 0) | (1 << i)
+    full = (1 << len(x)) - 1
+    v = full
+    for token in y:
+        u = v & masks.get(token, 0)
+        v = ((v + u) | (v - u)) & full
+    # v 中为 0 的位数即 LCS 长度
+    return len(x) - bin(v).count("1")
 
 # 输入文本
 reference = "讨论新产品发布计划，确定时间表为六月，分配市场团队设计广告，技术团队开发功能，预算需审批"